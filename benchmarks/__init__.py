@@ -0,0 +1,10 @@
+"""
+benchmarks
+~~~~~~~~~~~~
+The benchmarks of the watcher, run with python -m benchmarks.
+
+The watcher polls synthetic source trees of a given size, depth, and mix of
+file types, and the time, filesystem calls, and memory of each poll are
+compared with a baseline kept with the benchmarks.
+:copyright: (c) yerejm
+"""
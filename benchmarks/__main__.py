@@ -0,0 +1,151 @@
+"""
+benchmarks.__main__
+~~~~~~~~~~~~
+Runs the benchmarks of the watcher and compares them with the baseline.
+
+    python -m benchmarks [--save] [--files N ...] [--repeat N]
+
+The exit status is 1 if any benchmark regressed.
+:copyright: (c) yerejm
+"""
+
+import json
+import os
+import sys
+import tempfile
+
+import click
+
+from benchmarks.watcher import (
+    compare,
+    DEFAULT_CHURN_RATE,
+    DEFAULT_MEMORY_TOLERANCE,
+    DEFAULT_REPEAT,
+    DEFAULT_SIZES,
+    DEFAULT_TIME_TOLERANCE,
+    watcher_benchmarks,
+)
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+
+
+@click.command()
+@click.option(
+    "--files",
+    "-n",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=DEFAULT_SIZES,
+    show_default=True,
+    help="The number of files of a tree. May be given more than once.",
+)
+@click.option("--depth", type=click.IntRange(min=0), default=4, show_default=True)
+@click.option("--fanout", type=click.IntRange(min=1), default=4, show_default=True)
+@click.option(
+    "--churn-rate",
+    type=click.FloatRange(min=0, max=1, min_open=True),
+    default=DEFAULT_CHURN_RATE,
+    show_default=True,
+    help="The fraction of the files changed before each churn_poll.",
+)
+@click.option(
+    "--repeat", type=click.IntRange(min=1), default=DEFAULT_REPEAT, show_default=True
+)
+@click.option(
+    "--baseline",
+    type=click.Path(dir_okay=False),
+    default=BASELINE_PATH,
+    help="The results compared with.",
+)
+@click.option(
+    "--time-tolerance",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_TIME_TOLERANCE,
+    show_default=True,
+    help="The fraction by which the time may exceed the baseline.",
+)
+@click.option(
+    "--memory-tolerance",
+    type=click.FloatRange(min=0),
+    default=DEFAULT_MEMORY_TOLERANCE,
+    show_default=True,
+    help="The fraction by which the peak memory may exceed the baseline.",
+)
+@click.option(
+    "--save", is_flag=True, default=False, help="Replace the baseline with the results."
+)
+def main(
+    files,
+    depth,
+    fanout,
+    churn_rate,
+    repeat,
+    baseline,
+    time_tolerance,
+    memory_tolerance,
+    save,
+):
+    """Benchmark the watcher polling synthetic source trees."""
+    results = {}
+    for count in files:
+        tree = "files={},depth={},fanout={}".format(count, depth, fanout)
+        with tempfile.TemporaryDirectory() as root:
+            results[tree] = watcher_benchmarks(
+                root,
+                count,
+                repeat=repeat,
+                churn_rate=churn_rate,
+                depth=depth,
+                fanout=fanout,
+            )
+        click.echo(tree)
+        click.echo(
+            "  {:<12} {:>12} {:>12} {:>12}".format(
+                "benchmark", "seconds", "fs calls", "peak KiB"
+            )
+        )
+        for name, measurement in results[tree].items():
+            click.echo(
+                "  {:<12} {:>12.6f} {:>12} {:>12.1f}".format(
+                    name,
+                    measurement.seconds,
+                    measurement.filesystem_calls,
+                    measurement.peak_memory / 1024,
+                )
+            )
+
+    if save:
+        with open(baseline, "w") as f:
+            json.dump(
+                {
+                    tree: {
+                        name: measurement._asdict()
+                        for name, measurement in benchmarks.items()
+                    }
+                    for tree, benchmarks in results.items()
+                },
+                f,
+                indent=2,
+                sort_keys=True,
+            )
+            f.write("\n")
+        click.echo("Baseline saved to {}".format(baseline))
+        return
+    if not os.path.exists(baseline):
+        click.echo("No baseline at {}".format(baseline))
+        return
+    with open(baseline) as f:
+        regressions = compare(results, json.load(f), time_tolerance, memory_tolerance)
+    for tree, name, field, expected, value in regressions:
+        click.echo(
+            "REGRESSION {} {} {}: {} (baseline {})".format(
+                tree, name, field, value, expected
+            )
+        )
+    if regressions:
+        sys.exit(1)
+    click.echo("No regressions against {}".format(baseline))
+
+
+if __name__ == "__main__":
+    main()
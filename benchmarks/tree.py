@@ -0,0 +1,118 @@
+"""
+benchmarks.tree
+~~~~~~~~~~~~
+This module generates the synthetic source trees that the watcher is
+benchmarked against, and changes them between polls.
+
+The trees are generated from a seed, so a tree of a given shape is the same
+from one run to the next.
+:copyright: (c) yerejm
+"""
+
+import collections
+import os
+import random
+
+# The kinds of file in a tree, by how often they occur. Most are matched by
+# the default source patterns of ttt; the rest are not.
+DEFAULT_MIX = (
+    ("test_{}.cc", 0.1),
+    ("{}.cc", 0.35),
+    ("{}.h", 0.35),
+    ("{}.cmake", 0.02),
+    ("CMakeLists.txt", 0.03),
+    ("{}.md", 0.05),
+    ("{}.png", 0.1),
+)
+DEFAULT_DEPTH = 4
+DEFAULT_FANOUT = 4
+DEFAULT_SEED = 1
+
+# The changes made to a tree: the paths of the files created, modified, and
+# deleted.
+Churn = collections.namedtuple("Churn", ["created", "modified", "deleted"])
+
+
+def directories(root, depth, fanout):
+    """Lists the directories of a tree in which every directory above the
+    given depth has fanout subdirectories."""
+    paths = [root]
+    level = [root]
+    for _ in range(depth):
+        level = [
+            os.path.join(parent, "dir{}".format(i))
+            for parent in level
+            for i in range(fanout)
+        ]
+        paths.extend(level)
+    return paths
+
+
+def generate_tree(
+    root,
+    files,
+    depth=DEFAULT_DEPTH,
+    fanout=DEFAULT_FANOUT,
+    mix=DEFAULT_MIX,
+    seed=DEFAULT_SEED,
+):
+    """Generates a source tree.
+
+    :param root: the directory to generate the tree in
+    :param files: the number of files in the tree
+    :param depth: (optional) the number of levels of directories below root
+    :param fanout: (optional) the number of subdirectories of each directory
+    :param mix: (optional) the kinds of file, as (name format, weight) pairs
+    :param seed: (optional) the seed of the choice of kind and directory
+    :return the sorted list of the paths of the files generated
+    """
+    rng = random.Random(seed)
+    dirs = directories(root, depth, fanout)
+    formats = [name for name, _ in mix]
+    weights = [weight for _, weight in mix]
+    paths = set()
+    for i in range(files):
+        directory = rng.choice(dirs)
+        path = os.path.join(directory, rng.choices(formats, weights)[0].format(i))
+        if path in paths:
+            # a second CMakeLists.txt in the directory
+            path = os.path.join(directory, "file{}.txt".format(i))
+        paths.add(path)
+    for directory in dirs:
+        os.makedirs(directory, exist_ok=True)
+    for path in paths:
+        with open(path, "w") as f:
+            f.write("// {}\n".format(os.path.basename(path)))
+    return sorted(paths)
+
+
+def churn(paths, rate, seed=DEFAULT_SEED):
+    """Changes a fraction of the files of a tree.
+
+    Of the files changed, half are modified, a quarter deleted, and as many
+    created again as were deleted, so the size of the tree stays the same.
+    Modified files have their modification time moved forward rather than
+    waiting for the clock.
+
+    :param paths: the paths of the files of the tree, which are updated
+    :param rate: the fraction of the files that are changed
+    :param seed: (optional) the seed of the choice of files
+    :return the :class:`Churn`
+    """
+    rng = random.Random(seed)
+    changed = rng.sample(paths, int(len(paths) * rate))
+    deleted = changed[: len(changed) // 4]
+    modified = changed[len(changed) // 4 :][: len(changed) // 2]
+    for path in modified:
+        mtime = os.stat(path).st_mtime + 1
+        os.utime(path, (mtime, mtime))
+    created = []
+    for path in deleted:
+        os.remove(path)
+        paths.remove(path)
+        new_path = "{}_new{}".format(*os.path.splitext(path))
+        with open(new_path, "w") as f:
+            f.write("// {}\n".format(os.path.basename(new_path)))
+        paths.append(new_path)
+        created.append(new_path)
+    return Churn(created, modified, deleted)
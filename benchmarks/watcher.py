@@ -0,0 +1,218 @@
+"""
+benchmarks.watcher
+~~~~~~~~~~~~
+This module measures the watcher polling synthetic source trees.
+
+Each benchmark is measured for its time, the filesystem calls it makes, and
+the peak memory it allocates:
+  - cold_poll: the first poll of a tree by a new watcher
+  - warm_poll: a poll of a tree that has not changed since the last poll
+  - churn_poll: a poll of a tree of which a fraction has changed
+  - walk: the traversal of a tree alone
+  - match: the matching of the paths of a tree against the source patterns
+  - watchstate: the comparison of the files of two polls
+
+The filesystem calls are those of os.scandir, os.stat and os.lstat made from
+Python. Each is at least one system call, and unlike the time they do not
+depend on the machine, so they show a regression without noise.
+:copyright: (c) yerejm
+"""
+
+import collections
+from contextlib import contextmanager
+import os
+from timeit import default_timer as timer
+import tracemalloc
+
+from benchmarks.tree import churn, generate_tree
+from ttt.options import DEFAULT_SOURCE_PATTERNS
+from ttt.watcher import compile_patterns, create_watchstate, walk, Watcher
+
+DEFAULT_SIZES = (1000, 10000)
+DEFAULT_REPEAT = 10
+DEFAULT_CHURN_RATE = 0.01
+# How much slower, or larger, than its baseline a benchmark may be before it
+# is a regression. The time varies between runs, and more so between machines.
+DEFAULT_TIME_TOLERANCE = 1.0
+DEFAULT_MEMORY_TOLERANCE = 0.25
+
+FILESYSTEM_CALLS = ("scandir", "stat", "lstat")
+
+# The measurement of a benchmark: the seconds of its fastest run, the
+# filesystem calls of a run, and the peak bytes allocated by a run.
+Measurement = collections.namedtuple(
+    "Measurement", ["seconds", "filesystem_calls", "peak_memory"]
+)
+
+
+@contextmanager
+def counted_filesystem_calls():
+    """Counts the filesystem calls made in the body of a 'with' block.
+
+    :return a list whose first item is the count
+    """
+    count = [0]
+    originals = {name: getattr(os, name) for name in FILESYSTEM_CALLS}
+
+    def counting(function):
+        def call(*args, **kwargs):
+            count[0] += 1
+            return function(*args, **kwargs)
+
+        return call
+
+    for name, function in originals.items():
+        setattr(os, name, counting(function))
+    try:
+        yield count
+    finally:
+        for name, function in originals.items():
+            setattr(os, name, function)
+
+
+def measure(benchmark, setup=None, repeat=DEFAULT_REPEAT):
+    """Measures a benchmark.
+
+    The benchmark is run once to count its filesystem calls, once with its
+    allocations traced, and then timed over the repeated runs, so that
+    neither the counting nor the tracing adds to its time.
+
+    :param benchmark: called with the value returned by setup
+    :param setup: (optional) called before each run of the benchmark
+    :param repeat: (optional) the number of timed runs
+    :return the :class:`Measurement`
+    """
+
+    def prepare():
+        return setup() if setup is not None else None
+
+    value = prepare()
+    with counted_filesystem_calls() as count:
+        benchmark(value)
+    value = prepare()
+    tracemalloc.start()
+    try:
+        benchmark(value)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    times = []
+    for _ in range(repeat):
+        value = prepare()
+        start = timer()
+        benchmark(value)
+        times.append(timer() - start)
+    # the fastest run is the one least disturbed by the rest of the machine
+    return Measurement(min(times), count[0], peak)
+
+
+def watcher_benchmarks(
+    root, files, repeat=DEFAULT_REPEAT, churn_rate=DEFAULT_CHURN_RATE, **kwargs
+):
+    """Measures the watcher against a tree generated in a directory.
+
+    :param root: the directory, which is expected to be empty
+    :param files: the number of files in the tree
+    :param repeat: (optional) the number of timed runs of each benchmark
+    :param churn_rate: (optional) the fraction of files changed before each
+        churn_poll
+    :param kwargs: (optional) the shape of the tree, as for generate_tree()
+    :return a dict of benchmark name to :class:`Measurement`
+    """
+    paths = generate_tree(root, files, **kwargs)
+    build_path = os.path.join(root, "build")
+
+    def new_watcher():
+        return Watcher(root, build_path, DEFAULT_SOURCE_PATTERNS)
+
+    def polled_watcher():
+        watcher = new_watcher()
+        watcher.poll()
+        return watcher
+
+    warm = polled_watcher()
+    churned = polled_watcher()
+    seeds = iter(range(1, 1 + 2 + repeat))
+
+    def churned_watcher():
+        churn(paths, churn_rate, seed=next(seeds))
+        return churned
+
+    patterns = compile_patterns(DEFAULT_SOURCE_PATTERNS)
+
+    def match(_):
+        return [
+            path for path in paths if any(pattern.search(path) for pattern in patterns)
+        ]
+
+    before = warm.filelist
+    after = dict(before)
+    for path in paths[:: max(1, int(1 / churn_rate))]:
+        if path in after:
+            after[path] = after[path]._replace(mtime=after[path].mtime + 1)
+
+    return {
+        "cold_poll": measure(
+            lambda watcher: watcher.poll(), setup=new_watcher, repeat=repeat
+        ),
+        "warm_poll": measure(
+            lambda watcher: watcher.poll(), setup=lambda: warm, repeat=repeat
+        ),
+        "churn_poll": measure(
+            lambda watcher: watcher.poll(), setup=churned_watcher, repeat=repeat
+        ),
+        "walk": measure(lambda _: list(walk(root)), repeat=repeat),
+        "match": measure(match, repeat=repeat),
+        "watchstate": measure(
+            lambda _: create_watchstate(before, after), repeat=repeat
+        ),
+    }
+
+
+def compare(
+    results,
+    baseline,
+    time_tolerance=DEFAULT_TIME_TOLERANCE,
+    memory_tolerance=DEFAULT_MEMORY_TOLERANCE,
+):
+    """Compares results with a baseline.
+
+    A benchmark regresses when it makes more filesystem calls than its
+    baseline, or takes more time or memory beyond the tolerance. Benchmarks
+    not in the baseline are not compared.
+
+    :param results: a dict of tree name to a dict of benchmark name to
+        :class:`Measurement`, or to a dict of its fields
+    :param baseline: the results of the baseline, in the same form
+    :param time_tolerance: (optional) the fraction by which the time may
+        exceed the baseline
+    :param memory_tolerance: (optional) the fraction by which the peak memory
+        may exceed the baseline
+    :return a list of (tree, benchmark, field, baseline value, value) tuples,
+        one for each regression
+    """
+    regressions = []
+    for tree, benchmarks in sorted(results.items()):
+        for name, measurement in sorted(benchmarks.items()):
+            expected = baseline.get(tree, {}).get(name)
+            if expected is None:
+                continue
+            measurement = as_dict(measurement)
+            expected = as_dict(expected)
+            tolerances = {
+                "seconds": time_tolerance,
+                "filesystem_calls": 0,
+                "peak_memory": memory_tolerance,
+            }
+            for field, tolerance in tolerances.items():
+                if measurement[field] > expected[field] * (1 + tolerance):
+                    regressions.append(
+                        (tree, name, field, expected[field], measurement[field])
+                    )
+    return regressions
+
+
+def as_dict(measurement):
+    if isinstance(measurement, Measurement):
+        return measurement._asdict()
+    return measurement
@@ -6,7 +6,7 @@ from tempfile import NamedTemporaryFile
 import nox
 
 nox.options.sessions = "lint", "tests"
-locations = "src", "tests", "noxfile.py"
+locations = "src", "tests", "benchmarks", "noxfile.py"
 if platform.system() == "Windows":
     version_tuple = platform.python_version_tuple()
     latest_python = ".".join(version_tuple[:2])
@@ -89,3 +89,12 @@ def tests(session):
         "auto",  # parallel testing
         *args,  # allows passing additional pytest args from command line
     )
+
+
+@nox.session(python=latest_python, venv_backend="uv")
+def benchmarks(session):
+    install_requirements(session)
+    session.install("click")
+    session.run(
+        "python", "-m", "benchmarks", *session.posargs, env={"PYTHONPATH": "src"}
+    )
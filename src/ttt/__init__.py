@@ -2,21 +2,28 @@
 
 import sys
 
-import colorama
 
+def __getattr__(name):
+    # The version is looked up from the package metadata only when it is
+    # used, as importlib.metadata is slow to import.
+    if name == "__version__":
+        try:
+            from importlib.metadata import PackageNotFoundError, version
+        except ImportError:
+            from importlib_metadata import PackageNotFoundError, version
 
-try:
-    from importlib.metadata import version, PackageNotFoundError
-except ImportError:
-    from importlib_metadata import version, PackageNotFoundError
+        try:
+            value = version(__name__)
+        except PackageNotFoundError:
+            value = "unknown"
+        globals()["__version__"] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 
-try:
-    __version__ = version(__name__)
-except PackageNotFoundError:
-    __version__ = "unknown"
-
 if sys.stdout.isatty():
+    import colorama
+
     colorama.init()
 
 __progname__ = __name__
@@ -1,12 +1,12 @@
 import sys
 
-import colorama
-
 from ttt import cli
 
 
 def main():
     if sys.stdout.isatty():
+        import colorama
+
         colorama.init()
     cli.ttt()
     sys.exit(0)
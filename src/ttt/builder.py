@@ -5,20 +5,94 @@ This module implements the cmake builder.
 :copyright: (c) yerejm
 """
 
+import collections
 import errno
 from functools import partial
 import glob
+import itertools
+import json
 import os
+import re
 import shutil
+import stat
 import subprocess
+import sys
+import threading
+from timeit import default_timer as timer
 
-import requests
+from ttt.cache import binary_identity, load_json, save_json, state_path
+from ttt.diagnostics import condense, DiagnosticParser
+import ttt.termstyle as termstyle
+import ttt.usercache as usercache
 
 
 CONAN_CMAKE_REPO = (
     "https://raw.githubusercontent.com/conan-io/cmake-conan/refs/heads/develop2/"
 )
 CONAN_CMAKE = "conan_provider.cmake"
+# The environment variable naming a local copy of the conan cmake provider,
+# used in place of downloading it.
+CONAN_PROVIDER_ENV = "TTT_CONAN_PROVIDER"
+
+# Ninja prints the description of a build step when the step completes if its
+# output is not a terminal, so this line marks an executable as linked.
+NINJA_LINKED_RE = re.compile("^\\[\\d+/\\d+\\] Linking \\w+ executable (.+)$")
+# Make prints its linking line before the link, but "Built target" after.
+MAKE_BUILT_TARGET_RE = re.compile("Built target (\\S+)$")
+
+COMPILER_CACHES = ["sccache", "ccache"]
+COMPILER_LAUNCHER_DEFINES = [
+    "CMAKE_C_COMPILER_LAUNCHER",
+    "CMAKE_CXX_COMPILER_LAUNCHER",
+]
+
+# The return code of a command killed because it reported an error.
+ABORTED = -1
+
+# A command run by a build: its return code, how long it took in seconds, when
+# it started (as a timer value), the file its output was captured in, and the
+# phase of the build that it performed (None when not known).
+BuildStep = collections.namedtuple(
+    "BuildStep",
+    ["command", "returncode", "duration", "log", "start", "phase"],
+    defaults=[None],
+)
+
+
+class BuildResult(object):
+    """The outcome of a build.
+
+    The build stops at the first command that fails, so only the last step
+    can have failed.
+    """
+
+    def __init__(self):
+        self.steps = []
+        # (hits, misses) of the compiler cache, when one is used
+        self.compiler_cache = None
+        # the diagnostics found in the output of the commands
+        self.first_error = None
+        self.errors = 0
+        self.warnings = 0
+
+    @property
+    def succeeded(self):
+        return self.failed_step is None
+
+    @property
+    def failed_step(self):
+        if self.steps and self.steps[-1].returncode != 0:
+            return self.steps[-1]
+        return None
+
+    @property
+    def duration(self):
+        return sum(step.duration for step in self.steps)
+
+
+def build_failed(result):
+    """Indicates whether the value returned by a builder is a failed build."""
+    return isinstance(result, BuildResult) and not result.succeeded
 
 
 def create_builder(watch_path, build_path, **kwargs):
@@ -43,6 +117,28 @@ def create_builder(watch_path, build_path, **kwargs):
     :param term: (optional) output stream for verbose output
     :param command_log: (optional) capture commands run and their return codes
     :param always_clean: (optional) always remove the build area before build
+    :param configure_inputs: (optional) a callable giving a dict of the
+        absolute paths of the files that cmake reads when configuring to their
+        modification times. By default, the source tree is walked for them.
+    :param fast: (optional) tune the build for speed: use Ninja for a new
+        build area if it is installed, compile through ccache or sccache if
+        either is installed, and build in parallel on every core
+    :param parallel: (optional) the number of concurrent build jobs. By
+        default, the generated build system decides, unless fast is given.
+    :param job_slots: (optional) the :class:`JobSlots` shared with other ttt
+        instances. The build takes as many free slots as it can use (up to
+        parallel, if given) and runs that many jobs.
+    :param abort_on_error: (optional) stop the build as soon as it reports an
+        error
+    :param condensed: (optional) only show the diagnostics of the build; the
+        rest of the build output is verbose output
+    :param conan_provider: (optional) the path of a local copy of the conan
+        cmake provider to seed the user cache with. By default,
+        $TTT_CONAN_PROVIDER, else the provider is downloaded the first time
+        that it is needed.
+    :return a function object that builds and returns a :class:`BuildResult`.
+        The output of the build is captured in build.log in the ttt state
+        directory of the build area.
     """
     # There shouldn't be a default for build_config,
     # but is specified to work around a cmake-conan bug
@@ -55,33 +151,86 @@ def create_builder(watch_path, build_path, **kwargs):
     always_clean = kwargs.pop("clean", False)
 
     command_log = kwargs.pop("command_log", None)
+    configure_inputs = kwargs.pop("configure_inputs", None)
+    fast = kwargs.pop("fast", False)
+    parallel = kwargs.pop("parallel", None)
+    job_slots = kwargs.pop("job_slots", None)
+    abort_on_error = kwargs.pop("abort_on_error", False)
+    condensed = kwargs.pop("condensed", False)
+    conan_provider = kwargs.pop("conan_provider", None)
 
     if not os.path.isabs(watch_path):
         raise IOError(errno.EINVAL, f"Watch path {watch_path} must be absolute")
     if not os.path.isabs(build_path):
         raise IOError(errno.EINVAL, f"Build path {build_path} must be absolute")
     defines = defines if defines else []
+    # Finish deleting build areas discarded by earlier runs.
+    orphans = trash_paths(build_path)
+    if orphans:
+        remove_in_background(orphans)
+    compiler_cache = None
+    if fast:
+        if generator is None and not generated(build_path) and shutil.which("ninja"):
+            generator = "Ninja"
+        compiler_cache = find_compiler_cache()
+        if compiler_cache is not None:
+            defines = defines + [
+                f"{define}={compiler_cache.path}"
+                for define in COMPILER_LAUNCHER_DEFINES
+                if not any(d.startswith(define) for d in defines)
+            ]
+        if parallel is None:
+            parallel = cpu_count()
+        if term:
+            term.writeln(
+                "fast build: generator {}, compiler cache {}, {} jobs".format(
+                    generator or "default",
+                    compiler_cache.path if compiler_cache else "none",
+                    parallel,
+                ),
+                verbose=1,
+            )
+    if job_slots is None:
+        build = partial(cmake_build, build_path, build_config, parallel)
+        build.phase = "build"
+    else:
+        build = SlottedBuild(build_path, build_config, job_slots, parallel)
     return partial(
         execute,
         [
             partial(cmake_clean, build_path, defines, always_clean),
-            partial(cmake_pregenerate, watch_path, build_path),
-            partial(
-                cmake_generate,
+            partial(cmake_pregenerate, watch_path, build_path, provider=conan_provider),
+            Configure(
                 watch_path,
                 build_path,
                 build_config,
                 generator,
                 defines,
+                inputs=configure_inputs,
+                term=term,
             ),
-            partial(cmake_build, build_path, build_config),
+            build,
         ],
         term=term,
         command_log=command_log,
+        log_path=state_path(build_path, "build.log"),
+        compiler_cache=compiler_cache,
+        abort_on_error=abort_on_error,
+        condensed=condensed,
     )
 
 
-def execute(commands, term=None, command_log=None):
+def execute(
+    commands,
+    term=None,
+    command_log=None,
+    listener=None,
+    log_path=None,
+    compiler_cache=None,
+    abort_on_error=False,
+    condensed=False,
+    phase=None,
+):
     """Executes the list of callable objects.
 
     Each callable object is a command generator that when called returns a
@@ -89,41 +238,166 @@ def execute(commands, term=None, command_log=None):
     a list for subprocess's non-string form (ie ['ls', '-la'], not 'ls -la')
     to avoid shell escaping mishaps.
 
+    A command generator with a completed() method is told the return code of
+    the command it generated once the command has run, or None if the command
+    did not run to completion. A command generator with a phase attribute
+    names the phase of the build that its command performs, e.g. configure.
+
     :param commands: a list of callable objects
     :param term: (optional) output stream for verbose output
     :param command_log: (optional) capture commands run and their return codes
+    :param listener: (optional) a line listener, as for streamed_call, that
+        is given each line of output of the commands as it is emitted. The
+        output is still written to the terminal.
+    :param log_path: (optional) the file in which the output of the commands
+        is captured
+    :param compiler_cache: (optional) the :class:`CompilerCache` used by the
+        commands, whose hits and misses during the commands are recorded in
+        the result
+    :param abort_on_error: (optional) kill a command as soon as it reports an
+        error
+    :param condensed: (optional) only write the diagnostics of the commands to
+        the terminal; the rest of the output is verbose output
+    :param phase: (optional) called with the phase of each command that has
+        one before the command runs
+    :return a :class:`BuildResult` of the commands run. Execution stops at the
+        first command that fails.
+
+    The output of the commands is parsed for compiler and linker diagnostics,
+    and the first error is written in a condensed form as soon as it is seen.
     """
-    from ttt.subproc import checked_call
+    from ttt.subproc import checked_call, streamed_call
+
+    result = BuildResult()
+    log = None
+    stats = compiler_cache.stats() if compiler_cache is not None else None
 
-    for command_generator in commands:
-        command = command_generator()
-        if command:  # Note that command may be None (or empty list)
+    def surface(diagnostic):
+        lines = ["### First error: " + condense(diagnostic)] + diagnostic.context
+        for line in lines:
             if term:
-                term.writeln(f"execute: {command}", verbose=1)
-            rc = 0
-            try:
-                rc = checked_call(command, stderr=subprocess.STDOUT)
-            except subprocess.CalledProcessError as error:
-                rc = error.returncode
-            if command_log is not None:
-                command_log.append((command, rc))
-        else:
-            if command_log is not None:
-                command_log.append(None)
+                term.writeln(line, decorator=[termstyle.red])
+            else:
+                sys.stdout.write(line + os.linesep)
+                sys.stdout.flush()
+
+    parser = DiagnosticParser(on_first_error=surface)
+    streamed = (
+        listener is not None or log_path is not None or abort_on_error or condensed
+    )
+
+    def relay(channel, line):
+        diagnostic = parser(channel, line)
+        if term:
+            term.writeln(line, verbose=1 if condensed and diagnostic is None else 0)
+        elif diagnostic is not None or not condensed:
+            channel.write(line + os.linesep)
+            channel.flush()
+        if log is not None:
+            log.write(line + "\n")
+        if listener is not None:
+            listener(channel, line)
+
+    try:
+        for command_generator in commands:
+            command = command_generator()
+            if command:  # Note that command may be None (or empty list)
+                if term:
+                    term.writeln(f"execute: {command}", verbose=1)
+                if phase is not None and getattr(command_generator, "phase", None):
+                    phase(command_generator.phase)
+                rc = None
+                completed = getattr(command_generator, "completed", None)
+                try:
+                    if log is None and log_path is not None:
+                        # Opened only now since a command generator may have
+                        # removed the build area.
+                        os.makedirs(os.path.dirname(log_path), exist_ok=True)
+                        log = open(log_path, "w")
+                    start = timer()
+                    if streamed:
+                        try:
+                            rc, _, _ = streamed_call(
+                                command,
+                                listener=relay,
+                                watchdog=(
+                                    parser.first_error_seen if abort_on_error else None
+                                ),
+                            )
+                        except subprocess.TimeoutExpired:
+                            rc = ABORTED
+                    else:
+                        if term:
+                            # the command writes to the same output
+                            term.flush()
+                        try:
+                            rc = checked_call(command, stderr=subprocess.STDOUT)
+                        except subprocess.CalledProcessError as error:
+                            rc = error.returncode
+                finally:
+                    # also when the command could not run or was cancelled,
+                    # in which case rc is None
+                    if completed is not None:
+                        completed(rc)
+                result.steps.append(
+                    BuildStep(
+                        command,
+                        rc,
+                        timer() - start,
+                        log_path,
+                        start,
+                        getattr(command_generator, "phase", None),
+                    )
+                )
+                if command_log is not None:
+                    command_log.append((command, rc))
+                if rc != 0:
+                    break
+            else:
+                if command_log is not None:
+                    command_log.append(None)
+    finally:
+        if log is not None:
+            log.close()
+    parser.complete()
+    result.first_error = parser.first_error
+    result.errors = parser.errors
+    result.warnings = parser.warnings
+    if stats is not None:
+        result.compiler_cache = compiler_cache.difference(stats)
+    return result
 
 
 GENERATED = ["Makefile", "build.ninja", "*.sln"]
 
+# Discarded build areas are renamed to <build path><TRASH_INFIX><suffix>.
+TRASH_INFIX = ".ttt-trash-"
+_trash_sequence = itertools.count()
+
+# The files in the source tree that cmake reads when configuring.
+CONFIGURE_INPUT_NAMES = ["CMakeLists.txt", "conanfile.txt", "conanfile.py"]
+CONFIGURE_INPUT_SUFFIX = ".cmake"
+
+
+def is_configure_input(filename):
+    return filename in CONFIGURE_INPUT_NAMES or filename.endswith(
+        CONFIGURE_INPUT_SUFFIX
+    )
+
+
+def generated(build_path):
+    """Indicates whether cmake has generated the build files in a build
+    area."""
+    for f in GENERATED:
+        if glob.glob(os.path.join(build_path, f)):
+            return True
+    return False
+
 
 def cmake_clean(build_path, defines, always_clean):
     def cmake_build_area_outdated():
         # If cmake had not generated a build file, recreate the build area.
-        generated = []
-        for f in GENERATED:
-            generated += glob.glob(os.path.join(build_path, f))
-            if generated:
-                break
-        if len(generated) == 0:
+        if not generated(build_path):
             return True
 
         # If the cmake version has changed since the build area was created,
@@ -144,28 +418,82 @@ def cmake_clean(build_path, defines, always_clean):
         return False
 
     if os.path.exists(build_path) and (always_clean or cmake_build_area_outdated()):
-        shutil.rmtree(build_path)
+        discard(build_path)
     return []
 
 
+def trash_paths(build_path):
+    """Gets the build areas discarded from a build path that have not yet been
+    removed."""
+    return glob.glob(glob.escape(build_path) + TRASH_INFIX + "*")
+
+
+def discard(path):
+    """Removes a directory without waiting for its contents to be deleted.
+
+    The directory is renamed aside, which is immediate, and deleted on a
+    background thread. A directory that cannot be renamed is deleted in the
+    foreground.
+
+    :return the thread deleting the directory, or None if it has been deleted
+    """
+    trash_path = "{}{}{}-{}".format(
+        path, TRASH_INFIX, os.getpid(), next(_trash_sequence)
+    )
+    try:
+        os.rename(path, trash_path)
+    except OSError:
+        shutil.rmtree(path)
+        return None
+    return remove_in_background([trash_path])
+
+
+def remove_in_background(paths):
+    """Deletes directories on a background thread.
+
+    The thread does not keep ttt running. Any directory left partly deleted
+    when ttt exits is removed by the next ttt that uses the build path.
+
+    :return the thread
+    """
+
+    def remove():
+        for path in paths:
+            shutil.rmtree(path, ignore_errors=True)
+
+    thread = threading.Thread(target=remove, daemon=True)
+    thread.start()
+    return thread
+
+
 def uses_conan(watch_path):
     conanfile_py = os.path.join(watch_path, "conanfile.py")
     conanfile_txt = os.path.join(watch_path, "conanfile.txt")
     return os.path.exists(conanfile_py) or os.path.exists(conanfile_txt)
 
 
-def cmake_pregenerate(watch_path, build_path):
-    # set up conan-cmake if the build requires it
+def cmake_pregenerate(watch_path, build_path, provider=None, cache=None):
+    """Sets up conan-cmake if the build requires it.
+
+    The provider script is taken from the user cache, which is shared by
+    every build area, and is only downloaded when the cache does not have it.
+
+    :param provider: (optional) the path of a local copy of the provider to
+        seed the cache with. By default, $TTT_CONAN_PROVIDER.
+    :param cache: (optional) the :class:`ContentCache` holding the provider.
+        By default, the user's.
+    """
     if uses_conan(watch_path):
-        conan_cmake_git = f"{CONAN_CMAKE_REPO}/{CONAN_CMAKE}"
         conan_cmake_path = os.path.join(build_path, CONAN_CMAKE)
         if not os.path.exists(build_path):
             os.mkdir(build_path)
         if not os.path.exists(conan_cmake_path):
-            response = requests.get(conan_cmake_git)
-            response.raise_for_status()
-            with open(conan_cmake_path, "wb") as file:
-                file.write(response.content)
+            usercache.copy(
+                f"{CONAN_CMAKE_REPO}/{CONAN_CMAKE}",
+                conan_cmake_path,
+                cache=cache,
+                seed=provider or os.environ.get(CONAN_PROVIDER_ENV),
+            )
     return []
 
 
@@ -224,7 +552,156 @@ def cmake_generate(watch_path, build_path, build_config, generator, defines):
     return command
 
 
-def cmake_build(build_path, build_config):
+def read_cmake_cache(build_path, *names):
+    """Reads the values of entries from a build area's CMakeCache.txt.
+
+    :param names: the names of the entries, e.g. CMAKE_COMMAND
+    :return dict of entry name to value for the entries found
+    """
+    values = {}
+    try:
+        with open(os.path.join(build_path, "CMakeCache.txt"), "r") as f:
+            for line in f:
+                name, _, value = line.rstrip().partition("=")
+                name = name.partition(":")[0]
+                if name in names:
+                    values[name] = value
+    except OSError:
+        pass
+    return values
+
+
+class Configure(object):
+    """The cmake configure step, which is skipped when nothing that affects
+    the configuration has changed since the last successful configure.
+
+    The configuration is affected by the files cmake reads (CMakeLists.txt,
+    *.cmake, the conanfile), the configure command (and so the generator,
+    build type, and defines), and the cmake that created the build area. These
+    are recorded in the ttt state directory of the build area when configure
+    succeeds.
+
+    Skipping is safe even if an input is missed because the generated build
+    system reruns cmake itself when the files it was generated from change.
+
+    The parameters are as for cmake_generate, with the addition of:
+
+    :param inputs: (optional) a callable giving a dict of the absolute paths
+        of the configure input files to their modification times
+    :param term: (optional) output stream for verbose output
+    """
+
+    phase = "configure"
+
+    def __init__(
+        self,
+        watch_path,
+        build_path,
+        build_config,
+        generator,
+        defines,
+        inputs=None,
+        term=None,
+    ):
+        self.watch_path = watch_path
+        self.build_path = build_path
+        self.build_config = build_config
+        self.generator = generator
+        self.defines = defines
+        self.inputs = inputs if inputs is not None else self.scan_inputs
+        self.term = term
+        self._configuration = None
+
+    def __call__(self):
+        command = cmake_generate(
+            self.watch_path,
+            self.build_path,
+            self.build_config,
+            self.generator,
+            self.defines,
+        )
+        configuration = {
+            "command": command,
+            "files": {
+                path: mtime
+                for path, mtime in self.inputs().items()
+                if is_configure_input(os.path.basename(path))
+            },
+            "cmake": self.cmake_identity(),
+        }
+        reason = self.reconfigure_reason(configuration)
+        if reason is None:
+            self._configuration = None
+            return None
+        if self.term:
+            self.term.writeln(f"configure: {reason}")
+        self._configuration = configuration
+        return command
+
+    def completed(self, returncode):
+        path = state_path(self.build_path, "configure.json")
+        if returncode == 0 and self._configuration is not None:
+            # The cmake that created the build area is only known once it has
+            # configured a fresh area.
+            self._configuration["cmake"] = self.cmake_identity()
+            save_json(path, self._configuration)
+        elif os.path.exists(path):
+            os.remove(path)
+
+    def reconfigure_reason(self, configuration):
+        """Compares a configuration with the last successful one.
+
+        :return a description of why cmake must configure again, or None if
+        it need not
+        """
+        if not generated(self.build_path):
+            return "no build system has been generated"
+        last = load_json(state_path(self.build_path, "configure.json"), None)
+        if last is None:
+            return "no previous configuration is recorded"
+        if last.get("command") != configuration["command"]:
+            return "the configure command changed"
+        if last.get("cmake") != configuration["cmake"]:
+            return "cmake changed"
+        last_files = last.get("files", {})
+        files = configuration["files"]
+        for path in sorted(set(last_files) | set(files)):
+            if path not in files:
+                return f"{path} was removed"
+            if path not in last_files:
+                return f"{path} was added"
+            if files[path] != last_files[path]:
+                return f"{path} changed"
+        return None
+
+    def cmake_identity(self):
+        """Identifies the cmake that created the build area, by its version
+        and its executable."""
+        cache = read_cmake_cache(
+            self.build_path,
+            "CMAKE_COMMAND",
+            "CMAKE_CACHE_MAJOR_VERSION",
+            "CMAKE_CACHE_MINOR_VERSION",
+            "CMAKE_CACHE_PATCH_VERSION",
+        )
+        version = ".".join(
+            cache.get(f"CMAKE_CACHE_{part}_VERSION", "")
+            for part in ("MAJOR", "MINOR", "PATCH")
+        )
+        command = cache.get("CMAKE_COMMAND")
+        return [version, None if command is None else binary_identity(command)]
+
+    def scan_inputs(self):
+        from ttt.watcher import EXCLUSIONS, walk
+
+        return {
+            os.path.join(d, f): mtime
+            for d, f, _, mtime in walk(self.watch_path, EXCLUSIONS)
+            if is_configure_input(f)
+        }
+
+
+def cmake_build(build_path, build_config, parallel=None):
     """Generates the cmake command to (re)build the build area.
 
     This is the call to the platform's compiler.
@@ -232,6 +709,8 @@ def cmake_build(build_path, build_config):
     :param build_path: the absolute root directory path where build objects and
         binaries are output during compilation
     :param build_config: indicates the type of build, e.g. release, debug
+    :param parallel: (optional) the number of concurrent build jobs. By
+        default, the generated build system decides.
     :return: command to execute as a subprocess in list form
     """
     if build_config is None:
@@ -242,8 +721,189 @@ def cmake_build(build_path, build_config):
         "--build",
         build_path,
     ]
+    if parallel:
+        command.append("--parallel")
+        command.append(str(parallel))
     # Necessary for multi-configuration build systems, e.g. MSVC
     # and should be harmless otherwise
     command.append("--config")
     command.append(build_config)
     return command
+
+
+class SlottedBuild(object):
+    """The cmake build step, run with as many jobs as there are job slots
+    free.
+
+    At least one slot is waited for. The slots are held until the build
+    completes. Unless there is only one, a slot is always left for the others
+    sharing the slots, e.g. the test binaries of a pipelined build.
+
+    :param build_path: as for cmake_build
+    :param build_config: as for cmake_build
+    :param job_slots: the :class:`JobSlots`
+    :param parallel: (optional) the most jobs to run. By default, as many as
+        there are slots less one.
+    """
+
+    phase = "build"
+
+    def __init__(self, build_path, build_config, job_slots, parallel=None):
+        self.build_path = build_path
+        self.build_config = build_config
+        self.job_slots = job_slots
+        self.parallel = parallel
+        self._held = []
+
+    def __call__(self):
+        most = max(1, self.job_slots.count - 1)
+        if self.parallel:
+            most = min(most, self.parallel)
+        self._held = self.job_slots.acquire(most)
+        return cmake_build(self.build_path, self.build_config, len(self._held))
+
+    def completed(self, returncode):
+        self.job_slots.release(self._held)
+
+
+def cpu_count():
+    """Gets the number of cores this process may run on."""
+    if hasattr(os, "sched_getaffinity"):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+class CompilerCache(object):
+    """A compiler launcher that caches compilation results.
+
+    :param path: the path of the ccache or sccache executable
+    """
+
+    def __init__(self, path):
+        self.path = path
+
+    def is_sccache(self):
+        return os.path.basename(self.path).lower().startswith("sccache")
+
+    def stats(self):
+        """Gets the total hits and misses of the cache.
+
+        :return (hits, misses), or None if they cannot be read
+        """
+        from ttt.subproc import execute
+
+        if self.is_sccache():
+            command = [self.path, "--show-stats", "--stats-format=json"]
+            parse = parse_sccache_stats
+        else:
+            command = [self.path, "--print-stats"]
+            parse = parse_ccache_stats
+        try:
+            return parse(execute(command, stderr=subprocess.DEVNULL))
+        except (OSError, subprocess.CalledProcessError):
+            return None
+
+    def difference(self, before):
+        """Gets the hits and misses of the cache since an earlier stats().
+
+        :return (hits, misses), or None if they cannot be read
+        """
+        after = self.stats()
+        if before is None or after is None:
+            return None
+        return (after[0] - before[0], after[1] - before[1])
+
+
+def parse_ccache_stats(lines):
+    """Parses the output of ccache --print-stats, which is a line of
+    counter<tab>value per counter."""
+    counters = {}
+    for line in lines:
+        name, _, value = line.partition("\t")
+        if value.strip().isdigit():
+            counters[name.strip()] = int(value)
+    if not counters:
+        return None
+    hits = counters.get("direct_cache_hit", 0) + counters.get(
+        "preprocessed_cache_hit", 0
+    )
+    return (hits, counters.get("cache_miss", 0))
+
+
+def parse_sccache_stats(lines):
+    """Parses the output of sccache --show-stats --stats-format=json."""
+    try:
+        stats = json.loads("\n".join(lines))["stats"]
+    except (ValueError, KeyError, TypeError):
+        return None
+
+    def total(name):
+        return sum(stats.get(name, {}).get("counts", {}).values())
+
+    return (total("cache_hits"), total("cache_misses"))
+
+
+def find_compiler_cache():
+    """Finds an installed compiler cache, preferring sccache."""
+    for name in COMPILER_CACHES:
+        path = shutil.which(name)
+        if path:
+            return CompilerCache(path)
+    return None
+
+
+class LinkDetector(object):
+    """Identifies the test executables that have finished linking from the
+    output of a build as it happens.
+
+    :param build_path: the absolute root directory path where build objects and
+        binaries are output during compilation
+    :param testfiles: dict of the file names of the expected test executables
+        to their relative source paths
+    """
+
+    def __init__(self, build_path, testfiles):
+        self.build_path = build_path
+        self.testfiles = testfiles
+
+    def __call__(self, line):
+        """Checks a line of build output for a completed test executable.
+
+        :return list of (relative source path, absolute executable path)
+        tuples for the test executables completed
+        """
+        from ttt.watcher import EXE_SUFFIX
+
+        match = NINJA_LINKED_RE.match(line)
+        if match:
+            path = os.path.normpath(os.path.join(self.build_path, match.group(1)))
+            name = os.path.basename(path)
+            if name in self.testfiles and os.path.exists(path):
+                return [(self.testfiles[name], path)]
+            return []
+
+        match = MAKE_BUILT_TARGET_RE.search(line)
+        if match:
+            name = match.group(1) + EXE_SUFFIX
+            if name in self.testfiles:
+                path = self.locate(name)
+                if path is not None:
+                    return [(self.testfiles[name], path)]
+        return []
+
+    def locate(self, name):
+        """Finds a test executable in the build area.
+
+        CMake usually mirrors the source tree in the build area, so the
+        executable is first looked for where its source would be.
+        """
+        from ttt.watcher import walk
+
+        relpath = self.testfiles[name]
+        path = os.path.join(self.build_path, os.path.dirname(relpath), name)
+        if os.path.exists(path):
+            return path
+        for d, f, m, _ in walk(self.build_path):
+            if f == name and m & stat.S_IXUSR:
+                return os.path.join(d, f)
+        return None
@@ -0,0 +1,255 @@
+"""
+ttt.buildtime
+~~~~~~~~~~~~
+This module implements the profiling of build times.
+
+After each build, the timing data left in the build area by the build tools
+is read to find where the build spent its time. Ninja records the start and
+end of every command it runs in .ninja_log. Clang, when given -ftime-trace,
+writes a trace of each compilation beside its object file.
+
+Only the entries added by the build just completed are considered. The total
+of each build is kept so that a trend can be shown across builds.
+:copyright: (c) yerejm
+"""
+
+import os
+
+from ttt.cache import load_json, save_json, state_path
+
+NINJA_LOG = ".ninja_log"
+OBJECT_SUFFIXES = (".o", ".obj")
+# The -ftime-trace events that give the time spent in each half of a
+# compilation.
+TIME_TRACE_PHASES = ("Total Frontend", "Total Backend")
+# The most bytes read from the end of the .ninja_log before a build to note
+# its last entry, which is where the entries of the build begin.
+MARK_LENGTH = 512
+# The number of builds kept for the trend.
+HISTORY_LENGTH = 20
+
+
+class BuildProfile(object):
+    """The time spent by a single build.
+
+    :param targets: a list of (target, seconds) tuples, longest first
+    :param files: a list of (file, seconds) tuples, longest first
+    :param phases: a dict of file to a dict of compilation phase to seconds,
+        for the files that have compiler timing data
+    :param total: the total seconds of all the commands run by the build.
+        This exceeds the elapsed time of a parallel build.
+    :param trend: a list of the totals of earlier builds, oldest first
+    """
+
+    def __init__(self, targets, files, phases, total, trend):
+        self.targets = targets
+        self.files = files
+        self.phases = phases
+        self.total = total
+        self.trend = trend
+
+    def top_targets(self, count):
+        return self.targets[:count]
+
+    def top_files(self, count):
+        return self.files[:count]
+
+
+def parse_ninja_log(lines):
+    """Parses the lines of a .ninja_log.
+
+    :return a dict of output path to seconds taken to produce it. An output
+    produced more than once is given its last time.
+    """
+    entries = {}
+    for line in lines:
+        if line.startswith("#"):
+            continue
+        fields = line.rstrip("\n").split("\t")
+        if len(fields) < 4:
+            continue
+        try:
+            start, end = int(fields[0]), int(fields[1])
+        except ValueError:
+            continue
+        entries[fields[3]] = (end - start) / 1000.0
+    return entries
+
+
+def split_output(output):
+    """Identifies the target an output belongs to, and the source file it
+    was compiled from if it is an object file.
+
+    cmake places the objects of a target under CMakeFiles/<target>.dir/ named
+    after their source file, e.g. CMakeFiles/core.dir/src/core.cc.o.
+
+    :return (target, source) where source is None if the output is not an
+    object file
+    """
+    parts = output.replace("\\", "/").split("/")
+    for i, part in enumerate(parts):
+        if part.endswith(".dir") and i > 0 and parts[i - 1] == "CMakeFiles":
+            target = part[: -len(".dir")]
+            source = "/".join(parts[i + 1 :])
+            for suffix in OBJECT_SUFFIXES:
+                if source.endswith(suffix):
+                    return target, source[: -len(suffix)]
+            return target, None
+    target = os.path.splitext(parts[-1])[0]
+    if target.startswith("lib"):
+        target = target[len("lib") :]
+    return target, None
+
+
+def read_time_trace(path):
+    """Reads the compilation phase times from a -ftime-trace file.
+
+    :return a dict of phase name to seconds, empty if there is no trace
+    """
+    trace = load_json(path, {})
+    phases = {}
+    events = trace.get("traceEvents", []) if isinstance(trace, dict) else []
+    for event in events:
+        name = event.get("name")
+        if name in TIME_TRACE_PHASES:
+            phases[name] = phases.get(name, 0) + event.get("dur", 0) / 1e6
+    return phases
+
+
+def time_trace_path(object_path):
+    """Gets the path of the -ftime-trace file written for an object file.
+
+    Clang replaces the object suffix, e.g. core.cc.o is traced in core.cc.json.
+    """
+    return os.path.splitext(object_path)[0] + ".json"
+
+
+class BuildProfiler(object):
+    """Profiles the builds in a build area.
+
+    mark() is called before each build and collect() after it.
+
+    :param build_path: the build area
+    :param history_path: (optional) the file in which the totals of earlier
+        builds are persisted. By default, the history is held only in memory.
+    """
+
+    def __init__(self, build_path, history_path=None):
+        self.build_path = build_path
+        self.history_path = history_path
+        self.history = load_json(history_path, [])
+        self._offset = 0
+        self._tail = b""
+
+    def mark(self):
+        """Notes where the timing data of the next build begins."""
+        self._offset = 0
+        self._tail = b""
+        try:
+            with open(os.path.join(self.build_path, NINJA_LOG), "rb") as f:
+                f.seek(0, os.SEEK_END)
+                self._offset = f.tell()
+                f.seek(max(0, self._offset - MARK_LENGTH))
+                tail = f.read()
+                # Only the last entry, since recompaction drops duplicates.
+                self._tail = tail[tail.rfind(b"\n", 0, len(tail) - 1) + 1 :]
+        except OSError:
+            pass
+
+    def collect(self):
+        """Reads the timing data of the build since the last mark().
+
+        :return a :class:`BuildProfile`, or None if the build left no timing
+        data, e.g. it did not use ninja or did not run any command
+        """
+        entries = self.read_entries()
+        if not entries:
+            return None
+
+        targets = {}
+        files = {}
+        phases = {}
+        for output, seconds in entries.items():
+            target, source = split_output(output)
+            targets[target] = targets.get(target, 0) + seconds
+            if source is not None:
+                files[source] = files.get(source, 0) + seconds
+                trace = read_time_trace(
+                    time_trace_path(os.path.join(self.build_path, output))
+                )
+                if trace:
+                    phases[source] = trace
+
+        total = sum(entries.values())
+        profile = BuildProfile(
+            sorted(targets.items(), key=lambda item: item[1], reverse=True),
+            sorted(files.items(), key=lambda item: item[1], reverse=True),
+            phases,
+            total,
+            list(self.history),
+        )
+        self.history = (self.history + [total])[-HISTORY_LENGTH:]
+        save_json(self.history_path, self.history)
+        return profile
+
+    def read_entries(self):
+        try:
+            with open(os.path.join(self.build_path, NINJA_LOG), "rb") as f:
+                start = max(0, self._offset - len(self._tail))
+                f.seek(start)
+                if f.read(len(self._tail)) == self._tail:
+                    data = f.read()
+                else:
+                    # The log was rewritten, either because the build area
+                    # was recreated or because ninja recompacted it. The
+                    # entries of this build follow the last entry seen before
+                    # it, if that entry survived.
+                    f.seek(0)
+                    data = f.read()
+                    end = data.rfind(self._tail) if self._tail else -1
+                    if end >= 0:
+                        data = data[end + len(self._tail) :]
+        except OSError:
+            return {}
+        return parse_ninja_log(data.decode("utf-8", "replace").splitlines())
+
+
+def create_profiler(build_path):
+    return BuildProfiler(build_path, state_path(build_path, "buildtime.json"))
+
+
+def format_trend(trend, total):
+    """Describes how a build total compares with the builds before it."""
+    if not trend:
+        return "first profiled build"
+    previous = trend[-1]
+    average = sum(trend) / len(trend)
+    return "{:+.3f}s on last build, {:+.3f}s on average of {} builds".format(
+        total - previous, total - average, len(trend)
+    )
+
+
+def summarise(profile, count):
+    """Produces the lines describing the top offenders of a build.
+
+    :param profile: the :class:`BuildProfile`
+    :param count: the number of targets and files to list
+    """
+    lines = [
+        "Build time: {:.3f}s ({})".format(
+            profile.total, format_trend(profile.trend, profile.total)
+        )
+    ]
+    for target, seconds in profile.top_targets(count):
+        lines.append("  target {:10.3f}s {}".format(seconds, target))
+    for source, seconds in profile.top_files(count):
+        detail = ""
+        if source in profile.phases:
+            detail = " ({})".format(
+                ", ".join(
+                    "{} {:.3f}s".format(name.split()[-1].lower(), phase_seconds)
+                    for name, phase_seconds in sorted(profile.phases[source].items())
+                )
+            )
+        lines.append("  file   {:10.3f}s {}{}".format(seconds, source, detail))
+    return lines
@@ -0,0 +1,343 @@
+"""
+ttt.cache
+~~~~~~~~~~~~
+This module implements the caches of information derived from test binaries.
+Entries are keyed by the identity of the binary so that they remain valid
+until the binary is relinked.
+
+Caches may be persisted under the ttt state directory in the build area so
+that they survive across ttt sessions.
+:copyright: (c) yerejm
+"""
+
+import hashlib
+import json
+import os
+import platform
+
+# The directory under the build area where ttt keeps its own state.
+STATE_DIRECTORY = ".ttt"
+
+if platform.system() == "Windows":
+    SHARED_LIBRARY_SUFFIXES = (".dll",)
+elif platform.system() == "Darwin":
+    SHARED_LIBRARY_SUFFIXES = (".dylib", ".so")
+else:
+    SHARED_LIBRARY_SUFFIXES = (".so",)
+
+# The files of the build system generated by cmake. They are rewritten when
+# the build system is regenerated, which is when the libraries built can
+# change.
+GENERATED_FILES = ("CMakeCache.txt", "build.ninja", "Makefile")
+NINJA_LOG = ".ninja_log"
+
+
+def state_path(build_path, *names):
+    """Gets the path of a file in the ttt state directory of a build area."""
+    return os.path.join(build_path, STATE_DIRECTORY, *names)
+
+
+def binary_identity(path):
+    """Gets the identity of a file as known to the file system.
+
+    The identity changes whenever the file is replaced or rewritten, e.g. when
+    a test binary is relinked.
+
+    :param path: the path to the file
+    :return [device, inode, size, modified time in ns] or None if the file
+    does not exist
+    """
+    try:
+        filestat = os.stat(path)
+    except OSError:
+        return None
+    return [
+        filestat.st_dev,
+        filestat.st_ino,
+        filestat.st_size,
+        filestat.st_mtime_ns,
+    ]
+
+
+def is_shared_library(name):
+    return name.endswith(SHARED_LIBRARY_SUFFIXES) or ".so." in name
+
+
+def shared_libraries(build_path):
+    """Finds the shared libraries built in a build area by walking it.
+
+    Only the files named as shared libraries are looked at.
+
+    :return a sorted list of paths
+    """
+    if build_path is None or not os.path.exists(build_path):
+        return []
+    paths = []
+    for dirpath, dirnames, filenames in os.walk(build_path):
+        dirnames[:] = [d for d in dirnames if d != STATE_DIRECTORY]
+        paths.extend(
+            os.path.normpath(os.path.join(dirpath, f))
+            for f in filenames
+            if is_shared_library(f)
+        )
+    return sorted(paths)
+
+
+class SharedLibraries(object):
+    """Maintains the shared libraries built in a build area.
+
+    Any test binary may load any of these, so together they form part of the
+    inputs of every test binary. Libraries outside the build area are not
+    expected to change between test sessions and are not considered.
+
+    Walking a large build area is slow, so the paths of the libraries are
+    kept between test sessions and only they are looked at. The build area is
+    walked again when the build system is regenerated. With ninja, the
+    libraries built since the last session are also taken from the entries
+    added to its log.
+
+    :param build_path: the build area
+    :param path: (optional) the file in which the paths are persisted. By
+        default, they are held only in memory.
+    """
+
+    def __init__(self, build_path, path=None):
+        self.build_path = build_path
+        self.path = path
+        state = load_json(path, {})
+        self._generation = state.get("generation")
+        self._libraries = set(state.get("libraries", []))
+        self._ninja_log = state.get("ninja_log", 0)
+
+    def identities(self):
+        """Gets the identities of the shared libraries.
+
+        A library that has gone is given no identity.
+
+        :return a sorted list of [path, identity] pairs
+        """
+        if self.build_path is None:
+            return []
+        offset = self._ninja_log
+        generation = fingerprint(
+            [
+                binary_identity(os.path.join(self.build_path, name))
+                for name in GENERATED_FILES
+            ]
+        )
+        changed = generation != self._generation
+        if changed:
+            self._generation = generation
+            self._libraries = set(shared_libraries(self.build_path))
+        built = self.built() - self._libraries
+        if built:
+            self._libraries |= built
+            changed = True
+        if changed or offset != self._ninja_log:
+            save_json(
+                self.path,
+                {
+                    "generation": self._generation,
+                    "libraries": sorted(self._libraries),
+                    "ninja_log": self._ninja_log,
+                },
+            )
+        return [[path, binary_identity(path)] for path in sorted(self._libraries)]
+
+    def built(self):
+        """Gets the shared libraries in the entries added to the ninja log
+        since it was last read.
+
+        :return a set of paths
+        """
+        from ttt.buildtime import parse_ninja_log
+
+        try:
+            with open(os.path.join(self.build_path, NINJA_LOG), "rb") as f:
+                offset = self._ninja_log
+                if f.seek(0, os.SEEK_END) < offset:
+                    # ninja rewrites its log when it grows too long
+                    offset = 0
+                f.seek(offset)
+                data = f.read()
+        except OSError:
+            return set()
+        # an entry still being written is read next time
+        end = data.rfind(b"\n") + 1
+        self._ninja_log = offset + end
+        outputs = parse_ninja_log(data[:end].decode("utf-8", "replace").splitlines())
+        return set(
+            os.path.normpath(os.path.join(self.build_path, output))
+            for output in outputs
+            if is_shared_library(os.path.basename(output))
+        )
+
+
+def fingerprint(*parts):
+    """Gets a digest of JSON serialisable parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def load_json(path, default):
+    """Reads a JSON file, giving the default if it is missing or corrupt."""
+    if path is None:
+        return default
+    try:
+        with open(path, "r") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return default
+
+
+def save_json(path, data):
+    """Writes a JSON file such that readers never see a partial file."""
+    if path is None:
+        return
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    temp_path = "{}.{}".format(path, os.getpid())
+    with open(temp_path, "w") as f:
+        json.dump(data, f)
+    os.replace(temp_path, path)
+
+
+class Catalogue(object):
+    """Maintains the names of the tests contained in each test binary.
+
+    A binary is only asked for its tests (via --gtest_list_tests) when it has
+    not been seen before or when it has been relinked since it was last asked.
+    The tests of a binary are also brought up to date by each run of all of
+    them, so a binary that has run since it was relinked need not be asked.
+
+    :param path: (optional) the file in which the catalogue is persisted. By
+        default, the catalogue is held only in memory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = load_json(path, {})
+        self._dirty = False
+
+    def tests(self, test):
+        """Gets the names of the tests in a test binary.
+
+        :param test: the :class:`GTest` object for the binary
+        :return a list of test names in testcase.test form
+        """
+        executable = test.executable()
+        identity = binary_identity(executable)
+        entry = self._entries.get(executable)
+        if entry is not None and entry["identity"] == identity:
+            return entry["tests"]
+
+        tests = test.list_tests()
+        self._entries[executable] = {"identity": identity, "tests": tests}
+        self._dirty = True
+        return tests
+
+    def put(self, test, tests):
+        """Records the names of the tests in a test binary, e.g. those seen in
+        a run of all of its tests.
+
+        :param test: the :class:`GTest` object for the binary
+        :param tests: a list of test names in testcase.test form
+        """
+        executable = test.executable()
+        entry = {"identity": binary_identity(executable), "tests": list(tests)}
+        if self._entries.get(executable) != entry:
+            self._entries[executable] = entry
+            self._dirty = True
+
+    def save(self):
+        """Persists the catalogue if it has changed since it was loaded."""
+        if self._dirty:
+            save_json(self.path, self._entries)
+            self._dirty = False
+
+
+class ResultCache(object):
+    """Maintains the results of test binaries that passed, so that a binary
+    need not be run again until it or its inputs change.
+
+    The fingerprint of a binary covers its own identity, the identities of
+    the shared libraries in the build area, and the environment that ttt runs
+    the binary with.
+
+    :param path: (optional) the file in which the cache is persisted. By
+        default, the cache is held only in memory.
+    :param build_path: (optional) the build area whose shared libraries are
+        the dependencies of the test binaries. These are persisted next to the
+        cache.
+    """
+
+    def __init__(self, path=None, build_path=None):
+        self.path = path
+        self.build_path = build_path
+        self.libraries = SharedLibraries(
+            build_path,
+            (
+                None
+                if path is None
+                else os.path.join(os.path.dirname(path), "libraries.json")
+            ),
+        )
+        self._entries = load_json(path, {})
+        self._inputs = None
+        self._fingerprints = {}
+        self._dirty = False
+
+    def refresh(self):
+        """Takes a snapshot of the inputs shared by every test binary."""
+        self._inputs = fingerprint(
+            self.libraries.identities(), sorted(os.environ.items())
+        )
+
+    def fingerprint(self, test):
+        if self._inputs is None:
+            self.refresh()
+        return fingerprint(binary_identity(test.executable()), self._inputs)
+
+    def get(self, test):
+        """Gets the cached results of a test binary.
+
+        The inputs are looked at afresh for each binary, since a pipelined
+        build may still be relinking them. The fingerprint taken is the one
+        that put() records for the binary.
+
+        :param test: the :class:`GTest` object for the binary
+        :return a Dict() of passes and run_time, or None if the binary has
+        changed since it last passed
+        """
+        self.refresh()
+        executable = test.executable()
+        current = self._fingerprints[executable] = self.fingerprint(test)
+        entry = self._entries.get(executable)
+        if entry is not None and entry["fingerprint"] == current:
+            return entry
+        return None
+
+    def put(self, test):
+        """Records the results of a test binary if all of its tests passed and
+        the binary itself exited cleanly."""
+        executable = test.executable()
+        taken = self._fingerprints.pop(executable, None)
+        if test.fails() == 0 and test.returncode() == 0:
+            self._entries[executable] = {
+                "fingerprint": taken or self.fingerprint(test),
+                "passes": test.passes(),
+                "run_time": test.run_time(),
+            }
+            self._dirty = True
+        elif self._entries.pop(executable, None) is not None:
+            self._dirty = True
+
+    def clear(self):
+        """Forgets all results so that every binary is run again."""
+        if self._entries:
+            self._entries = {}
+            self._dirty = True
+
+    def save(self):
+        """Persists the cache if it has changed since it was loaded."""
+        if self._dirty:
+            save_json(self.path, self._entries)
+            self._dirty = False
@@ -1,8 +1,30 @@
+import sys
+
 import click
 
-from ttt import monitor
-from ttt.terminal import Terminal
-from . import __progname__, __version__
+from ttt import options
+from . import __progname__
+
+
+def show_version(ctx, param, value):
+    """Prints the version, which is only looked up when it is asked for."""
+    if not value or ctx.resilient_parsing:
+        return
+    from ttt import __version__
+
+    click.echo(f"{__progname__}, version {__version__}")
+    ctx.exit()
+
+
+def version_option():
+    return click.option(
+        "--version",
+        is_flag=True,
+        expose_value=False,
+        is_eager=True,
+        callback=show_version,
+        help="Show the version and exit.",
+    )
 
 
 @click.command()
@@ -10,7 +32,7 @@ from . import __progname__, __version__
 @click.argument(
     "filename",
     nargs=-1,
-    default=monitor.DEFAULT_SOURCE_PATTERNS,
+    default=options.DEFAULT_SOURCE_PATTERNS,
 )
 @click.option(
     "--build-path",
@@ -34,7 +56,19 @@ from . import __progname__, __version__
     help="cmake generator: refer to cmake documentation",
 )
 @click.option(
-    "--config", default="Debug", help="build configuration: e.g. Release, Debug."
+    "--config",
+    multiple=True,
+    default=["Debug"],
+    help="build configuration: e.g. Release, Debug. Repeatable to build and "
+    "test several configurations concurrently, each in its own build area. "
+    "Give NAME=BUILD_TYPE,DEFINE,... for a named configuration with its own "
+    "-D defines, e.g. asan=Debug,SANITIZE=address.",
+)
+@click.option(
+    "--concurrency",
+    type=int,
+    default=None,
+    help="The most configurations built and tested at once. Default: all.",
 )
 @click.option(
     "--clean",
@@ -63,8 +97,174 @@ from . import __progname__, __version__
     multiple=True,
     help="Passed through to CMake as-is as its -Dvar=value options." "Repeatable.",
 )
+@click.option(
+    "--timeout",
+    type=float,
+    default=None,
+    help="Kill a test binary that runs longer than this many seconds.",
+)
+@click.option(
+    "--test-timeout",
+    type=float,
+    default=None,
+    help="Kill a test binary when a single test runs longer than this many "
+    "seconds. The remaining tests are then run.",
+)
+@click.option(
+    "--force",
+    "-f",
+    is_flag=True,
+    default=False,
+    help="Run every test binary, even those unchanged since they last passed.",
+)
+@click.option(
+    "--worker",
+    multiple=True,
+    help="Address of a ttt-worker to distribute test binaries to, either "
+    "host:port, a port on localhost, or a Unix socket path. Repeatable.",
+)
+@click.option(
+    "--worker-token",
+    envvar="TTT_WORKER_TOKEN",
+    default=None,
+    help="The token shared with the ttt-workers. Default: $TTT_WORKER_TOKEN.",
+)
+@click.option(
+    "--preempt",
+    type=click.Choice(list(options.PREEMPT_POLICIES)),
+    default=options.PREEMPT_NEVER,
+    help="In watch mode, the phases of a cycle that are cancelled and "
+    "restarted when further changes are detected: never, test, or always "
+    "(build and test).",
+)
+@click.option(
+    "--pipeline",
+    "-p",
+    is_flag=True,
+    default=False,
+    help="Test each test binary as soon as it is linked while the rest of the "
+    "build continues. Best with the Ninja generator.",
+)
+@click.option(
+    "--fast",
+    is_flag=True,
+    default=False,
+    help="Tune the build for speed: use Ninja for a new build area if it is "
+    "installed, compile through sccache or ccache if either is installed, and "
+    "build on every core.",
+)
+@click.option(
+    "--syntax-check",
+    type=click.Choice(options.SYNTAX_CHECK_MODES),
+    default=options.SYNTAX_CHECK_OFF,
+    help="Check the syntax of the changed source files before the build: off, "
+    "on, or gate to also skip the build when the check fails.",
+)
+@click.option(
+    "--job-slots",
+    type=click.IntRange(min=1),
+    default=None,
+    help="Share this many job slots between every ttt of the user given the "
+    "same number. Builds run as many jobs as there are free slots, leaving "
+    "one, and each test binary takes one slot.",
+)
+@click.option(
+    "--job-slots-dir",
+    type=click.Path(),
+    default=None,
+    help="The directory of the job slots, to share them with other users. "
+    "Default: a directory private to the user.",
+)
+@click.option(
+    "--abort-on-error",
+    is_flag=True,
+    default=False,
+    help="Stop the build as soon as a compiler or linker error is reported.",
+)
+@click.option(
+    "--condensed",
+    is_flag=True,
+    default=False,
+    help="Only show the errors and warnings of the build. The full build "
+    "output is shown with -v, and is always in .ttt/build.log in the build "
+    "area.",
+)
+@click.option(
+    "--build-profile",
+    is_flag=True,
+    default=False,
+    help="Report the targets and files that each build spent the most time "
+    "on. Requires the Ninja generator; compile with clang's -ftime-trace for "
+    "a breakdown of each file.",
+)
+@click.option(
+    "--conan-provider",
+    type=click.Path(exists=True, dir_okay=False),
+    default=None,
+    envvar="TTT_CONAN_PROVIDER",
+    help="A local copy of conan_provider.cmake from cmake-conan to use for "
+    "conan projects instead of downloading it. Either way, it is kept in the "
+    "user cache and shared by every build area.",
+)
+@click.option(
+    "--flush-interval",
+    type=click.FloatRange(min=0),
+    default=options.DEFAULT_FLUSH_INTERVAL,
+    show_default=True,
+    help="Batch the output and write it out at most once in this many "
+    "seconds, and at the end of each session. Reduces the writes made for "
+    "large test runs, e.g. over ssh. 0 writes out every line.",
+)
+@click.option(
+    "--status-line",
+    is_flag=True,
+    default=False,
+    help="Show the progress of each session (phase, test binaries run, tests "
+    "per second, failures, and the time expected to remain) in a status line "
+    "redrawn in place, instead of a . or F per test.",
+)
+@click.option(
+    "--event-log",
+    default=None,
+    metavar="PATH",
+    help="Also write every event of the session (changes, build steps, test "
+    "outcomes and timings, cycle totals) as JSON lines to the file PATH, or to "
+    "the Unix socket listening at PATH when given as unix:PATH.",
+)
+@click.option(
+    "--trace",
+    default=None,
+    metavar="PATH",
+    help="Write a trace of where the time of each cycle goes (scans, build "
+    "phases, test binaries per worker, reporting) to the file PATH in the Chrome "
+    "trace event format, for chrome://tracing or Perfetto.",
+)
+@click.option(
+    "--metrics",
+    default=None,
+    metavar="PORT|HOST:PORT|PATH",
+    help="Expose metrics of the session (scan times, files tracked, changes, "
+    "configure/build/test times, test outcomes, processes started, memory) in "
+    "the Prometheus text format. Served over HTTP on PORT of localhost, or on "
+    "HOST:PORT, or written to the file PATH every 15 seconds.",
+)
+@click.option(
+    "--profile",
+    is_flag=True,
+    default=False,
+    help="Profile ttt itself. The statistics of each cycle are written to the "
+    "state directory of the build area, and the functions that took the most "
+    "time are shown when ttt stops.",
+)
+@click.option(
+    "--profile-memory",
+    is_flag=True,
+    default=False,
+    help="Profile ttt itself as for --profile, and also trace the memory it "
+    "allocates.",
+)
 @click.option("--verbosity", "-v", default=0, count=True, help="More v's more verbose.")
-@click.version_option(version=__version__, prog_name=__progname__)
+@version_option()
 def ttt(
     watch_path,
     filename,
@@ -72,10 +272,33 @@ def ttt(
     exclude,
     generator,
     config,
+    concurrency,
     clean,
     watch,
     test,
     define,
+    timeout,
+    test_timeout,
+    force,
+    worker,
+    worker_token,
+    preempt,
+    pipeline,
+    fast,
+    syntax_check,
+    job_slots,
+    job_slots_dir,
+    abort_on_error,
+    condensed,
+    build_profile,
+    conan_provider,
+    flush_interval,
+    status_line,
+    event_log,
+    trace,
+    metrics,
+    profile,
+    profile_memory,
     verbosity,
 ):
     """Watch, build, and test the WATCH_PATH source area given FILENAME patterns.
@@ -85,10 +308,15 @@ def ttt(
     otherwise they are identified only once.  When files identified by the file
     name or file name patterns are detected to have been added, changed, or
     deleted, this triggers a watch, build, test cycle. If not provided, files
-    matching *.cc, *.c, *.h, and CMakeLists.txt are watched.
+    matching *.cc, *.c, *.h, *.cmake, and CMakeLists.txt are watched.
 
     Be aware of shell expansion!
     """
+    # The modules that build, watch, and test are only loaded once the
+    # arguments are known to be good.
+    from ttt import monitor
+    from ttt.terminal import Terminal
+
     Terminal.VERBOSITY = verbosity
     patterns = set(["".join(f) for f in filename])  # why join?
     if verbosity:
@@ -104,12 +332,36 @@ def ttt(
             f"exclude={exclude},"
             f"generator={generator},"
             f"config={config},"
+            f"concurrency={concurrency},"
             f"clean={clean},"
             f"watch={watch},"
             f"test={test},"
             f"define={define},"
+            f"timeout={timeout},"
+            f"test_timeout={test_timeout},"
+            f"force={force},"
+            f"worker={worker},"
+            f"preempt={preempt},"
+            f"pipeline={pipeline},"
+            f"fast={fast},"
+            f"syntax_check={syntax_check},"
+            f"job_slots={job_slots},"
+            f"job_slots_dir={job_slots_dir},"
+            f"abort_on_error={abort_on_error},"
+            f"condensed={condensed},"
+            f"build_profile={build_profile},"
+            f"conan_provider={conan_provider},"
+            f"flush_interval={flush_interval},"
+            f"status_line={status_line},"
+            f"event_log={event_log},"
+            f"trace={trace},"
+            f"metrics={metrics},"
+            f"profile={profile},"
+            f"profile_memory={profile_memory},"
             f"verbosity={verbosity}"
         )
+    if worker and not worker_token:
+        raise click.UsageError("--worker requires --worker-token")
     m = monitor.create_monitor(
         watch_path=watch_path,
         patterns=patterns,
@@ -117,14 +369,81 @@ def ttt(
         exclude=exclude,
         generator=generator,
         config=config,
+        concurrency=concurrency,
         clean=clean,
         watch=watch,
         test=test,
         define=define,
+        timeout=timeout,
+        test_timeout=test_timeout,
+        force=force,
+        workers=worker,
+        worker_token=worker_token,
+        preempt=preempt,
+        pipeline=pipeline,
+        fast=fast,
+        syntax_check=syntax_check,
+        job_slots=job_slots,
+        job_slots_dir=job_slots_dir,
+        abort_on_error=abort_on_error,
+        condensed=condensed,
+        build_profile=build_profile,
+        conan_provider=conan_provider,
+        flush_interval=flush_interval,
+        status_line=status_line,
+        event_log=event_log,
+        trace=trace,
+        metrics=metrics,
+        profile=profile,
+        profile_memory=profile_memory,
         verbosity=verbosity,
     )
     if watch:
         m.run()
     else:
-        m.build()
-        m.test()
+        try:
+            with m.profiled():
+                if m.configurations:
+                    m.build_and_test_configurations()
+                elif pipeline:
+                    m.build_and_test()
+                elif m.build():
+                    m.test()
+        finally:
+            m.close()
+
+
+@click.command()
+@click.argument("address", nargs=1)
+@click.option(
+    "--build-root",
+    required=True,
+    type=click.Path(exists=True, file_okay=False),
+    help="Only test binaries under this directory are run.",
+)
+@click.option(
+    "--token",
+    envvar="TTT_WORKER_TOKEN",
+    required=True,
+    help="The token that ttt sessions must present. Default: $TTT_WORKER_TOKEN.",
+)
+@click.option("--verbosity", "-v", default=0, count=True, help="More v's more verbose.")
+@version_option()
+def worker(address, build_root, token, verbosity):
+    """Run the test binaries sent by ttt sessions, listening on ADDRESS.
+
+    ADDRESS is either host:port, a port on localhost, or the path of a Unix
+    socket. The test binaries are run from the same path as they have on the
+    sending machine, with only --gtest_* arguments.
+    """
+    from ttt.remote import create_server
+    from ttt.terminal import Terminal
+
+    Terminal.VERBOSITY = verbosity
+    server = create_server(address, build_root, token, term=Terminal(stream=sys.stdout))
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
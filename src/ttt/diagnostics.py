@@ -0,0 +1,174 @@
+"""
+ttt.diagnostics
+~~~~~~~~~~~~
+This module implements the detection of compiler and linker diagnostics in
+build output.
+
+The formats recognised are those of gcc and clang (file:line:col: error:),
+MSVC (file(line): error C1234:), cmake (CMake Error at file:line), and the
+common linker errors that do not name a source line.
+:copyright: (c) yerejm
+"""
+
+import collections
+import re
+from timeit import default_timer as timer
+
+ERROR = "error"
+WARNING = "warning"
+
+# The number of lines following the first error, e.g. the source line and the
+# caret, that are kept with it.
+CONTEXT_LINES = 3
+# How long, in seconds, the context of the first error is waited for when the
+# build is to be stopped at the first error.
+CONTEXT_WAIT = 0.5
+
+GCC_RE = re.compile(
+    r"^(?P<file>[^:\s][^:]*|[A-Za-z]:[^:]*):(?P<line>\d+):(?:(?P<column>\d+):)?\s*"
+    r"(?P<severity>fatal error|error|warning):\s*(?P<message>.*)$"
+)
+MSVC_RE = re.compile(
+    r"^(?P<file>.+?)\((?P<line>\d+)(?:,(?P<column>\d+))?\)\s*:\s*"
+    r"(?P<severity>fatal error|error|warning)\s+(?P<code>[A-Z]+\d+)\s*:\s*"
+    r"(?P<message>.*)$"
+)
+CMAKE_RE = re.compile(
+    r"^CMake (?P<severity>Error|Warning)(?: \(dev\))? at (?P<file>.+?):(?P<line>\d+)"
+    r"(?: \((?P<message>.*)\))?:?$"
+)
+LINKER_RE = re.compile(
+    r"(?P<message>undefined reference to .*|"
+    r"(?:fatal )?error LNK\d+: .*|"
+    r"Undefined symbols for architecture .*)$"
+)
+# The lines of the linker itself, or of the compiler driver running it, e.g.
+# /usr/bin/ld: cannot find -lfoo. Only matched at the start of a line, as
+# "ld: " can be the end of any word followed by a colon.
+LD_RE = re.compile(
+    r"^(?:\S*[/\\])?(?:ld|ld\.\w+|collect2)(?:\.exe)?: "
+    r"(?:(?P<severity>warning|error): )?(?P<detail>.*)$"
+)
+# Progress lines of ninja and make, which end the context of an error.
+PROGRESS_RE = re.compile(r"^(?:\[\d+/\d+\]|\[\s*\d+%\]|ninja: |make(?:\[\d+\])?: )")
+
+# A diagnostic found in build output. The file, line, and column are None when
+# the diagnostic does not name them, e.g. for linker errors.
+Diagnostic = collections.namedtuple(
+    "Diagnostic", ["file", "line", "column", "severity", "message", "context"]
+)
+
+
+def parse_diagnostic(line):
+    """Parses a line of build output.
+
+    :return the :class:`Diagnostic` on the line, or None if there is none
+    """
+    for regex in (GCC_RE, MSVC_RE):
+        match = regex.match(line)
+        if match:
+            severity = match.group("severity")
+            message = match.group("message")
+            if "code" in match.groupdict():
+                message = "{}: {}".format(match.group("code"), message)
+            column = match.group("column")
+            return Diagnostic(
+                match.group("file"),
+                int(match.group("line")),
+                int(column) if column else None,
+                WARNING if severity == WARNING else ERROR,
+                message,
+                [],
+            )
+    match = CMAKE_RE.match(line)
+    if match:
+        return Diagnostic(
+            match.group("file"),
+            int(match.group("line")),
+            None,
+            match.group("severity").lower(),
+            "cmake {}".format(match.group("message") or "configure"),
+            [],
+        )
+    match = LD_RE.match(line)
+    if match:
+        severity = WARNING if match.group("severity") == WARNING else ERROR
+        return Diagnostic(None, None, None, severity, line.strip(), [])
+    match = LINKER_RE.search(line)
+    if match:
+        return Diagnostic(None, None, None, ERROR, match.group("message"), [])
+    return None
+
+
+def condense(diagnostic):
+    """Describes a diagnostic in a single line."""
+    if diagnostic.file is None:
+        return "{}: {}".format(diagnostic.severity, diagnostic.message)
+    location = diagnostic.file
+    if diagnostic.line is not None:
+        location += ":{}".format(diagnostic.line)
+    if diagnostic.column is not None:
+        location += ":{}".format(diagnostic.column)
+    return "{}: {}: {}".format(location, diagnostic.severity, diagnostic.message)
+
+
+class DiagnosticParser(object):
+    """Watches the lines of build output for diagnostics.
+
+    An instance is a line listener as for streamed_call.
+
+    :param on_first_error: (optional) called with the first error as soon as
+        it and its context have been seen
+    """
+
+    def __init__(self, on_first_error=None):
+        self.on_first_error = on_first_error
+        self.first_error = None
+        self.first_error_time = None
+        self.errors = 0
+        self.warnings = 0
+        self._context = None
+
+    def __call__(self, channel, line):
+        """Parses a line of build output.
+
+        :return the :class:`Diagnostic` on the line, or None if there is none
+        """
+        diagnostic = parse_diagnostic(line)
+        if diagnostic is None:
+            if self._context is not None and PROGRESS_RE.match(line):
+                self.complete()
+            elif self._context is not None and line.strip():
+                self._context.append(line)
+                if len(self._context) == CONTEXT_LINES:
+                    self.complete()
+            return None
+
+        if self._context is not None:
+            self.complete()
+        if diagnostic.severity == ERROR:
+            self.errors += 1
+            if self.first_error is None:
+                self.first_error = diagnostic
+                self.first_error_time = timer()
+                self._context = diagnostic.context
+        else:
+            self.warnings += 1
+        return diagnostic
+
+    def first_error_seen(self):
+        """Indicates whether the first error and its context have been seen.
+
+        The context is assumed to be complete once CONTEXT_WAIT seconds have
+        passed since the error.
+        """
+        if self.first_error is None:
+            return False
+        return self._context is None or timer() - self.first_error_time > CONTEXT_WAIT
+
+    def complete(self):
+        """Ends the context of the first error, e.g. at the end of output."""
+        if self._context is not None:
+            self._context = None
+            if self.on_first_error is not None:
+                self.on_first_error(self.first_error)
@@ -0,0 +1,196 @@
+"""
+ttt.eventlog
+~~~~~~~~~~~~
+This module implements the event log, a reporter that writes each event of a
+ttt session as a JSON object on a line of its own, for other tools to consume.
+
+The log is written to a file, or to a Unix socket given as unix:PATH. It is
+meant to be run as a background reporter so that writing it does not hold up
+the watch/build/test cycle.
+
+Every object has an "event" naming it and a "time" in seconds since the
+epoch, taken when the object is written.
+:copyright: (c) yerejm
+"""
+
+import json
+import socket
+import time
+
+from ttt.diagnostics import condense
+from ttt.executor import CompletedTest
+from ttt.reporter import Reporter
+
+UNIX_SOCKET_PREFIX = "unix:"
+
+
+def open_event_stream(target):
+    """Opens the destination of an event log.
+
+    :param target: the path of a file, which is appended to, or unix:PATH for
+        a Unix socket listening at PATH
+    :return a text stream
+    """
+    if target.startswith(UNIX_SOCKET_PREFIX):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.connect(target[len(UNIX_SOCKET_PREFIX) :])
+        return sock.makefile("w", encoding="utf-8")
+    return open(target, "a", encoding="utf-8")
+
+
+class EventLogReporter(Reporter):
+    """Writes the events of a session as JSON lines.
+
+    The stream is flushed at the end of each session, so lines are written in
+    batches rather than one system call each.
+
+    :param stream: the text stream to write to
+    :param clock: (optional) gives the time of each event
+    """
+
+    def __init__(self, stream, clock=time.time):
+        self.stream = stream
+        self.clock = clock
+        self.cycle_start = None
+        self.sessions = {}
+
+    def emit(self, event, **fields):
+        if self.stream is None:
+            return
+        fields["event"] = event
+        fields["time"] = self.clock()
+        try:
+            self.stream.write(json.dumps(fields, sort_keys=True) + "\n")
+        except OSError:
+            # the other end went away; the session carries on without it
+            self.stream = None
+
+    def flush(self):
+        if self.stream is None:
+            return
+        try:
+            self.stream.flush()
+        except OSError:
+            self.stream = None
+
+    def session_start(self, session_descriptor):
+        self.emit("session_start", session=session_descriptor)
+
+    def session_end(self, session_descriptor, duration=None):
+        if duration is not None:
+            self.sessions[session_descriptor] = (
+                self.sessions.get(session_descriptor, 0) + duration
+            )
+        self.emit("session_end", session=session_descriptor, duration=duration)
+        self.flush()
+
+    def report_watchstate(self, watchstate):
+        self.cycle_start = self.clock()
+        self.sessions = {}
+        self.emit(
+            "watchstate",
+            created=len(watchstate.inserts),
+            modified=len(watchstate.updates),
+            deleted=len(watchstate.deletes),
+            walk_time=watchstate.walk_time,
+        )
+
+    def report_phase(self, phase):
+        self.emit("phase", phase=phase)
+
+    def report_syntax_check(self, results):
+        self.emit(
+            "syntax_check",
+            checked=len(results),
+            failed=[r.source for r in results if r.returncode != 0],
+        )
+
+    def report_build_steps(self, steps):
+        for step in steps:
+            self.emit(
+                "build_step",
+                command=step.command,
+                returncode=step.returncode,
+                duration=step.duration,
+            )
+
+    def report_compiler_cache(self, hits, misses):
+        self.emit("compiler_cache", hits=hits, misses=misses)
+
+    def report_first_error(self, diagnostic):
+        self.emit("first_error", diagnostic=condense(diagnostic))
+
+    def report_build_failure(self):
+        self.emit("build_failure")
+
+    def report_build_profile(self, profile):
+        self.emit(
+            "build_profile",
+            total=profile.total,
+            targets=profile.targets,
+            files=profile.files,
+        )
+
+    def report_plan(self, plan):
+        self.emit("plan", binaries=plan["total_binaries"], tests=plan["total_tests"])
+
+    def report_test_progress(self, progress):
+        if isinstance(progress, CompletedTest):
+            self.emit(
+                "test",
+                executable=progress.executable,
+                source=progress.source,
+                name=progress.name,
+                outcome=progress.outcome,
+                duration=progress.duration,
+            )
+        else:
+            self.emit(
+                "binary",
+                executable=progress.executable,
+                source=progress.source,
+                passes=progress.passes,
+                fails=progress.fails,
+                run_time=progress.run_time,
+                cached=progress.cached,
+            )
+
+    def report_results(self, results):
+        self.emit(
+            "results",
+            passed=results["total_passed"],
+            failed=results["total_failed"],
+            cached=results.get("total_cached", 0),
+            runtime=results["total_runtime"],
+            failures=[failure[0] for failure in results["failures"]],
+        )
+
+    def report_configurations(self, outcomes):
+        for outcome in outcomes:
+            results = outcome.results or {}
+            self.emit(
+                "configuration",
+                name=outcome.name,
+                built=outcome.built,
+                passed=results.get("total_passed"),
+                failed=results.get("total_failed"),
+            )
+
+    def report_interrupt(self, interrupt):
+        self.emit("interrupt", interrupt=interrupt.__class__.__name__)
+        self.flush()
+
+    def wait_change(self):
+        """Ends a cycle, summarising the time spent in each session."""
+        if self.cycle_start is not None:
+            self.emit(
+                "cycle",
+                duration=self.clock() - self.cycle_start,
+                sessions=self.sessions,
+            )
+            self.cycle_start = None
+        self.flush()
+
+    def halt(self):
+        self.emit("halt")
+        self.flush()
@@ -0,0 +1,158 @@
+"""
+ttt.events
+~~~~~~~~~~~~
+This module implements the event bus through which the monitor notifies its
+reporters.
+
+The events are the methods of the :class:`Reporter` interface. The methods
+that each reporter implements are looked up once, when the reporter is
+subscribed, rather than for each event.
+
+A reporter may be run on a background thread of its own so that a slow
+reporter, e.g. one writing to a file or a socket, does not hold up the
+watch/build/test cycle. Its events are passed through a bounded queue. When
+the queue is full, either the event is dropped or the publisher waits for
+room.
+:copyright: (c) yerejm
+"""
+
+import queue
+import sys
+import threading
+import traceback
+
+from ttt.reporter import Reporter
+
+# The names of the events, which are the methods of the reporter interface.
+EVENTS = frozenset(
+    name
+    for name, value in vars(Reporter).items()
+    if callable(value) and not name.startswith("_")
+)
+
+# When the queue of a background reporter is full, the policies for what
+# happens to the next event.
+DROP = "drop"
+BLOCK = "block"
+QUEUE_POLICIES = (DROP, BLOCK)
+# The number of events that may be waiting for a background reporter.
+DEFAULT_QUEUE_SIZE = 1024
+
+
+def dispatch_table(reporter):
+    """Looks up the methods of a reporter for each event.
+
+    :return a dict of event name to the method, for the events that the
+        reporter implements
+    """
+    table = {}
+    for event in EVENTS:
+        method = getattr(reporter, event, None)
+        if callable(method):
+            table[event] = method
+    return table
+
+
+class BackgroundReporter(object):
+    """Runs the methods of a reporter on a thread of its own.
+
+    :param reporter: the reporter
+    :param queue_size: (optional) the most events that may wait for the
+        reporter
+    :param policy: (optional) when the queue is full, DROP (default) the
+        event or BLOCK until there is room for it
+    """
+
+    def __init__(self, reporter, queue_size=DEFAULT_QUEUE_SIZE, policy=DROP):
+        if policy not in QUEUE_POLICIES:
+            raise ValueError("Unknown queue policy: {}".format(policy))
+        self.reporter = reporter
+        self.policy = policy
+        self.dropped = 0
+        self._closed = False
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def put(self, method, args):
+        if self._closed:
+            return
+        if self.policy == BLOCK:
+            self._queue.put((method, args))
+            return
+        try:
+            self._queue.put_nowait((method, args))
+        except queue.Full:
+            self.dropped += 1
+
+    def close(self):
+        """Waits for the events already queued to be reported.
+
+        Events published afterwards are ignored.
+        """
+        self._closed = True
+        if self._thread.is_alive():
+            self._queue.put(None)
+            self._thread.join()
+
+    def _run(self):
+        while True:
+            item = self._queue.get()
+            if item is None:
+                break
+            method, args = item
+            try:
+                method(*args)
+            except Exception:
+                # a failing reporter must not stop the others or the monitor
+                traceback.print_exc(file=sys.stderr)
+
+
+class EventBus(object):
+    """Delivers events to the reporters subscribed to them."""
+
+    def __init__(self):
+        self._handlers = {event: [] for event in EVENTS}
+        self._background = []
+
+    def subscribe(self, reporter, background=False, **kwargs):
+        """Subscribes a reporter to the events that it implements.
+
+        :param reporter: the reporter
+        :param background: (optional) run the reporter on a thread of its own
+        :param queue_size: (optional) as for :class:`BackgroundReporter`
+        :param policy: (optional) as for :class:`BackgroundReporter`
+        """
+        table = dispatch_table(reporter)
+        if background:
+            runner = BackgroundReporter(reporter, **kwargs)
+            self._background.append(runner)
+            for event, method in table.items():
+                self._handlers[event].append(
+                    lambda *args, method=method: runner.put(method, args)
+                )
+        else:
+            for event, method in table.items():
+                self._handlers[event].append(method)
+
+    def publish(self, event, *args):
+        """Notifies the reporters subscribed to an event.
+
+        :param event: the name of a :class:`Reporter` method
+        :param args: the arguments of the method
+        """
+        try:
+            handlers = self._handlers[event]
+        except KeyError:
+            raise ValueError("Unknown event: {}".format(event)) from None
+        for handler in handlers:
+            handler(*args)
+
+    def dropped(self):
+        """The number of events dropped by background reporters."""
+        return sum(runner.dropped for runner in self._background)
+
+    def close(self):
+        """Waits for the background reporters to report the events queued."""
+        for runner in self._background:
+            runner.close()
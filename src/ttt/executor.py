@@ -6,17 +6,75 @@ are based on gtest.
 :copyright: (c) yerejm
 """
 
+import collections
+import io
+import threading
+
+from ttt.cache import Catalogue
+
 PASSED = 0
 FAILED = 1
 CRASHED = 2
+TIMEOUT = 3
+
+# The outcome of a single test as soon as it completes. The duration is in
+# seconds, or None if unknown.
+CompletedTest = collections.namedtuple(
+    "CompletedTest", ["executable", "source", "name", "outcome", "duration"]
+)
+# The outcome of a test binary once it has finished, or when its results were
+# taken from the result cache. The run time is in seconds.
+CompletedBinary = collections.namedtuple(
+    "CompletedBinary", ["executable", "source", "passes", "fails", "run_time", "cached"]
+)
 
 
 class Executor(object):
     """Maintains the collection of tests detected by the :class:`Watcher` and
     provides an interface to execute all or some of those tests."""
 
-    def __init__(self):
+    def __init__(
+        self,
+        timeout=None,
+        test_timeout=None,
+        catalogue=None,
+        result_cache=None,
+        workers=None,
+        job_slots=None,
+        progress=None,
+        tracer=None,
+    ):
+        """:class:`Executor` constructor.
+
+        :param timeout: (optional) the number of seconds a test binary may run
+            before it is killed
+        :param test_timeout: (optional) the number of seconds a single test
+            may run before its binary is killed
+        :param catalogue: (optional) the :class:`Catalogue` of the tests in
+            each binary. By default, one is held in memory.
+        :param result_cache: (optional) the :class:`ResultCache` of binaries
+            that passed. Unchanged binaries found in it are not run again.
+        :param workers: (optional) the :class:`WorkerPool` to distribute test
+            binaries to. Binaries are run locally when no worker is reachable.
+        :param job_slots: (optional) the :class:`JobSlots` shared with other
+            ttt instances. Each test binary run locally holds a slot.
+        :param progress: (optional) called with a :class:`CompletedTest` as each
+            test completes and a :class:`CompletedBinary` as each binary
+            finishes. The per-test output of the binaries is then only shown
+            when verbose.
+        :param tracer: (optional) the :class:`Tracer` that records the run of
+            each test binary
+        """
         self._test_filter = {}
+        self._catalogue = catalogue if catalogue is not None else Catalogue()
+        self._result_cache = result_cache
+        self._workers = workers
+        self._output_lock = threading.Lock()
+        self._timeout = timeout
+        self._test_timeout = test_timeout
+        self._job_slots = job_slots
+        self.progress = progress
+        self.tracer = tracer
 
     def test_filter(self):
         return self._test_filter
@@ -24,6 +82,42 @@ class Executor(object):
     def clear_filter(self):
         self._test_filter.clear()
 
+    def clear_cache(self):
+        """Forces every binary to run in the next call to test()."""
+        if self._result_cache is not None:
+            self._result_cache.clear()
+
+    def plan(self, testlist):
+        """Determines the tests that the next call to test() will run for the
+        given list, without running them.
+
+        The tests in each binary come from the catalogue, so binaries are only
+        asked for their tests when they are new or have been relinked since
+        they last ran or were asked. When a test filter is in place, only the
+        filtered tests are planned.
+
+        :param testlist: a list of test objects
+        :return a Dict() of the planned work containing:
+          - total_binaries: the number of binaries that will be run
+          - total_tests: the number of tests that will be run
+          - tests: a Dict() of binary executable path to its test names
+        """
+        test_filter = self._test_filter
+        planned = {}
+        for test in testlist:
+            executable = test.executable()
+            if not test_filter:
+                planned[executable] = self._catalogue.tests(test)
+            elif executable in test_filter:
+                planned[executable] = test_filter[executable]
+        self._catalogue.save()
+
+        return {
+            "total_binaries": len(planned),
+            "total_tests": sum(len(tests) for tests in planned.values()),
+            "tests": planned,
+        }
+
     def test(self, testlist):
         """Executes the tests provided in the given list.
 
@@ -37,6 +131,11 @@ class Executor(object):
         remains running. This does not persist across ttt sessions and the
         filter can be removed during a session using clear_filter().
 
+        When there is a result cache, a binary that has not changed since all
+        of its tests last passed is not run; its previous results are used
+        instead. The cache is only consulted and updated when there is no test
+        filter, as only then is every test of a binary run.
+
         :param testlist: a list of test objects
         :return a Dict() of test results containing:
           - total_runtime: time to run all tests in seconds
@@ -44,17 +143,63 @@ class Executor(object):
           - total_failed: the number of failed tests (should equal the length
                 of the failures list)
           - failures: a list of lists containing the failure results
+          - total_cached: (with a result cache) the number of passes taken
+                from the cache
+          - cached: (with a result cache) the sources of the binaries not run
         """
         test_filter = self._test_filter
+        result_cache = None if test_filter else self._result_cache
+        dispatcher = None
+        if self._workers is not None and not test_filter:
+            from ttt.remote import Dispatcher
+
+            runners = self._workers.runners()
+            if runners:
+                dispatcher = Dispatcher(runners, self._execute_remotely)
         test_results = set()
+        cached = []
         for test in testlist:
-            if not test_filter or test.executable() in test_filter:
-                failures = test.execute(
-                    test_filter[test.executable()] if test_filter else []
+            if result_cache is not None:
+                entry = result_cache.get(test)
+                if entry is not None:
+                    cached.append((test, entry))
+                    if self.progress is not None:
+                        self.progress(
+                            CompletedBinary(
+                                test.executable(),
+                                test.source(),
+                                entry["passes"],
+                                0,
+                                entry["run_time"] / 1000,
+                                True,
+                            )
+                        )
+                    continue
+            if dispatcher is not None:
+                dispatcher.put(test)
+                test_results.add(test)
+            elif not test_filter or test.executable() in test_filter:
+                failures = self._execute(
+                    test, test_filter[test.executable()] if test_filter else []
                 )
                 test_results.add(test)
                 if failures and test_filter:
                     break
+        if dispatcher is not None:
+            # fall back to running locally whatever the workers could not
+            for test in dispatcher.finish():
+                self._execute(test, [])
+        if result_cache is not None:
+            for test in test_results:
+                result_cache.put(test)
+            result_cache.save()
+        if not test_filter:
+            # a binary that ran to completion ran all of its tests
+            for test in test_results:
+                results = test.results()
+                if all(r[0] in (PASSED, FAILED) for r in results.values()):
+                    self._catalogue.put(test, results)
+            self._catalogue.save()
 
         # update the test filter for those tests that failed
         self._test_filter = {
@@ -77,9 +222,94 @@ class Executor(object):
                 failures.append([failed_test, out, err, outcome])
         runtime /= 1000  # runtime is in milliseconds; summarise using seconds
 
-        return {
+        results = {
             "total_runtime": runtime,
             "total_passed": pass_count,
             "total_failed": fail_count,
             "failures": failures,
         }
+        if self._result_cache is not None:
+            cached_count = sum(entry["passes"] for _, entry in cached)
+            results["total_passed"] += cached_count
+            results["total_cached"] = cached_count
+            results["cached"] = [test.source() for test, _ in cached]
+        return results
+
+    def _execute(self, test, test_filters, **kwargs):
+        if self.progress is None:
+            return self._execute_test(test, test_filters, **kwargs)
+        if "term" not in kwargs and test.terminal().verbosity == 0:
+            from ttt.terminal import Terminal
+
+            # the progress takes the place of the per-test output
+            kwargs["term"] = Terminal(verbosity=0)
+        try:
+            return self._execute_test(
+                test, test_filters, progress=self.tested, **kwargs
+            )
+        finally:
+            self.progress(
+                CompletedBinary(
+                    test.executable(),
+                    test.source(),
+                    test.passes(),
+                    test.fails(),
+                    test.run_time() / 1000,
+                    False,
+                )
+            )
+
+    def tested(self, test, outcome):
+        name, duration = test.last_test()
+        self.progress(
+            CompletedTest(test.executable(), test.source(), name, outcome, duration)
+        )
+
+    def _execute_test(self, test, test_filters, **kwargs):
+        if self.tracer is None:
+            return self._execute_in_slot(test, test_filters, **kwargs)
+        args = {"executable": test.executable()}
+        if "runner" in kwargs:
+            args["worker"] = kwargs["runner"].address
+        with self.tracer.span(test.source(), category="test", **args):
+            return self._execute_in_slot(test, test_filters, **kwargs)
+
+    def _execute_in_slot(self, test, test_filters, **kwargs):
+        if self._job_slots is None or "runner" in kwargs:
+            return test.execute(
+                test_filters,
+                timeout=self._timeout,
+                test_timeout=self._test_timeout,
+                **kwargs,
+            )
+        with self._job_slots.slot():
+            return test.execute(
+                test_filters,
+                timeout=self._timeout,
+                test_timeout=self._test_timeout,
+                **kwargs,
+            )
+
+    def _execute_remotely(self, test, runner):
+        """Runs a test on a worker.
+
+        The progress output of the test is held back until the test completes
+        so that the output of tests running concurrently does not interleave.
+        """
+        from ttt.terminal import Terminal
+
+        term = test.terminal()
+        output = io.StringIO()
+        quiet = self.progress is not None and term.verbosity == 0
+        try:
+            self._execute(
+                test,
+                [],
+                runner=runner,
+                term=Terminal(
+                    stream=None if quiet else output, verbosity=term.verbosity
+                ),
+            )
+        finally:
+            with self._output_lock:
+                term.write(output.getvalue())
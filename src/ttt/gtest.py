@@ -9,9 +9,11 @@ in a subprocess and capture its output to track the outcome of test execution.
 import collections
 import os
 import re
+import subprocess
 import sys
+from timeit import default_timer as timer
 
-from ttt.executor import CRASHED, FAILED, PASSED
+from ttt.executor import CRASHED, FAILED, PASSED, TIMEOUT
 from ttt.terminal import Terminal
 import ttt.termstyle as termstyle
 
@@ -79,6 +81,37 @@ TESTCASE_TIME_RE = re.compile(
 #
 
 
+# How long, in seconds, a binary may take to list its tests.
+LIST_TIMEOUT = 10
+
+# The name recorded for a timeout that occurs outside of any test, e.g. during
+# global set-up. As a filter, it reruns every test of the binary.
+UNKNOWN_TEST = "*"
+
+
+def parse_test_list(lines):
+    """Gets the test names from the output of --gtest_list_tests.
+
+    The output names each testcase (with a trailing .) followed by its tests
+    indented underneath. Parameterised tests carry a trailing comment.
+
+      core.
+        ok
+        notok  # GetParam() = 1
+    """
+    tests = []
+    testcase = None
+    for line in lines:
+        name = line.split("#", 1)[0].rstrip()
+        if not name:
+            continue
+        if not line.startswith(" "):
+            testcase = name if name.endswith(".") else None
+        elif testcase is not None:
+            tests.append(testcase + name.strip())
+    return tests
+
+
 def testcase_starts_at(line):
     """Indicates if the line is the start of a testcase."""
     return TESTCASE_START_RE.match(line)
@@ -137,6 +170,7 @@ class GTest(object):
         self._source = source
         self._executable = executable
         self._term = term if term else Terminal()
+        self._progress = None
         self.reset()
 
     def out(self, *args, **kwargs):
@@ -153,9 +187,12 @@ class GTest(object):
         self._state = GTest.WAITING_TESTCASE
         self._testcase = None
         self._test = None
+        self._test_start = None
+        self._last_test = (None, None)
         self._elapsed = 0
         self._pass_count = 0
         self._fail_count = 0
+        self._returncode = None
 
     def passes(self):
         """The number of passing tests detected in the latest test run."""
@@ -165,6 +202,12 @@ class GTest(object):
         """The number of failing tests detected in the latest test run."""
         return self._fail_count
 
+    def returncode(self):
+        """The return code of the latest test run, or None if it did not run
+        to completion. A binary can fail outside of any test, e.g. when it
+        crashes at exit, so this can be non-zero with no failing tests."""
+        return self._returncode
+
     def source(self):
         """The relative path to the test source file."""
         return self._source
@@ -173,51 +216,172 @@ class GTest(object):
         """The absolute path to the gtest binary executable."""
         return self._executable
 
+    def terminal(self):
+        """The Terminal object that receives the output of test execution."""
+        return self._term
+
     def run_time(self):
         """The elapsed time in milliseconds to run the tests."""
         return self._elapsed
 
-    def execute(self, test_filters):
+    def list_tests(self):
+        """Asks the test executable for the names of the tests it contains.
+
+        :return a list of test names, empty if the executable could not list
+        its tests
+        """
+        from ttt.subproc import execute
+
+        try:
+            output = execute(
+                [self.executable(), "--gtest_list_tests"],
+                stderr=subprocess.DEVNULL,
+                timeout=LIST_TIMEOUT,
+            )
+        except (subprocess.SubprocessError, OSError):
+            return []
+        return parse_test_list(output)
+
+    def execute(
+        self,
+        test_filters,
+        timeout=None,
+        test_timeout=None,
+        runner=None,
+        term=None,
+        progress=None,
+    ):
         """Executes the test executable, with this instance as a line listener.
 
+        If a single test runs longer than the test timeout, the binary is
+        killed, the test is recorded as timed out, and the binary is run again
+        for the tests that had not yet run. If the binary as a whole runs
+        longer than the timeout, the test running at the time is recorded as
+        timed out and no further tests are run.
+
         :param test_filters: a list of tests identified by name to be executed.
             This is a passed through as a colon separated string to the
             --gtest_filter command line option.
+        :param timeout: (optional) the number of seconds the binary may run
+        :param test_timeout: (optional) the number of seconds a test may run
+        :param runner: (optional) the function that runs the command, called
+            as subproc.streamed_call. By default, the binary is run locally.
+        :param term: (optional) Terminal object to send output of this
+            execution instead of the one given at construction.
+        :param progress: (optional) called with this object and the outcome
+            of each test as soon as the test completes
         :return a list of failing tests identified by name
         """
-        from ttt.subproc import streamed_call
+        if runner is None:
+            from ttt.subproc import streamed_call as runner
+
+        previous_term = self._term
+        if term is not None:
+            self._term = term
+        self._progress = progress
+        try:
+            return self._execute(test_filters, timeout, test_timeout, runner)
+        finally:
+            self._term = previous_term
+            self._progress = None
+
+    def _execute(self, test_filters, timeout, test_timeout, runner):
+        def test_expired():
+            return (
+                self._test_start is not None
+                and timer() - self._test_start > test_timeout
+            )
 
-        command = [self.executable()]
-        if test_filters:
-            command.append("--gtest_filter={}".format(":".join(test_filters)))
         self.reset()
-        self.out("Executing {}".format(" ".join(command)), verbose=2)
-        rc, stdout, stderr = streamed_call(command, listener=self)
-        self.out(command, verbose=2)
-        if stdout:
-            self.out(os.linesep.join(stdout), verbose=2)
-        if stderr:
-            self.out(os.linesep.join(stderr), verbose=2)
-
-        if rc != 0:
-            # TODO Handle non-test crash?
-
-            # probably crashed: note the test that did it and accept that
-            # remaining tests do not run
-            if self._test is not None:
-                self._tests[self._test] = (
-                    CRASHED,
-                    [signalstring(rc)] + self._output,
-                    self._error,
-                )
-                self._fail_count += 1
-                self.out(
-                    " {}".format(signalstring(rc)),
-                    decorator=[termstyle.bold, termstyle.red],
-                    verbose=0,
+        start = timer()
+        while True:
+            command = self.command(test_filters, list(self._tests.keys()))
+            remaining = None if timeout is None else timeout - (timer() - start)
+            self.out("Executing {}".format(" ".join(command)), verbose=2)
+            run_start = timer()
+            try:
+                rc, stdout, stderr = runner(
+                    command,
+                    listener=self,
+                    timeout=remaining,
+                    watchdog=None if test_timeout is None else test_expired,
                 )
+            except subprocess.TimeoutExpired:
+                self._elapsed += int((timer() - run_start) * 1000)
+                test_hung = test_expired() if test_timeout is not None else False
+                # A binary that ignores the filter would hang on the same
+                # test again, so only continue when a new test has hung.
+                progressed = self._test not in self._tests
+                self.timed_out(test_timeout if test_hung else timeout)
+                if (
+                    test_hung
+                    and progressed
+                    and (timeout is None or timer() - start < timeout)
+                ):
+                    continue
+                break
+
+            self.out(command, verbose=2)
+            if stdout:
+                self.out(os.linesep.join(stdout), verbose=2)
+            if stderr:
+                self.out(os.linesep.join(stderr), verbose=2)
+
+            self._returncode = rc
+            if rc != 0:
+                # probably crashed: note the test that did it and accept that
+                # remaining tests do not run
+                if self._test is not None:
+                    self._tests[self._test] = (
+                        CRASHED,
+                        [signalstring(rc)] + self._output,
+                        self._error,
+                    )
+                    self._fail_count += 1
+                    self.tested(CRASHED)
+                    self.out(
+                        " {}".format(signalstring(rc)),
+                        decorator=[termstyle.bold, termstyle.red],
+                        verbose=0,
+                    )
+            break
         return self.failures()
 
+    def command(self, test_filters, exclusions=None):
+        """Creates the command line that runs the filtered tests, skipping
+        any excluded tests."""
+        command = [self.executable()]
+        if exclusions:
+            command.append(
+                "--gtest_filter={}-{}".format(
+                    ":".join(test_filters), ":".join(exclusions)
+                )
+            )
+        elif test_filters:
+            command.append("--gtest_filter={}".format(":".join(test_filters)))
+        return command
+
+    def timed_out(self, seconds):
+        """Records the test that was running when the binary was killed for
+        exceeding a time limit.
+
+        The parse state is reset as the binary's output has been cut short.
+        """
+        test = self._test if self._test is not None else UNKNOWN_TEST
+        message = "TIMEOUT ({}s)".format(seconds)
+        self._tests[test] = (TIMEOUT, [message] + self._output, self._error)
+        self._fail_count += 1
+        self.tested(TIMEOUT)
+        self.out(
+            " {}".format(message), decorator=[termstyle.bold, termstyle.red], verbose=0
+        )
+        self._state = GTest.WAITING_TESTCASE
+        self._testcase = None
+        self._test = None
+        self._test_start = None
+        self._output = []
+        self._error = []
+
     def failures(self):
         """Gets the list of tests that failed by name."""
         # results[0] is the first item in the results tuple. This is the
@@ -255,7 +419,7 @@ class GTest(object):
         elif self._state == GTest.WAITING_TESTCASE:
             match = test_elapsed_at(line)
             if match:
-                self._elapsed = int(match.group(1))
+                self._elapsed += int(match.group(1))
         return None
 
     def line(self, line):
@@ -304,6 +468,7 @@ class GTest(object):
         """Tracks when a test starts."""
         test = line[line.rfind(" ") + 1 :]
         self._test = test
+        self._test_start = timer()
         self._output = []
         self._error = []
 
@@ -349,10 +514,26 @@ class GTest(object):
         else:
             self._pass_count += 1
             self.out(".", end="", verbose=0)
+        self.tested(outcome)
         self._test = None
+        self._test_start = None
         self._output = []
         self._error = []
 
+    def tested(self, outcome):
+        """Passes the outcome of a completed test to the progress listener."""
+        self._last_test = (
+            self._test if self._test is not None else UNKNOWN_TEST,
+            None if self._test_start is None else timer() - self._test_start,
+        )
+        if self._progress is not None:
+            self._progress(self, outcome)
+
+    def last_test(self):
+        """The name of the test that completed last and the seconds that it
+        ran for, or None if unknown."""
+        return self._last_test
+
     def results(self):
         """Gets the test results of the last test execution.
 
@@ -0,0 +1,176 @@
+"""
+ttt.jobslots
+~~~~~~~~~~~~
+This module implements job slots shared by the ttt instances on a machine.
+
+A fixed number of slot files live in a shared directory. A job may only run
+while it holds a slot, and a slot is held by holding an exclusive lock on its
+file. Locks are released by the operating system when their holder exits, so
+a ttt that is killed never leaks its slots.
+
+Builds take as many free slots as they can use, leaving one for the test
+binaries, and pass the number to the build tool as its parallel level. Each
+test binary takes a single slot.
+
+By default, the slots are shared by the ttt instances of the current user in
+a directory private to the user. The instances of several users share slots
+through a directory given to all of them.
+:copyright: (c) yerejm
+"""
+
+from contextlib import contextmanager
+import os
+import stat
+import tempfile
+import time
+
+if os.name == "nt":
+    import msvcrt
+
+    def try_lock(f):
+        try:
+            msvcrt.locking(f.fileno(), msvcrt.LK_NBLCK, 1)
+        except OSError:
+            return False
+        return True
+
+    def unlock(f):
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+else:
+    import fcntl
+
+    def try_lock(f):
+        try:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return False
+        return True
+
+    def unlock(f):
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+
+
+# How often, in seconds, to look for a free slot while waiting for one.
+POLL_INTERVAL = 0.1
+# The flags that a slot file is opened with. A slot file that is a symbolic
+# link is refused rather than followed.
+SLOT_FLAGS = os.O_RDWR | os.O_CREAT | getattr(os, "O_NOFOLLOW", 0)
+
+
+def default_directory():
+    """Gets the directory holding the slot files of the current user.
+
+    This is in the runtime directory of the user, if there is one, or else in
+    the temporary directory under a name of the user's own.
+    """
+    runtime = os.environ.get("XDG_RUNTIME_DIR")
+    if runtime:
+        return os.path.join(runtime, "ttt-jobslots")
+    user = os.getuid() if hasattr(os, "getuid") else os.environ.get("USERNAME", "")
+    return os.path.join(tempfile.gettempdir(), "ttt-jobslots-{}".format(user))
+
+
+def open_slot(path, shared=False):
+    """Opens a slot file, creating it if it does not exist.
+
+    :param path: the path of the slot file
+    :param shared: (optional) let any user lock the slot file
+    :return the file object
+    """
+    fd = os.open(path, SLOT_FLAGS, 0o666 if shared else 0o600)
+    try:
+        if not stat.S_ISREG(os.fstat(fd).st_mode):
+            raise OSError("Not a slot file: {}".format(path))
+        if shared and hasattr(os, "fchmod"):
+            try:
+                os.fchmod(fd, 0o666)
+            except OSError:
+                # created by another user
+                pass
+    except BaseException:
+        os.close(fd)
+        raise
+    return os.fdopen(fd, "r+")
+
+
+class JobSlots(object):
+    """A semaphore shared between processes through lock files.
+
+    :param count: the number of slots
+    :param directory: (optional) the directory holding the slot files. Every
+        ttt sharing the slots must use the same directory and count. A
+        directory given is shared with the other users of the machine. By
+        default, it is the private directory of the current user.
+    """
+
+    def __init__(self, count, directory=None):
+        if count < 1:
+            raise ValueError("There must be at least one job slot")
+        self.count = count
+        self.shared = directory is not None
+        self.directory = directory if self.shared else default_directory()
+
+    def acquire(self, most=1):
+        """Takes free slots, waiting until at least one is free.
+
+        :param most: (optional) the most slots to take
+        :return a list of the slots held, to be given to release()
+        """
+        while True:
+            held = self.try_acquire(most)
+            if held:
+                return held
+            time.sleep(POLL_INTERVAL)
+
+    def try_acquire(self, most=1):
+        """Takes free slots without waiting.
+
+        :param most: (optional) the most slots to take
+        :return a list of the slots held, empty if none were free
+        """
+        self.prepare()
+        held = []
+        for i in range(self.count):
+            if len(held) >= most:
+                break
+            f = open_slot(
+                os.path.join(self.directory, "slot-{}".format(i)), self.shared
+            )
+            if try_lock(f):
+                held.append(f)
+            else:
+                f.close()
+        return held
+
+    def prepare(self):
+        if self.shared:
+            os.makedirs(self.directory, exist_ok=True)
+            return
+        os.makedirs(self.directory, mode=0o700, exist_ok=True)
+        # the name of the directory can be taken first by another user
+        info = os.lstat(self.directory)
+        if not stat.S_ISDIR(info.st_mode) or (
+            hasattr(os, "getuid") and info.st_uid != os.getuid()
+        ):
+            raise PermissionError(
+                "Job slot directory is not owned by the user: {}".format(self.directory)
+            )
+
+    def release(self, held):
+        """Gives back slots taken by acquire()."""
+        for f in held:
+            try:
+                unlock(f)
+            finally:
+                f.close()
+        del held[:]
+
+    @contextmanager
+    def slot(self):
+        """Holds a single slot for the duration of a 'with' block."""
+        held = self.acquire()
+        try:
+            yield
+        finally:
+            self.release(held)
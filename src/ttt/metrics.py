@@ -0,0 +1,402 @@
+"""
+ttt.metrics
+~~~~~~~~~~~~
+This module implements the metrics of a ttt session in the Prometheus text
+format, for long running sessions to be monitored.
+
+The metrics are either served over HTTP, on localhost unless a host is given,
+or written to a file that is rewritten periodically, e.g. for the textfile
+collector of the node exporter.
+:copyright: (c) yerejm
+"""
+
+import atexit
+import http.server
+import os
+import sys
+import threading
+from timeit import default_timer as timer
+
+from ttt import subproc
+from ttt.executor import CRASHED, FAILED, PASSED, TIMEOUT
+from ttt.reporter import Reporter
+
+# How often, in seconds, a metrics file is rewritten.
+METRICS_INTERVAL = 15
+METRICS_HOST = "127.0.0.1"
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+DURATION_BUCKETS = (0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300)
+CHANGE_BUCKETS = (1, 2, 5, 10, 25, 50, 100, 500, 1000)
+
+OUTCOMES = {
+    PASSED: "passed",
+    FAILED: "failed",
+    CRASHED: "crashed",
+    TIMEOUT: "timeout",
+}
+
+
+def format_labels(labels):
+    if not labels:
+        return ""
+    return "{{{}}}".format(
+        ",".join(
+            '{}="{}"'.format(
+                name,
+                str(value)
+                .replace("\\", "\\\\")
+                .replace('"', '\\"')
+                .replace("\n", "\\n"),
+            )
+            for name, value in labels
+        )
+    )
+
+
+def format_value(value):
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter(object):
+    """A value that only goes up, for each set of labels, either counted or
+    read from a function that keeps its own count when the metrics are
+    collected.
+
+    :param name: the name of the metric
+    :param documentation: the help text of the metric
+    :param function: (optional) gives the value of the counter
+    """
+
+    kind = "counter"
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self._values = {}
+
+    def inc(self, amount=1, **labels):
+        key = tuple(sorted(labels.items()))
+        self._values[key] = self._values.get(key, 0) + amount
+
+    def samples(self):
+        if self.function is not None:
+            return [(self.name, (), self.function())]
+        return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Gauge(object):
+    """A value that goes up and down, either set or read from a function
+    when the metrics are collected.
+
+    :param name: the name of the metric
+    :param documentation: the help text of the metric
+    :param function: (optional) gives the value, or None when there is none
+    """
+
+    kind = "gauge"
+
+    def __init__(self, name, documentation, function=None):
+        self.name = name
+        self.documentation = documentation
+        self.function = function
+        self.value = None
+
+    def set(self, value):
+        self.value = value
+
+    def samples(self):
+        value = self.function() if self.function is not None else self.value
+        return [] if value is None else [(self.name, (), value)]
+
+
+class Histogram(object):
+    """The distribution of observed values, for each set of labels.
+
+    :param name: the name of the metric
+    :param documentation: the help text of the metric
+    :param buckets: the upper bounds of the buckets, in increasing order
+    """
+
+    kind = "histogram"
+
+    def __init__(self, name, documentation, buckets):
+        self.name = name
+        self.documentation = documentation
+        self.buckets = tuple(buckets) + (float("inf"),)
+        self._values = {}
+
+    def observe(self, value, **labels):
+        key = tuple(sorted(labels.items()))
+        counts, total = self._values.get(key, ([0] * len(self.buckets), 0))
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                counts[i] += 1
+        self._values[key] = (counts, total + value)
+
+    def samples(self):
+        samples = []
+        for key, (counts, total) in self._values.items():
+            for bound, count in zip(self.buckets, counts, strict=True):
+                samples.append(
+                    (self.name + "_bucket", key + (("le", format_value(bound)),), count)
+                )
+            samples.append((self.name + "_sum", key, total))
+            samples.append((self.name + "_count", key, counts[-1]))
+        return samples
+
+
+class Registry(object):
+    """The collection of metrics that are exposed together."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def render(self):
+        """Describes the metrics in the Prometheus text format."""
+        lines = []
+        with self.lock:
+            for metric in self._metrics:
+                lines.append("# HELP {} {}".format(metric.name, metric.documentation))
+                lines.append("# TYPE {} {}".format(metric.name, metric.kind))
+                for name, labels, value in metric.samples():
+                    lines.append(
+                        "{}{} {}".format(
+                            name, format_labels(labels), format_value(value)
+                        )
+                    )
+        return "\n".join(lines) + "\n"
+
+
+def resident_memory():
+    """Gets the resident set size of the process in bytes.
+
+    Where the current size cannot be read, this is the peak size.
+
+    :return the size, or None if it cannot be determined
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError, IndexError, AttributeError):
+        pass
+    try:
+        import resource
+    except ImportError:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes, except on macOS where it is bytes
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+class MetricsReporter(Reporter):
+    """Maintains the metrics of a session from the events of the monitor.
+
+    :param files: (optional) gives the number of files tracked by the watcher
+    :param clock: (optional) gives the time in seconds
+    """
+
+    def __init__(self, files=None, clock=timer):
+        self.clock = clock
+        self.registry = Registry()
+        register = self.registry.register
+        self.scans = register(
+            Histogram(
+                "ttt_scan_duration_seconds",
+                "Time taken to scan the watch area for changes.",
+                DURATION_BUCKETS,
+            )
+        )
+        register(
+            Gauge("ttt_files_tracked", "Number of files tracked by the watcher.", files)
+        )
+        self.changes = register(
+            Histogram(
+                "ttt_changed_files",
+                "Number of files changed for each cycle.",
+                CHANGE_BUCKETS,
+            )
+        )
+        self.file_changes = register(
+            Counter("ttt_file_changes_total", "Files created, modified and deleted.")
+        )
+        self.phases = register(
+            Histogram(
+                "ttt_phase_duration_seconds",
+                "Time taken to configure, build and test.",
+                DURATION_BUCKETS,
+            )
+        )
+        self.build_failures = register(
+            Counter("ttt_build_failures_total", "Builds that failed.")
+        )
+        self.tests = register(
+            Counter("ttt_tests_total", "Tests run or taken from the result cache.")
+        )
+        register(
+            Counter(
+                "ttt_subprocesses_started_total",
+                "Processes started by ttt, e.g. builds and test binaries.",
+                lambda: subproc.process_counts()[0],
+            )
+        )
+        register(
+            Gauge(
+                "ttt_subprocesses_running",
+                "Processes started by ttt that are running.",
+                lambda: subproc.process_counts()[1],
+            )
+        )
+        register(
+            Gauge(
+                "process_resident_memory_bytes",
+                "Resident memory size of ttt in bytes.",
+                resident_memory,
+            )
+        )
+        self.test_start = None
+
+    def report_scan(self, watchstate):
+        """Notes a scan of the watch area, whether or not it found changes."""
+        with self.registry.lock:
+            self.scans.observe(watchstate.walk_time)
+
+    def report_watchstate(self, watchstate):
+        with self.registry.lock:
+            kinds = (
+                ("created", watchstate.inserts),
+                ("modified", watchstate.updates),
+                ("deleted", watchstate.deletes),
+            )
+            for kind, files in kinds:
+                if files:
+                    self.file_changes.inc(len(files), kind=kind)
+            self.changes.observe(sum(len(files) for _, files in kinds))
+
+    def session_start(self, session_descriptor):
+        if session_descriptor == "test":
+            self.test_start = self.clock()
+
+    def session_end(self, session_descriptor, duration=None):
+        if session_descriptor == "test" and self.test_start is not None:
+            with self.registry.lock:
+                self.phases.observe(self.clock() - self.test_start, phase="test")
+            self.test_start = None
+
+    def report_build_steps(self, steps):
+        with self.registry.lock:
+            for step in steps:
+                if step.phase is not None:
+                    self.phases.observe(step.duration, phase=step.phase)
+
+    def report_build_failure(self):
+        with self.registry.lock:
+            self.build_failures.inc()
+
+    def report_results(self, results):
+        with self.registry.lock:
+            failed = {}
+            for failure in results["failures"]:
+                outcome = OUTCOMES.get(failure[3], "failed")
+                failed[outcome] = failed.get(outcome, 0) + 1
+            cached = results.get("total_cached", 0)
+            counts = dict(failed)
+            counts["passed"] = results["total_passed"] - cached
+            counts["cached"] = cached
+            for outcome, count in counts.items():
+                if count:
+                    self.tests.inc(count, outcome=outcome)
+
+
+class MetricsServer(object):
+    """Serves the metrics over HTTP on a thread of its own.
+
+    :param registry: the :class:`Registry` of the metrics
+    :param host: (optional) the address to listen on. By default, localhost.
+    :param port: (optional) the port to listen on. By default, any free port.
+    """
+
+    def __init__(self, registry, host=METRICS_HOST, port=0):
+        class Handler(http.server.BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.render().encode("utf-8")
+                self.send_response(200)
+                self.send_header("Content-Type", CONTENT_TYPE)
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.server = http.server.ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.address = self.server.server_address
+        self._thread = threading.Thread(
+            target=self.server.serve_forever, name="metrics", daemon=True
+        )
+        self._thread.start()
+
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class MetricsFile(object):
+    """Rewrites a file with the metrics every interval and at exit.
+
+    :param registry: the :class:`Registry` of the metrics
+    :param path: the file to write
+    :param interval: (optional) the seconds between rewrites
+    """
+
+    def __init__(self, registry, path, interval=METRICS_INTERVAL):
+        self.registry = registry
+        self.path = path
+        self.interval = interval
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="metrics", daemon=True)
+        self._thread.start()
+        atexit.register(self.close)
+
+    def write(self):
+        """Rewrites the file, replacing it whole so that it is never read half
+        written."""
+        temp_path = "{}.{}".format(self.path, os.getpid())
+        with open(temp_path, "w") as f:
+            f.write(self.registry.render())
+        os.replace(temp_path, self.path)
+
+    def close(self):
+        if not self._stopped.is_set():
+            self._stopped.set()
+            self._thread.join()
+            self.write()
+
+    def _run(self):
+        self.write()
+        while not self._stopped.wait(self.interval):
+            self.write()
+
+
+def export_metrics(registry, target, interval=METRICS_INTERVAL):
+    """Exports metrics over HTTP or to a file.
+
+    :param registry: the :class:`Registry` of the metrics
+    :param target: a port or host:port to serve the metrics on, or the path
+        of the file to write them to
+    :param interval: (optional) the seconds between rewrites of a file
+    :return a :class:`MetricsServer` or :class:`MetricsFile`
+    """
+    host, _, port = target.rpartition(":")
+    if port.isdigit() and os.sep not in target and "/" not in target:
+        return MetricsServer(registry, host or METRICS_HOST, int(port))
+    return MetricsFile(registry, target, interval)
@@ -7,26 +7,56 @@ change and initiate the build and test of the watched source tree.
 """
 
 import collections
+import contextlib
+import functools
 import itertools
 import os
+import queue
 import subprocess
 import sys
+import threading
 import time
 from timeit import default_timer as timer
 
-from ttt.builder import create_builder
+from ttt import subproc
+from ttt.builder import (
+    build_failed,
+    BuildResult,
+    cpu_count,
+    create_builder,
+    LinkDetector,
+)
+from ttt.buildtime import create_profiler
+from ttt.cache import Catalogue, ResultCache, state_path
+from ttt.events import EventBus
 from ttt.executor import Executor
+from ttt.options import (
+    DEFAULT_FLUSH_INTERVAL,
+    PREEMPT_NEVER,
+    PREEMPT_POLICIES,
+    SYNTAX_CHECK_GATE,
+    SYNTAX_CHECK_OFF,
+)
 from ttt.terminal import Terminal, TerminalReporter
-from ttt.watcher import has_changes, Watcher
+from ttt.watcher import has_changes, merge_watchstates, Watcher
 
 
 DEFAULT_BUILD_PATH_SUFFIX = "-build"
-DEFAULT_SOURCE_PATTERNS = [
-    "*.cc",
-    "*.c",
-    "*.h",
-    "CMakeLists.txt",
-]
+
+# A build configuration of the watched source tree, with its own build area,
+# builder, executor (None when not testing), and build profiler (None when not
+# profiling).
+Configuration = collections.namedtuple(
+    "Configuration",
+    ["name", "build_path", "builder", "executor", "build_profiler"],
+    defaults=[None],
+)
+
+# The outcome of building and testing a configuration: whether it built, its
+# BuildResult (if the builder gave one), and its test results (if tested).
+ConfigurationOutcome = collections.namedtuple(
+    "ConfigurationOutcome", ["name", "built", "build_result", "results"]
+)
 
 
 def create_monitor(watch_path=None, patterns=None, **kwargs):
@@ -44,38 +74,259 @@ def create_monitor(watch_path=None, patterns=None, **kwargs):
         not provided, it will be generated from the watch path.
     :param generator: (optional) the cmake build system generator
     :param defines: (optional) list of var=val strings for CMake's -D option
+    :param timeout: (optional) seconds a test binary may run before it is
+        killed
+    :param test_timeout: (optional) seconds a single test may run before its
+        binary is killed
+    :param force: (optional) run every test binary, even those unchanged since
+        they last passed
+    :param workers: (optional) list of worker addresses to distribute test
+        binaries to
+    :param worker_token: (optional) the token shared with the workers
+    :param preempt: (optional) the phases of a cycle that are cancelled when
+        changes are detected during the cycle: never (default), test, always
+    :param pipeline: (optional) test each test binary as soon as it is linked
+        while the build continues
+    :param build_profile: (optional) report where each build spent its time
+    :param fast: (optional) tune the build for speed, see create_builder()
+    :param syntax_check: (optional) check the syntax of the changed source
+        files before the build: off (default), on, or gate to skip the build
+        when the check fails
+    :param config: (optional) the build configuration, or a list of them to
+        build and test concurrently. Each is NAME[=BUILD_TYPE][,DEFINE...] and
+        has its own build area.
+    :param concurrency: (optional) the most configurations built and tested
+        at once. By default, all of them.
+    :param job_slots: (optional) the number of build and test jobs that may
+        run at once across every ttt on the machine that is given the same
+        number and job_slots_dir
+    :param job_slots_dir: (optional) the directory of the job slots shared by
+        the ttt instances
+    :param abort_on_error: (optional) stop the build as soon as it reports an
+        error
+    :param condensed: (optional) only show the diagnostics of the build
+    :param conan_provider: (optional) the path of a local copy of the conan
+        cmake provider, used in place of downloading it
+    :param flush_interval: (optional) batch the output, writing it out at most
+        once in this many seconds and at the end of each session. By default,
+        DEFAULT_FLUSH_INTERVAL. 0 writes out every line.
+    :param status_line: (optional) show the progress of each session in a
+        status line in place of the per-test output
+    :param event_log: (optional) write the events of the session as JSON
+        lines to this file, or to the Unix socket unix:PATH
+    :param trace: (optional) write a trace of where the time of each cycle
+        goes to this file, in the Chrome trace event format
+    :param metrics: (optional) expose the metrics of the session in the
+        Prometheus text format, served over HTTP on this port or host:port, or
+        written periodically to this file
+    :param profile: (optional) profile each cycle of ttt itself, writing the
+        statistics to the state directory of the build area
+    :param profile_memory: (optional) also trace the memory allocated by ttt
     """
-    build_config = kwargs.pop("config", None)
+    configurations = [
+        parse_configuration(spec) for spec in as_list(kwargs.pop("config", None))
+    ] or [(None, None, [])]
     generator = kwargs.pop("generator", None)
     watch_path = make_watch_path(watch_path)
-    build_path = make_build_path(
-        kwargs.pop("build_path", None), watch_path, build_config
+    given_build_path = kwargs.pop("build_path", None)
+    build_paths = [
+        make_build_path(
+            (
+                "{}-{}".format(given_build_path, name)
+                if given_build_path and len(configurations) > 1
+                else given_build_path
+            ),
+            watch_path,
+            name,
+        )
+        for name, _, _ in configurations
+    ]
+    build_path = build_paths[0]
+    term = Terminal(
+        stream=sys.stdout,
+        flush_interval=first_value(
+            kwargs.pop("flush_interval", None), DEFAULT_FLUSH_INTERVAL
+        ),
     )
-    term = Terminal(stream=sys.stdout)
     exclusions = kwargs.pop("exclude", [])
     watcher = Watcher(watch_path, build_path, patterns, exclusions, term)
 
     run_tests = kwargs.pop("test", False)
-    defines = kwargs.pop("define", [])
+    defines = list(kwargs.pop("define", None) or [])
     clean = kwargs.pop("clean", False)
+    # The modules of the optional features are only loaded when the feature
+    # is asked for, so that they do not slow the startup of every run.
+    syntax_check = kwargs.pop("syntax_check", SYNTAX_CHECK_OFF)
+    syntax_checker = None
+    if syntax_check != SYNTAX_CHECK_OFF:
+        from ttt.syntax import EXPORT_COMPILE_COMMANDS, SyntaxChecker
+
+        defines.append(EXPORT_COMPILE_COMMANDS)
+        syntax_checker = SyntaxChecker(build_path)
     if run_tests:
-        if defines is None:
-            defines = []
         defines.append("ENABLE_TESTS=ON")
-    builder = create_builder(
-        watch_path,
-        build_path,
-        generator=generator,
-        build_config=build_config,
-        defines=defines,
-        term=term,
-        clean=clean,
+    fast = kwargs.pop("fast", False)
+    abort_on_error = kwargs.pop("abort_on_error", False)
+    condensed = kwargs.pop("condensed", False)
+    conan_provider = kwargs.pop("conan_provider", None)
+    # Configurations built concurrently share the cores between them.
+    jobs = cpu_count()
+    parallel = max(1, jobs // len(configurations)) if len(configurations) > 1 else None
+
+    status_line = kwargs.pop("status_line", False)
+    event_log = kwargs.pop("event_log", None)
+    trace = kwargs.pop("trace", None)
+    tracer = None
+    if trace is not None:
+        from ttt.trace import Tracer
+
+        tracer = Tracer(trace)
+    metrics = kwargs.pop("metrics", None)
+    metrics_reporter = None
+    if metrics is not None:
+        from ttt.metrics import MetricsReporter
+
+        metrics_reporter = MetricsReporter(files=lambda: len(watcher.filelist))
+    profile_memory = kwargs.pop("profile_memory", False)
+    profiler = None
+    if kwargs.pop("profile", False) or profile_memory:
+        from ttt.profiling import Profiler
+
+        profiler = Profiler(
+            state_path(build_path, "profile"), memory=profile_memory, term=term
+        )
+    status = None
+    if status_line:
+        from ttt.status import DurationHistory, StatusLine
+
+        status = StatusLine(
+            term, DurationHistory(state_path(build_path, "durations.json"))
+        )
+    reporters = [TerminalReporter(watch_path, build_path, terminal=term, status=status)]
+
+    timeout = kwargs.pop("timeout", None)
+    test_timeout = kwargs.pop("test_timeout", None)
+    force = kwargs.pop("force", False)
+    workers = kwargs.pop("workers", None)
+    worker_token = kwargs.pop("worker_token", None)
+    if workers:
+        if not worker_token:
+            raise ValueError("Workers require a token")
+        from ttt.remote import WorkerPool
+    preempt = kwargs.pop("preempt", PREEMPT_NEVER)
+    pipeline = kwargs.pop("pipeline", False)
+    build_profile = kwargs.pop("build_profile", False)
+    slot_count = kwargs.pop("job_slots", None)
+    job_slots = None
+    if slot_count:
+        from ttt.jobslots import JobSlots
+
+        job_slots = JobSlots(slot_count, kwargs.pop("job_slots_dir", None))
+
+    def create_configuration(configuration, build_path):
+        name, build_config, configuration_defines = configuration
+        builder = create_builder(
+            watch_path,
+            build_path,
+            generator=generator,
+            build_config=build_config,
+            defines=defines + configuration_defines,
+            term=term,
+            clean=clean,
+            fast=fast,
+            parallel=parallel,
+            job_slots=job_slots,
+            abort_on_error=abort_on_error,
+            condensed=condensed,
+            conan_provider=conan_provider,
+            configure_inputs=lambda: {
+                path: watched.mtime for path, watched in watcher.filelist.items()
+            },
+        )
+        executor = (
+            Executor(
+                timeout=timeout,
+                test_timeout=test_timeout,
+                catalogue=Catalogue(state_path(build_path, "catalogue.json")),
+                result_cache=(
+                    None
+                    if force
+                    else ResultCache(state_path(build_path, "results.json"), build_path)
+                ),
+                workers=WorkerPool(workers, worker_token) if workers else None,
+                job_slots=job_slots,
+                tracer=tracer,
+            )
+            if run_tests
+            else None
+        )
+        return Configuration(
+            name,
+            build_path,
+            builder,
+            executor,
+            create_profiler(build_path) if build_profile else None,
+        )
+
+    configurations = [
+        create_configuration(configuration, build_paths[i])
+        for i, configuration in enumerate(configurations)
+    ]
+    monitor = Monitor(
+        watcher,
+        configurations[0].builder,
+        configurations[0].executor,
+        reporters,
+        preempt=preempt,
+        pipeline=pipeline,
+        build_profiler=configurations[0].build_profiler,
+        syntax_checker=syntax_checker,
+        syntax_gate=syntax_check == SYNTAX_CHECK_GATE,
+        configurations=configurations if len(configurations) > 1 else None,
+        concurrency=kwargs.pop("concurrency", None),
+        progress=status_line or event_log is not None,
+        tracer=tracer,
+        metrics=metrics_reporter,
+        profiler=profiler,
     )
+    if metrics_reporter is not None:
+        from ttt.metrics import export_metrics
+
+        monitor.add_reporter(metrics_reporter)
+        export_metrics(metrics_reporter.registry, metrics)
+    if event_log is not None:
+        from ttt.eventlog import EventLogReporter, open_event_stream
+
+        monitor.add_reporter(
+            EventLogReporter(open_event_stream(event_log)), background=True
+        )
+    return monitor
+
+
+def as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
 
-    reporters = [TerminalReporter(watch_path, build_path)]
+def parse_configuration(spec):
+    """Parses a configuration given as NAME[=BUILD_TYPE][,DEFINE...].
 
-    executor = Executor() if run_tests else None
-    return Monitor(watcher, builder, executor, reporters)
+    The build type defaults to the name. The defines are var=val strings for
+    CMake's -D option that apply to the configuration only.
+
+      >>> parse_configuration("Release")
+      ('Release', 'Release', [])
+      >>> parse_configuration("asan=Debug,SANITIZE=address")
+      ('asan', 'Debug', ['SANITIZE=address'])
+
+    :return (name, build type, defines) tuple
+    """
+    head, *defines = spec.split(",")
+    name, _, build_type = head.partition("=")
+    return name, build_type or name, defines
 
 
 def make_watch_path(watch_path=None):
@@ -153,35 +404,176 @@ class Monitor(object):
         listeners)
         :param interval: (optional) the time in seconds to wait between
             checking for changes
+        :param preempt: (optional) the policy for cancelling a cycle in
+            progress when changes are detected: never (default), test, always
+        :param pipeline: (optional) test each test binary as soon as it is
+            linked while the build continues
+        :param build_profiler: (optional) the :class:`BuildProfiler` that
+            reports where each build spent its time
+        :param syntax_checker: (optional) the :class:`SyntaxChecker` that
+            checks the changed source files before the build
+        :param syntax_gate: (optional) skip the build and test when the syntax
+            check fails
+        :param configurations: (optional) a list of :class:`Configuration`
+            objects to build and test concurrently in place of the builder and
+            executor
+        :param concurrency: (optional) the most configurations built and tested
+            at once. By default, all of them.
+        :param progress: (optional) notify the phase of each build step, the
+            work planned for each test session, and the outcome of each test as
+            it happens
+        :param tracer: (optional) the :class:`Tracer` that records the spans
+            of each cycle: the scans, the build phases, the collection of the
+            test binaries, and the reporting. The trace is written at the end
+            of each cycle and when the monitor is closed.
+        :param metrics: (optional) the :class:`MetricsReporter` that is also
+            told of every scan of the watch area
+        :param profiler: (optional) the :class:`Profiler` of each cycle, whose
+            report is written out when the monitor is closed
         """
         self.watcher = watcher
         self.builder = builder
         self.executor = executor
         self.reporters = reporters
+        self.bus = EventBus()
+        for reporter in reporters:
+            self.bus.subscribe(reporter)
 
         self.operations = Operations()
         self.runstate = Runstate()
         self.last_failed = 0
+        self.last_failed_configurations = {}
         self.polling_interval = first_value(
             kwargs.get("interval"), Monitor.DEFAULT_POLLING_INTERVAL
         )
+        preempt = first_value(kwargs.get("preempt"), PREEMPT_NEVER)
+        if preempt not in PREEMPT_POLICIES:
+            raise ValueError("Unknown preempt policy: {}".format(preempt))
+        self.preemptible = PREEMPT_POLICIES[preempt]
+        self.phase = None
+        # the reporters are told of one event at a time, whichever thread the
+        # event comes from
+        self.notify_lock = threading.Lock()
+        self.pending = None
+        self.pending_lock = threading.Lock()
+        self.pipeline = first_value(kwargs.get("pipeline"), False)
+        self.build_profiler = kwargs.get("build_profiler")
+        self.syntax_checker = kwargs.get("syntax_checker")
+        self.syntax_gate = first_value(kwargs.get("syntax_gate"), False)
+        self.configurations = kwargs.get("configurations")
+        self.concurrency = kwargs.get("concurrency")
+        self.progress = first_value(kwargs.get("progress"), False)
+        self.tracer = kwargs.get("tracer")
+        self.metrics = kwargs.get("metrics")
+        self.profiler = kwargs.get("profiler")
+        if self.progress:
+            executors = [self.executor] + [
+                c.executor for c in self.configurations or []
+            ]
+            for executor in executors:
+                if executor is not None:
+                    executor.progress = self.test_progress
 
         # The first poll is to initialise the watcher with the source tree
         # before the actual polling loop.
-        self.watcher.poll()
+        self.poll()
 
     def notify(self, message, *args):
         """
         Notifies all registered reporters for the given message. It is expected
         that the message given complies with what is expected by the Reporter
         interface.
+
+        Events may be notified from any thread.
         """
-        for r in self.reporters:
-            try:
-                command = getattr(r, message)
-                command(*args)
-            except AttributeError:
-                pass
+        with self.notify_lock:
+            if self.tracer is None:
+                self.bus.publish(message, *args)
+                return
+            with self.tracer.span(message, category="report"):
+                self.bus.publish(message, *args)
+
+    def poll(self):
+        """Polls the watcher for changes to the watch area.
+
+        :return the :class:`WatchState`
+        """
+        if self.tracer is None:
+            watchstate = self.watcher.poll()
+        else:
+            with self.tracer.span("scan", category="watch"):
+                watchstate = self.watcher.poll()
+        if self.metrics is not None:
+            self.metrics.report_scan(watchstate)
+        return watchstate
+
+    def testlist(self, **kwargs):
+        """Collects the test binaries found by the watcher."""
+        if self.tracer is None:
+            return self.watcher.testlist(**kwargs)
+        with self.tracer.span("testlist", category="watch"):
+            return self.watcher.testlist(**kwargs)
+
+    def run_builder(self, builder, **options):
+        """Runs a builder, tracing each phase of the build.
+
+        :param builder: the builder
+        :param options: the options passed to the builder
+        :return the result of the builder
+        """
+        if self.tracer is None:
+            return builder(**options)
+        phases = []
+        notify = options.get("phase")
+
+        def phase(name):
+            phases.append((name, timer()))
+            if notify is not None:
+                notify(name)
+
+        options["phase"] = phase
+        try:
+            return builder(**options)
+        finally:
+            # each phase lasts until the next starts, or the build ends
+            ends = [start for _, start in phases[1:]] + [timer()]
+            for (name, start), end in zip(phases, ends, strict=True):
+                self.tracer.complete(name, start, end - start, category="build")
+
+    def add_reporter(self, reporter, background=False, **kwargs):
+        """Registers another reporter.
+
+        :param reporter: the :class:`Reporter`
+        :param background: (optional) run the reporter on a thread of its own
+            so that it does not hold up the cycle
+        :param queue_size: (optional) the most events that may wait for a
+            background reporter
+        :param policy: (optional) when the queue of a background reporter is
+            full, drop (default) the event or block until there is room
+        """
+        self.reporters.append(reporter)
+        self.bus.subscribe(reporter, background=background, **kwargs)
+
+    def close(self):
+        """Waits for background reporters to report the events queued, and
+        writes the trace and the profile."""
+        self.bus.close()
+        if self.tracer is not None:
+            self.tracer.save()
+        if self.profiler is not None:
+            self.profiler.report()
+
+    def profiled(self):
+        """Profiles the body of a 'with' block as a cycle, when profiling."""
+        if self.profiler is None:
+            return contextlib.nullcontext()
+        return self.profiler.cycle()
+
+    def test_progress(self, progress):
+        self.notify("report_test_progress", progress)
+
+    def build_phase(self, phase):
+        self.notify("report_phase", phase)
 
     def report_change(self, watchstate):
         """Get a function that will notify observers that there was a change."""
@@ -191,29 +583,274 @@ class Monitor(object):
 
         return fn
 
-    def build(self):
-        """Builds the binaries."""
+    def syntax_check(self, watchstate):
+        """Get a function that will check the syntax of the changed source
+        files.
+
+        When the check fails and the syntax gate is set, the rest of the
+        operations are skipped.
+        """
+
+        def fn():
+            self.phase = "build"
+            results = self.syntax_checker.check(watchstate.inserts | watchstate.updates)
+            if not results:
+                return
+            self.notify("report_syntax_check", results)
+            if self.syntax_gate and any(r.returncode != 0 for r in results):
+                self.operations.reset()
+
+        return fn
+
+    def build(self, listener=None):
+        """Builds the binaries.
+
+        :param listener: (optional) a line listener given each line of the
+            build output
+        :return True if the build succeeded
+        """
+        self.phase = "build"
+        return self.build_session(listener)
+
+    def build_session(self, listener=None):
+        """Builds the binaries in a session of its own, leaving the phase of
+        the cycle to the caller.
+
+        :param listener: (optional) as for build()
+        :return True if the build succeeded
+        """
         self.notify("session_start", "build")
         self.notify("report_build_path")
+        succeeded, _, duration = self.build_with(
+            self.builder,
+            self.notify,
+            listener=listener,
+            build_profiler=self.build_profiler,
+        )
+        if not succeeded:
+            self.operations.reset()
+        self.notify("session_end", "build", duration)
+        return succeeded
+
+    def build_with(self, builder, notify, listener=None, build_profiler=None):
+        """Builds the binaries with a builder, notifying how the build went.
+
+        :param builder: the builder
+        :param notify: notifies the reporters of an event, as notify()
+        :param listener: (optional) a line listener given each line of the
+            build output
+        :param build_profiler: (optional) the :class:`BuildProfiler` of the
+            build area
+        :return (succeeded, result, duration) tuple: whether the build
+            succeeded, the result of the builder (None if it raised), and the
+            seconds that the build took
+        """
+        if build_profiler is not None:
+            build_profiler.mark()
+        result = None
+        start = timer()
         try:
-            start = timer()
-            self.builder()
+            options = {}
+            if listener is not None:
+                options["listener"] = listener
+            if self.progress:
+                options["phase"] = self.build_phase
+            result = self.run_builder(builder, **options)
             end = timer()
-        except KeyboardInterrupt as e:
-            raise e
+            if isinstance(result, BuildResult):
+                notify("report_build_steps", result.steps)
+                if result.compiler_cache is not None:
+                    notify("report_compiler_cache", *result.compiler_cache)
+                if result.first_error is not None:
+                    notify("report_first_error", result.first_error)
+            succeeded = not build_failed(result)
         except subprocess.CalledProcessError:
             end = timer()
-            self.notify("report_build_failure")
-            self.operations.reset()
-        self.notify("session_end", "build", end - start)
+            succeeded = False
+        if build_profiler is not None:
+            profile = build_profiler.collect()
+            if profile is not None:
+                notify("report_build_profile", profile)
+        if not succeeded:
+            notify("report_build_failure")
+        return succeeded, result, end - start
+
+    def build_and_test(self):
+        """Builds the binaries, testing each test binary as soon as it has
+        been linked while the rest of the build continues.
 
-    def test(self):
-        """Executes the tests."""
+        The build runs on a background thread. Its output is watched for test
+        executables that have finished linking, and these are handed to the
+        executor as they appear. The test binaries not relinked by the build
+        are tested once the build has finished.
+
+        Only this thread moves the cycle on from the build phase to the test
+        phase, once the build has finished.
+        """
         if self.executor is None:
+            self.build()
             return
+
+        self.phase = "build"
+        testfiles = self.watcher.testfiles()
+        detector = LinkDetector(self.watcher.build_path, testfiles)
+        linked = queue.Queue()
+        outcome = {}
+
+        def listener(channel, line):
+            for source, path in detector(line):
+                linked.put((source, path))
+
+        def build():
+            try:
+                outcome["succeeded"] = self.build_session(listener=listener)
+            except BaseException as e:  # noqa: B036 re-raised on the main thread
+                outcome["error"] = e
+            finally:
+                linked.put(None)
+
+        def testlist():
+            dispatched = set()
+            while True:
+                item = linked.get()
+                if item is None:
+                    self.phase = "test"
+                    break
+                source, path = item
+                if path not in dispatched:
+                    dispatched.add(path)
+                    yield self.watcher.create_test(source, path)
+            if outcome.get("succeeded"):
+                for test in self.testlist():
+                    if test.executable() not in dispatched:
+                        yield test
+
+        thread = threading.Thread(target=build, name="build", daemon=True)
+        thread.start()
+        try:
+            self.test_session(testlist())
+        except BaseException:
+            # the build has its own process group, so make sure it stops too
+            subproc.cancel()
+            raise
+        finally:
+            thread.join()
+        if "error" in outcome:
+            raise outcome["error"]
+
+    def build_and_test_configurations(self):
+        """Builds and tests each configuration, running the configurations
+        concurrently."""
+        self.run_configurations(self.configurations)
+
+    def test_configurations(self, configurations):
+        """Get a function that will test the given configurations without
+        building them."""
+
+        def fn():
+            self.run_configurations(configurations, build=False)
+
+        return fn
+
+    def run_configurations(self, configurations, build=True):
+        """Builds and tests configurations, running them concurrently.
+
+        The events of each configuration are reported once all of them have
+        finished, in a session of its own, followed by a summary across the
+        configurations.
+
+        :param configurations: the :class:`Configuration` objects
+        :param build: (optional) build each configuration before testing it.
+            Otherwise, only test it.
+        """
+        descriptor = "build and test" if build else "test"
+        self.phase = "build" if build else "test"
+        self.notify("session_start", descriptor)
+        start = timer()
+        from concurrent.futures import ThreadPoolExecutor
+
+        pool = ThreadPoolExecutor(
+            max_workers=self.concurrency or len(configurations),
+            thread_name_prefix="configuration",
+        )
+        try:
+            runs = list(
+                pool.map(
+                    functools.partial(self.build_and_test_configuration, build=build),
+                    configurations,
+                )
+            )
+        except BaseException:
+            # the builds and tests run in their own process groups
+            subproc.cancel()
+            raise
+        finally:
+            pool.shutdown(wait=True)
+        self.notify("session_end", descriptor, timer() - start)
+
+        fixed = []
+        for configuration, (outcome, events) in zip(configurations, runs, strict=True):
+            self.notify("session_start", outcome.name)
+            for message, args in events:
+                self.notify(message, *args)
+            self.notify("session_end", outcome.name)
+            if outcome.results is not None:
+                failed = outcome.results["total_failed"]
+                if failed == 0 and self.last_failed_configurations.get(outcome.name):
+                    fixed.append(configuration)
+                self.last_failed_configurations[outcome.name] = failed
+        self.notify("report_configurations", [outcome for outcome, _ in runs])
+        if fixed:
+            self.operations.append(self.test_configurations(fixed))
+
+    def build_and_test_configuration(self, configuration, build=True):
+        """Builds and tests a single configuration.
+
+        Its events are collected rather than notified, so that they are
+        reported together once every configuration has finished.
+
+        :param configuration: the :class:`Configuration`
+        :param build: (optional) build the configuration before testing it
+        :return (:class:`ConfigurationOutcome`, events) tuple, the events a
+            list of (message, args) tuples
+        """
+        events = []
+
+        def notify(message, *args):
+            events.append((message, args))
+
+        built, result = True, None
+        if build:
+            built, result, _ = self.build_with(
+                configuration.builder,
+                notify,
+                build_profiler=configuration.build_profiler,
+            )
+        results = None
+        if built and configuration.executor is not None:
+            results = self.test_with(
+                configuration.executor, notify, build_path=configuration.build_path
+            )
+        return ConfigurationOutcome(configuration.name, built, result, results), events
+
+    def test(self, testlist=None):
+        """Executes the tests.
+
+        :param testlist: (optional) the tests to execute, as for test_with()
+        """
+        if self.executor is None:
+            return
+        self.phase = "test"
+        self.test_session(testlist)
+
+    def test_session(self, testlist=None):
+        """Executes the tests in a session of their own, leaving the phase of
+        the cycle to the caller.
+
+        :param testlist: (optional) as for test()
+        """
         self.notify("session_start", "test")
-        results = self.executor.test(self.watcher.testlist())
-        self.notify("report_results", results)
+        results = self.test_with(self.executor, self.notify, testlist)
         self.notify("session_end", "test")
 
         if results["total_failed"] == 0 and self.last_failed > 0:
@@ -221,38 +858,120 @@ class Monitor(object):
             self.operations.append(self.test)
         self.last_failed = results["total_failed"]
 
+    def test_with(self, executor, notify, testlist=None, **kwargs):
+        """Executes the tests with an executor, notifying their results.
+
+        :param executor: the :class:`Executor`
+        :param notify: notifies the reporters of an event, as notify()
+        :param testlist: (optional) the tests to execute. By default, these
+            are the test binaries found by the watcher, and when the progress
+            is notified, the work planned is reported before they are executed.
+        :param kwargs: (optional) passed to the watcher when finding the test
+            binaries, e.g. the build_path of a configuration
+        :return the results of the executor
+        """
+        if testlist is None:
+            testlist = self.testlist(**kwargs)
+            if self.progress:
+                notify("report_plan", executor.plan(testlist))
+        results = executor.test(testlist)
+        notify("report_results", results)
+        return results
+
     def run(self, **kwargs):
         """The main polling loop of the monitor."""
         step_mode = first_value(kwargs.get("step"), False)
-        while self.runstate.active():
-            try:
-                self.check_for_changes()
-                self.wait()
-            except KeyboardInterrupt:
-                self.notify("interrupt_detected")
-                if self.executor is not None:
-                    self.executor.clear_filter()
-                self.verify_stop()
+        try:
+            while self.runstate.active():
+                try:
+                    self.check_for_changes()
+                    self.wait()
+                except KeyboardInterrupt:
+                    self.notify("interrupt_detected")
+                    if self.executor is not None:
+                        self.executor.clear_filter()
+                        self.executor.clear_cache()
+                    self.verify_stop()
 
-            if step_mode:
-                break
+                if step_mode:
+                    break
+        finally:
+            if not self.runstate.active():
+                self.close()
 
     def check_for_changes(self):
         """The work side of the polling.
 
         If there were changes, then executes the base set of operations.
+
+        Changes detected in the background while the operations run are
+        carried into the next check. Depending on the preempt policy, they
+        also cancel the build or test in progress so that the next check
+        starts straight away.
+
+        When profiling, the statistics of each check that ran the operations
+        are kept as a cycle of their own.
         """
-        watchstate = self.watcher.poll()
+        if self.profiler is None:
+            self.run_operations()
+            return
+        self.profiler.start()
+        ran = False
+        try:
+            ran = self.run_operations()
+        finally:
+            self.profiler.stop(keep=ran)
+
+    def run_operations(self):
+        """Polls for changes and, if there were any, executes the base set
+        of operations.
+
+        :return True if the operations were executed
+        """
+        watchstate = self.poll()
+        with self.pending_lock:
+            if self.pending is not None:
+                watchstate = merge_watchstates(self.pending, watchstate)
+                self.pending = None
         if has_changes(watchstate) or self.runstate.allowed_once():
-            self.operations.append(
-                self.report_change(watchstate), self.build, self.test
-            )
-            self.operations.run()
+            self.operations.append(self.report_change(watchstate))
+            if self.syntax_checker is not None:
+                self.operations.append(self.syntax_check(watchstate))
+            if self.configurations:
+                self.operations.append(self.build_and_test_configurations)
+            elif self.pipeline:
+                self.operations.append(self.build_and_test)
+            else:
+                self.operations.append(self.build, self.test)
+            try:
+                with ChangePoller(self, enabled=bool(self.preemptible)):
+                    self.operations.run()
+            except subproc.Cancelled as e:
+                self.operations.reset()
+                self.notify("report_interrupt", e)
+                return True
+            finally:
+                self.phase = None
+                subproc.uncancel()
             self.notify("wait_change")
+            if self.tracer is not None:
+                self.tracer.save()
+            return True
+        return False
+
+    def changes_detected(self, watchstate):
+        """Records changes detected while operations are running, cancelling
+        the operation in progress if the preempt policy allows it."""
+        with self.pending_lock:
+            if self.pending is None:
+                self.pending = watchstate
+            else:
+                self.pending = merge_watchstates(self.pending, watchstate)
+        if self.phase in self.preemptible:
+            subproc.cancel()
 
     def wait(self):
         """The wait side of the polling."""
-        self.notify("wait")
         time.sleep(self.polling_interval)
 
     def verify_stop(self):
@@ -266,6 +985,41 @@ class Monitor(object):
             self.runstate.stop()
 
 
+class ChangePoller(object):
+    """Polls the watcher on a background thread for the duration of a 'with'
+    block, passing any changes to the monitor.
+
+    :param monitor: the :class:`Monitor` being polled for
+    :param enabled: (optional) whether to poll at all
+    """
+
+    def __init__(self, monitor, enabled=True):
+        self.monitor = monitor
+        self.enabled = enabled
+        self._stop = threading.Event()
+        self._thread = None
+
+    def __enter__(self):
+        if self.enabled:
+            self._thread = threading.Thread(
+                target=self.poll, name="poller", daemon=True
+            )
+            self._thread.start()
+        return self
+
+    def __exit__(self, *args):
+        if self._thread is not None:
+            self._stop.set()
+            self._thread.join()
+
+    def poll(self):
+        monitor = self.monitor
+        while not self._stop.wait(monitor.polling_interval):
+            watchstate = monitor.poll()
+            if has_changes(watchstate):
+                monitor.changes_detected(watchstate)
+
+
 class Runstate(object):
     """Tracks the run state of a test session to support KeyboardInterrupt
     control of the current session."""
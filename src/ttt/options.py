@@ -0,0 +1,39 @@
+"""
+ttt.options
+~~~~~~~~~~~~
+This module defines the values of the options shared by the command line and
+the monitor.
+
+It imports nothing so that the command line can be parsed without loading
+the modules that build, watch, and test.
+:copyright: (c) yerejm
+"""
+
+DEFAULT_SOURCE_PATTERNS = [
+    "*.cc",
+    "*.c",
+    "*.h",
+    "*.cmake",
+    "CMakeLists.txt",
+]
+
+# When changes are detected while a cycle is in progress, the policies for
+# which phases of the cycle are cancelled so that a new cycle can start.
+PREEMPT_NEVER = "never"
+PREEMPT_TEST = "test"
+PREEMPT_ALWAYS = "always"
+PREEMPT_POLICIES = {
+    PREEMPT_NEVER: (),
+    PREEMPT_TEST: ("test",),
+    PREEMPT_ALWAYS: ("build", "test"),
+}
+# The most often, in seconds, that the output is written out. A test binary
+# writes a character for each test, and writing each out on its own is slow,
+# e.g. over ssh. The output is also written out at the end of each session.
+DEFAULT_FLUSH_INTERVAL = 0.1
+# Whether the changed source files have their syntax checked before the build,
+# and whether a failed check skips the build.
+SYNTAX_CHECK_OFF = "off"
+SYNTAX_CHECK_ON = "on"
+SYNTAX_CHECK_GATE = "gate"
+SYNTAX_CHECK_MODES = [SYNTAX_CHECK_OFF, SYNTAX_CHECK_ON, SYNTAX_CHECK_GATE]
@@ -0,0 +1,145 @@
+"""
+ttt.profiling
+~~~~~~~~~~~~
+This module implements the profiling of ttt itself, for when ttt is slow.
+
+Each cycle of the monitor is profiled with cProfile and, optionally, the
+memory allocated is traced with tracemalloc. The statistics of each cycle are
+written to a file of its own in the state directory of the build area, where
+they can be loaded with pstats or snakeviz. The functions that took the most
+time across the session are written out at the end.
+
+cProfile profiles only the thread that it is started on, so the work done on
+other threads, e.g. a pipelined build, is only seen as the time that the
+monitor waited for it.
+:copyright: (c) yerejm
+"""
+
+import cProfile
+import os
+import pstats
+import tracemalloc
+
+from ttt.terminal import Terminal
+
+# The number of functions, and of allocation sites, written out at the end.
+PROFILE_TOP = 20
+
+
+class Profiler(object):
+    """Profiles the cycles of a session.
+
+    :param directory: the directory that the statistics are written to
+    :param memory: (optional) also trace the memory allocated
+    :param term: (optional) the :class:`Terminal` that the functions that
+        took the most time are written to
+    :param top: (optional) the number of functions written out
+    """
+
+    def __init__(self, directory, memory=False, term=None, top=PROFILE_TOP):
+        self.directory = directory
+        self.memory = memory
+        self.term = term if term is not None else Terminal()
+        self.top = top
+        self.cycles = 0
+        self.stats = None
+        self.snapshot = None
+        self._profile = None
+        if memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+
+    def start(self):
+        """Starts profiling a cycle."""
+        self._profile = cProfile.Profile()
+        self._profile.enable()
+
+    def stop(self, keep=True):
+        """Stops profiling a cycle.
+
+        :param keep: (optional) write the statistics of the cycle to a file of
+            their own. Otherwise, e.g. for a poll that found no changes, the
+            statistics only count towards the totals of the session.
+        """
+        profile = self._profile
+        if profile is None:
+            return
+        self._profile = None
+        profile.disable()
+        stats = pstats.Stats(profile)
+        if self.stats is None:
+            self.stats = stats
+        else:
+            self.stats.add(stats)
+        if not keep:
+            return
+        self.cycles += 1
+        os.makedirs(self.directory, exist_ok=True)
+        stats.dump_stats(self.path("prof"))
+        if self.memory:
+            self.snapshot = tracemalloc.take_snapshot()
+            self.snapshot.dump(self.path("heap"))
+
+    def path(self, suffix):
+        return os.path.join(
+            self.directory, "cycle-{:04d}.{}".format(self.cycles, suffix)
+        )
+
+    def cycle(self):
+        """Profiles the body of a 'with' block as a cycle."""
+        return ProfiledCycle(self)
+
+    def report(self):
+        """Writes the statistics of the session to a file, and writes out the
+        functions that took the most time of their own."""
+        if self.stats is None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        path = os.path.join(self.directory, "session.prof")
+        self.stats.dump_stats(path)
+        writeln = self.term.writeln
+        writeln("Profile of {} cycles written to {}".format(self.cycles, path))
+        writeln(
+            "{:>10} {:>10} {:>10}  function".format("own (s)", "total (s)", "calls")
+        )
+        for function, own, total, calls in hot_functions(self.stats, self.top):
+            writeln("{:10.3f} {:10.3f} {:>10}  {}".format(own, total, calls, function))
+        if self.snapshot is not None:
+            writeln("Memory allocated at the end of the last cycle:")
+            for stat in self.snapshot.statistics("lineno")[: self.top]:
+                writeln(
+                    "{:10.1f} KiB {:>10}  {}".format(
+                        stat.size / 1024, stat.count, stat.traceback
+                    )
+                )
+
+
+class ProfiledCycle(object):
+    """Profiles a cycle for the duration of a 'with' block.
+
+    :param profiler: the :class:`Profiler`
+    """
+
+    def __init__(self, profiler):
+        self.profiler = profiler
+
+    def __enter__(self):
+        self.profiler.start()
+        return self
+
+    def __exit__(self, *args):
+        self.profiler.stop()
+
+
+def hot_functions(stats, top=PROFILE_TOP):
+    """Gets the functions that took the most time of their own.
+
+    :param stats: the :class:`pstats.Stats`
+    :param top: (optional) the number of functions
+    :return a list of (function, own seconds, total seconds, calls) tuples,
+        the function as file:line(name)
+    """
+    functions = sorted(stats.stats.items(), key=lambda item: item[1][2], reverse=True)
+    return [
+        ("{}:{}({})".format(*function), own, total, calls)
+        for function, (_, calls, own, total, _) in functions[:top]
+    ]
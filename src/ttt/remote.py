@@ -0,0 +1,416 @@
+"""
+ttt.remote
+~~~~~~~~~~~~
+This module implements the distribution of test binaries to workers.
+
+A worker is a ttt process (started with ttt-worker) that listens on a TCP or
+Unix domain socket and runs the test binaries it is sent, streaming each line
+of output back as it is emitted. The test binaries are expected to be at the
+same path on the worker, e.g. through a shared file system.
+
+A worker only runs executables under its build root, with only --gtest_*
+arguments, and only for coordinators that present the token it shares with
+them. It listens on localhost unless it is given a host.
+
+The protocol is JSON, one object per line. The coordinator sends one request
+per connection:
+
+  {"token": "...", "command": ["/path/to/test_core", "--gtest_filter=..."],
+   "timeout": 10}
+
+A request that is refused is answered with the reason:
+
+  {"error": "..."}
+
+Otherwise, the worker replies with any number of output lines followed by the
+outcome:
+
+  {"channel": "stdout", "line": "[ RUN      ] core.ok"}
+  {"returncode": 0}
+
+or, when the command exceeded its timeout and was killed:
+
+  {"timeout": true}
+
+Closing the connection before the outcome is sent kills the command.
+:copyright: (c) yerejm
+"""
+
+import hmac
+import json
+import os
+import queue
+import select
+import socket
+import socketserver
+import subprocess
+import sys
+import threading
+from timeit import default_timer as timer
+
+# How long, in seconds, to wait when connecting to a worker.
+CONNECT_TIMEOUT = 2
+
+# How often, in seconds, the coordinator checks its watchdog while waiting for
+# output from a worker.
+POLL_INTERVAL = 0.1
+
+# The host that a worker listens on when given only a port.
+DEFAULT_HOST = "127.0.0.1"
+# The token shared by a worker and its coordinators.
+TOKEN_ENV = "TTT_WORKER_TOKEN"
+# The only arguments that a worker passes to a test binary.
+GTEST_ARGUMENT_PREFIX = "--gtest_"
+
+
+class WorkerError(Exception):
+    """Raised when a worker cannot be reached or stops responding."""
+
+
+def parse_address(address):
+    """Converts an address into a socket family and socket address.
+
+    Addresses of the form unix:/path, or any address containing a path
+    separator, are Unix domain socket paths. Otherwise, the address is
+    host:port, or a port on localhost.
+    """
+    if address.startswith("unix:"):
+        return socket.AF_UNIX, address[len("unix:") :]
+    if os.sep in address or "/" in address:
+        return socket.AF_UNIX, address
+    if address.isdigit():
+        return socket.AF_INET, (DEFAULT_HOST, int(address))
+    host, _, port = address.rpartition(":")
+    if not host or not port.isdigit():
+        raise ValueError("Invalid worker address: {}".format(address))
+    return socket.AF_INET, (host, int(port))
+
+
+def connect(address, timeout=CONNECT_TIMEOUT):
+    family, sockaddr = parse_address(address)
+    sock = socket.socket(family, socket.SOCK_STREAM)
+    sock.settimeout(timeout)
+    try:
+        sock.connect(sockaddr)
+    except OSError as e:
+        sock.close()
+        raise WorkerError("Cannot connect to worker {}: {}".format(address, e)) from e
+    return sock
+
+
+def send_message(stream, message):
+    stream.write((json.dumps(message) + "\n").encode("utf-8"))
+    stream.flush()
+
+
+def check_command(command, build_root):
+    """Checks that a command runs a test binary under the build root.
+
+    :param command: the command in list form
+    :param build_root: the directory that the test binaries must be under
+    :return the reason that the command is refused, or None if it is allowed
+    """
+    if not isinstance(command, list) or not command:
+        return "no command"
+    if not all(isinstance(arg, str) for arg in command):
+        return "invalid command"
+    executable = os.path.realpath(command[0])
+    root = os.path.realpath(build_root)
+    if os.path.commonpath([executable, root]) != root:
+        return "{} is not under the build root".format(command[0])
+    if not os.path.isfile(executable) or not os.access(executable, os.X_OK):
+        return "{} is not an executable".format(command[0])
+    for arg in command[1:]:
+        if not arg.startswith(GTEST_ARGUMENT_PREFIX):
+            return "argument {} is not a gtest option".format(arg)
+    return None
+
+
+class RemoteRunner(object):
+    """Runs commands on a single worker.
+
+    An instance is a drop-in replacement for subproc.streamed_call.
+
+    :param address: the address of the worker
+    :param token: the token shared with the worker
+    """
+
+    def __init__(self, address, token):
+        self.address = address
+        self.token = token
+
+    def __call__(self, command, listener=None, timeout=None, watchdog=None):
+        """Runs the command on the worker.
+
+        :param command: the command in list form
+        :param listener: (optional) the line listener, called as for
+            streamed_call
+        :param timeout: (optional) seconds the command may run
+        :param watchdog: (optional) a callable polled while the command runs.
+            When it returns True, the command is killed.
+        :return (returncode, stdout list, stderr list) tuple
+        """
+        sock = connect(self.address)
+        start = timer()
+        stdout = []
+        stderr = []
+
+        def expired():
+            # The worker enforces the timeout; this guards against a worker
+            # that stops responding.
+            return (watchdog is not None and watchdog()) or (
+                timeout is not None and timer() - start > timeout + CONNECT_TIMEOUT
+            )
+
+        try:
+            request = {"token": self.token, "command": command, "timeout": timeout}
+            sock.sendall((json.dumps(request) + "\n").encode("utf-8"))
+            limited = timeout is not None or watchdog is not None
+            sock.settimeout(POLL_INTERVAL if limited else None)
+            buffered = b""
+            while True:
+                end = buffered.find(b"\n")
+                if end < 0:
+                    try:
+                        data = sock.recv(65536)
+                    except socket.timeout:
+                        if expired():
+                            raise subprocess.TimeoutExpired(
+                                command, timer() - start, output=stdout, stderr=stderr
+                            ) from None
+                        continue
+                    if not data:
+                        raise WorkerError(
+                            "Worker {} closed the connection".format(self.address)
+                        )
+                    buffered += data
+                    continue
+
+                message = json.loads(buffered[:end].decode("utf-8"))
+                buffered = buffered[end + 1 :]
+                if "line" in message:
+                    line = message["line"]
+                    is_stdout = message.get("channel") == "stdout"
+                    (stdout if is_stdout else stderr).append(line)
+                    if listener is not None:
+                        listener(sys.stdout if is_stdout else sys.stderr, line)
+                elif "error" in message:
+                    raise WorkerError(
+                        "Worker {} refused: {}".format(self.address, message["error"])
+                    )
+                elif message.get("timeout"):
+                    raise subprocess.TimeoutExpired(
+                        command, timer() - start, output=stdout, stderr=stderr
+                    )
+                else:
+                    return (message["returncode"], stdout, stderr)
+        except (OSError, ValueError, KeyError) as e:
+            raise WorkerError("Worker {} failed: {}".format(self.address, e)) from e
+        finally:
+            sock.close()
+
+
+class WorkerPool(object):
+    """The set of workers that test binaries may be distributed to.
+
+    :param addresses: a list of worker addresses
+    :param token: the token shared with the workers
+    """
+
+    def __init__(self, addresses, token):
+        self.addresses = list(addresses)
+        self.token = token
+
+    def runners(self):
+        """Gets a runner for each worker that is currently reachable."""
+        runners = []
+        for address in self.addresses:
+            try:
+                connect(address).close()
+            except WorkerError:
+                continue
+            runners.append(RemoteRunner(address, self.token))
+        return runners
+
+
+class Dispatcher(object):
+    """Runs tests on workers concurrently, one test binary per worker at a
+    time.
+
+    Tests are queued with put() and taken by whichever worker is free. A
+    worker that fails is dropped, and the test it was running is handed back
+    by finish() so that it can be run elsewhere.
+
+    :param runners: a list of :class:`RemoteRunner` objects
+    :param execute: the function called as execute(test, runner) to run a
+        test with a runner
+    """
+
+    def __init__(self, runners, execute):
+        self._queue = queue.Queue()
+        self._execute = execute
+        self._lock = threading.Lock()
+        self._failed = []
+        self._threads = [
+            threading.Thread(
+                target=self._work,
+                args=(runner,),
+                name="worker {}".format(runner.address),
+                daemon=True,
+            )
+            for runner in runners
+        ]
+        for thread in self._threads:
+            thread.start()
+
+    def put(self, test):
+        self._queue.put(test)
+
+    def finish(self):
+        """Waits for the queued tests to complete.
+
+        :return a list of the tests that could not be run by any worker
+        """
+        for _ in self._threads:
+            self._queue.put(None)
+        for thread in self._threads:
+            thread.join()
+        failed = self._failed
+        while True:
+            try:
+                test = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if test is not None:
+                failed.append(test)
+        return failed
+
+    def _work(self, runner):
+        while True:
+            test = self._queue.get()
+            if test is None:
+                return
+            try:
+                self._execute(test, runner)
+            except WorkerError:
+                with self._lock:
+                    self._failed.append(test)
+                return
+
+
+class WorkerHandler(socketserver.StreamRequestHandler):
+    """Handles a single request from a coordinator."""
+
+    def handle(self):
+        from ttt.subproc import streamed_call
+
+        raw = self.rfile.readline()
+        if not raw:
+            return
+        try:
+            request = json.loads(raw.decode("utf-8"))
+        except ValueError:
+            return
+        reason = self.refusal(request)
+        if reason is not None:
+            self.server.log("refused: {}".format(reason))
+            send_message(self.wfile, {"error": reason})
+            return
+        command = request["command"]
+        self.server.log("run: {}".format(" ".join(command)))
+
+        def send_line(channel, line):
+            send_message(
+                self.wfile,
+                {
+                    "channel": "stdout" if channel == sys.stdout else "stderr",
+                    "line": line,
+                },
+            )
+
+        try:
+            rc, _, _ = streamed_call(
+                command,
+                listener=send_line,
+                timeout=request.get("timeout"),
+                watchdog=self.disconnected,
+            )
+            send_message(self.wfile, {"returncode": rc})
+        except subprocess.TimeoutExpired:
+            if not self.disconnected():
+                send_message(self.wfile, {"timeout": True})
+        except OSError as e:
+            # the coordinator went away, or the command could not be started
+            self.server.log("error: {}".format(e))
+            if not self.disconnected():
+                send_message(self.wfile, {"returncode": 127})
+
+    def refusal(self, request):
+        """Checks the token and the command of a request.
+
+        :return the reason that the request is refused, or None
+        """
+        if not isinstance(request, dict):
+            return "invalid request"
+        token = request.get("token")
+        if not isinstance(token, str) or not hmac.compare_digest(
+            token.encode("utf-8"), self.server.token.encode("utf-8")
+        ):
+            return "invalid token"
+        return check_command(request.get("command"), self.server.build_root)
+
+    def disconnected(self):
+        """Indicates whether the coordinator has closed its connection."""
+        readable, _, _ = select.select([self.connection], [], [], 0)
+        if not readable:
+            return False
+        try:
+            return self.connection.recv(1, socket.MSG_PEEK) == b""
+        except OSError:
+            return True
+
+
+class _Logging(object):
+    term = None
+    token = None
+    build_root = None
+
+    def log(self, message):
+        if self.term is not None:
+            self.term.writeln(message, verbose=1)
+
+
+class TCPWorkerServer(_Logging, socketserver.ThreadingTCPServer):
+    allow_reuse_address = True
+    daemon_threads = True
+
+
+if hasattr(socketserver, "ThreadingUnixStreamServer"):
+
+    class UnixWorkerServer(_Logging, socketserver.ThreadingUnixStreamServer):
+        daemon_threads = True
+
+
+def create_server(address, build_root, token, term=None):
+    """Creates a worker server listening on the given address.
+
+    :param address: host:port, a port on localhost, or a Unix domain socket
+        path
+    :param build_root: the directory that the test binaries run must be under
+    :param token: the token that coordinators must present
+    :param term: (optional) output stream for verbose output
+    """
+    if not token:
+        raise ValueError("A worker requires a token")
+    family, sockaddr = parse_address(address)
+    if family == socket.AF_UNIX:
+        if os.path.exists(sockaddr):
+            os.remove(sockaddr)
+        server = UnixWorkerServer(sockaddr, WorkerHandler)
+        os.chmod(sockaddr, 0o600)
+    else:
+        server = TCPWorkerServer(sockaddr, WorkerHandler)
+    server.term = term
+    server.token = token
+    server.build_root = os.path.abspath(build_root)
+    return server
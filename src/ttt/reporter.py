@@ -22,12 +22,39 @@ class Reporter(object):
     def wait_change(self):
         pass
 
+    def report_syntax_check(self, results):
+        pass
+
+    def report_build_steps(self, steps):
+        pass
+
+    def report_compiler_cache(self, hits, misses):
+        pass
+
+    def report_first_error(self, diagnostic):
+        pass
+
     def report_build_failure(self):
         pass
 
+    def report_build_profile(self, profile):
+        pass
+
+    def report_phase(self, phase):
+        pass
+
+    def report_plan(self, plan):
+        pass
+
+    def report_test_progress(self, progress):
+        pass
+
     def report_results(self, results):
         pass
 
+    def report_configurations(self, outcomes):
+        pass
+
     def report_failures(self, results):
         pass
 
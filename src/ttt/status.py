@@ -0,0 +1,173 @@
+"""
+ttt.status
+~~~~~~~~~~~~
+This module implements the live status line, which shows the progress of a
+session in a single line of the terminal that is redrawn in place.
+
+The line shows the current phase, the number of test binaries run out of
+those planned, the rate at which tests complete, the failures so far, and the
+time expected to remain. The expected time comes from how long each binary
+took to run the last time that it ran.
+:copyright: (c) yerejm
+"""
+
+import threading
+from timeit import default_timer as timer
+
+from ttt.cache import load_json, save_json
+from ttt.executor import CompletedTest, PASSED
+
+# How often, in seconds, the status line is redrawn.
+STATUS_INTERVAL = 0.1
+
+
+def format_duration(seconds):
+    minutes, seconds = divmod(int(round(seconds)), 60)
+    hours, minutes = divmod(minutes, 60)
+    if hours:
+        return "{}h{:02d}m".format(hours, minutes)
+    if minutes:
+        return "{}m{:02d}s".format(minutes, seconds)
+    return "{}s".format(seconds)
+
+
+class DurationHistory(object):
+    """Maintains how long, in seconds, each test binary last took to run.
+
+    :param path: (optional) the file in which the history is persisted. By
+        default, the history is held only in memory.
+    """
+
+    def __init__(self, path=None):
+        self.path = path
+        self._entries = load_json(path, {})
+        self._dirty = False
+
+    def get(self, executable):
+        return self._entries.get(executable)
+
+    def put(self, executable, seconds):
+        self._entries[executable] = seconds
+        self._dirty = True
+
+    def expected(self, executables):
+        """Estimates how long, in seconds, the given binaries take to run.
+
+        Binaries that have not run before are assumed to take the average time
+        of those that have.
+
+        :return the estimate, or None if none of the binaries have run before
+        """
+        if not executables:
+            return 0
+        if not any(e in self._entries for e in executables):
+            return None
+        average = sum(self._entries.values()) / len(self._entries)
+        return sum(self._entries.get(e, average) for e in executables)
+
+    def save(self):
+        if self._dirty:
+            save_json(self.path, self._entries)
+            self._dirty = False
+
+
+class StatusLine(object):
+    """The progress of a session, drawn on the last line of a terminal.
+
+    The line is drawn from a background thread every interval, so its cost
+    does not grow with the number of tests run.
+
+    :param terminal: the :class:`Terminal` to draw on
+    :param history: (optional) the :class:`DurationHistory` of the binaries
+    :param interval: (optional) the seconds between redraws
+    """
+
+    def __init__(self, terminal, history=None, interval=STATUS_INTERVAL):
+        self.terminal = terminal
+        self.history = history if history is not None else DurationHistory()
+        self.interval = interval
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+        self._thread = None
+        self.reset(None)
+
+    def reset(self, phase):
+        with self._lock:
+            self.phase = phase
+            self.start_time = timer()
+            self.planned = None
+            self.done = set()
+            self.tests = 0
+            self.failures = 0
+
+    def start(self, phase):
+        """Starts showing the progress of a phase, e.g. build or test."""
+        self.reset(phase)
+        if self._thread is None:
+            self._stopped.clear()
+            self._thread = threading.Thread(target=self._redraw, daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        """Stops showing the progress and removes the status line."""
+        thread = self._thread
+        if thread is not None:
+            self._thread = None
+            self._stopped.set()
+            thread.join()
+        self.history.save()
+        self.terminal.clear_status()
+
+    def plan(self, plan):
+        """Notes the test binaries that are planned to run.
+
+        :param plan: the plan as given by :class:`Executor`.plan()
+        """
+        with self._lock:
+            self.planned = list(plan["tests"])
+
+    def progress(self, progress):
+        """Notes a :class:`CompletedTest` or :class:`CompletedBinary`."""
+        with self._lock:
+            if isinstance(progress, CompletedTest):
+                self.tests += 1
+                if progress.outcome != PASSED:
+                    self.failures += 1
+                return
+            self.done.add(progress.executable)
+            if not progress.cached:
+                self.history.put(progress.executable, progress.run_time)
+
+    def render(self, now=None):
+        """Describes the progress in a single line."""
+        now = timer() if now is None else now
+        with self._lock:
+            elapsed = now - self.start_time
+            parts = [self.phase or "idle"]
+            if self.planned is not None or self.done:
+                parts.append(
+                    "{}/{} binaries".format(
+                        len(self.done),
+                        "?" if self.planned is None else len(self.planned),
+                    )
+                )
+            if self.tests:
+                parts.append(
+                    "{} tests ({:.1f}/s)".format(
+                        self.tests, self.tests / elapsed if elapsed > 0 else 0
+                    )
+                )
+            if self.failures:
+                parts.append("{} failed".format(self.failures))
+            if self.planned is not None:
+                expected = self.history.expected(
+                    [e for e in self.planned if e not in self.done]
+                )
+                if expected is not None:
+                    parts.append("ETA {}".format(format_duration(expected)))
+            parts.append(format_duration(elapsed))
+        return " | ".join(parts)
+
+    def _redraw(self):
+        while not self._stopped.wait(self.interval):
+            self.terminal.draw_status(self.render())
@@ -7,11 +7,80 @@ of the existing subprocess module.
 :copyright: (c) yerejm
 """
 
+from contextlib import contextmanager
 import os
 import queue
+import signal
 import subprocess
 import sys
 import threading
+from timeit import default_timer as timer
+
+# How often, in seconds, a running process is checked against its deadline
+# when a timeout or watchdog has been given.
+WATCHDOG_INTERVAL = 0.1
+
+# The processes started by checked_call and streamed_call that are running.
+_active = set()
+_active_lock = threading.Lock()
+# The number of processes started by checked_call and streamed_call.
+_started = 0
+_cancelled = threading.Event()
+
+
+class Cancelled(Exception):
+    """Raised by checked_call and streamed_call when their process was
+    killed, or not started, because of a call to cancel()."""
+
+    def __init__(self):
+        super().__init__("Cancelled")
+
+
+def cancel():
+    """Kills every running process started by checked_call or streamed_call,
+    and refuses to start new ones until uncancel() is called.
+
+    This may be called from any thread.
+    """
+    _cancelled.set()
+    with _active_lock:
+        processes = list(_active)
+    for process in processes:
+        kill(process)
+
+
+def uncancel():
+    """Allows processes to be started again after cancel()."""
+    _cancelled.clear()
+
+
+def process_counts():
+    """Counts the processes started by checked_call and streamed_call.
+
+    :return (started, running) tuple of the number of processes started and
+        the number of those that are still running
+    """
+    with _active_lock:
+        return _started, len(_active)
+
+
+@contextmanager
+def tracked(process):
+    """Tracks a running process so that it can be killed by cancel()."""
+    global _started
+    with _active_lock:
+        _started += 1
+        _active.add(process)
+    try:
+        if _cancelled.is_set():
+            kill(process)
+            raise Cancelled()
+        yield process
+        if _cancelled.is_set():
+            raise Cancelled()
+    finally:
+        with _active_lock:
+            _active.discard(process)
 
 
 def execute(*args, **kwargs):
@@ -28,10 +97,22 @@ def checked_call(*args, **kwargs):
     """Wrapper around subprocess.checked_call where the universal newlines
     option is enabled.
 
-    Otherwise, operates the same as that function.
+    Otherwise, operates the same as that function, except that the process
+    can be killed by cancel(), in which case Cancelled is raised.
     """
     kwargs["universal_newlines"] = True
-    return subprocess.check_call(*args, **kwargs)
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
+    with subprocess.Popen(*args, **kwargs) as process:
+        try:
+            with tracked(process):
+                returncode = process.wait()
+        except BaseException:
+            kill(process)
+            raise
+    if returncode:
+        raise subprocess.CalledProcessError(returncode, process.args)
+    return returncode
 
 
 def streamed_call(*args, **kwargs):
@@ -50,8 +131,17 @@ def streamed_call(*args, **kwargs):
 
     Universal newline handling is forced.
 
+    The process is started in its own process group so that it and any
+    children it spawned can be killed together. When a timeout or watchdog
+    limit is reached, subprocess.TimeoutExpired is raised carrying the output
+    captured up to that point. When killed by cancel(), Cancelled is raised.
+
     :param listener: (optional) an object that consumes the output from the
     executing subprocess.
+    :param timeout: (optional) the number of seconds the process may run
+    before it is killed
+    :param watchdog: (optional) a callable polled while the process runs. When
+    it returns True, the process is killed.
     :return (process.returncode, stdout list, stderr list) tuple
     """
     kwargs["universal_newlines"] = True
@@ -80,14 +170,19 @@ def call_output(*popenargs, **kwargs):
 
     kwargs["stdin"] = subprocess.PIPE
     line_handler = kwargs.pop("listener", None)
+    timeout = kwargs.pop("timeout", None)
+    watchdog = kwargs.pop("watchdog", None)
+    if os.name == "posix":
+        kwargs["start_new_session"] = True
 
     with create_process(
         *popenargs, stdout=subprocess.PIPE, stderr=subprocess.STDOUT, **kwargs
     ) as process:
-        return run(process, line_handler)
+        with tracked(process):
+            return run(process, line_handler, timeout=timeout, watchdog=watchdog)
 
 
-def run(process, line_handler):
+def run(process, line_handler, timeout=None, watchdog=None):
     """Maintains the process being executed in a subprocess until it ends.
 
     Lines of output being emitted by the process are send to the lin handler if
@@ -97,7 +192,16 @@ def run(process, line_handler):
     handled by threads reading from the stdout and stderr streams. Threads are
     required to read the output as it is emitted by the subprocess in real-time
     or else it would block until the subprocess had ended.
+
+    If the process outlives the timeout, or the watchdog asks for it, the
+    process is killed. Output continues to be drained until the streams close
+    so that the reader threads can finish, then subprocess.TimeoutExpired is
+    raised.
     """
+    start = timer()
+    limited = timeout is not None or watchdog is not None
+    interval = WATCHDOG_INTERVAL if limited else 1
+    killed = False
 
     io_q = queue.Queue(5)
     threads = {
@@ -131,33 +235,63 @@ def run(process, line_handler):
 
     stdout = []
     stderr = []
-    while threads:
-        try:
-            item = io_q.get(True, 1)
-        except queue.Empty:
-            if process.poll() is not None:
-                break
-        else:
-            outstream, message = item
-            if message == "EXIT":
-                threads[outstream].join()
-                del threads[outstream]
+    try:
+        while threads:
+            if limited and not killed:
+                if (timeout is not None and timer() - start > timeout) or (
+                    watchdog is not None and watchdog()
+                ):
+                    kill(process)
+                    killed = True
+            try:
+                item = io_q.get(True, interval)
+            except queue.Empty:
+                if process.poll() is not None:
+                    break
             else:
-                message = message.rstrip(os.linesep)
-                channel = sys.stdout if outstream == "stdout" else sys.stderr
-                (stdout if outstream == "stdout" else stderr).append(message)
-                if line_handler is not None:
-                    line_handler(channel, message)
+                outstream, message = item
+                if message == "EXIT":
+                    threads[outstream].join()
+                    del threads[outstream]
                 else:
-                    channel.write(message)
-                    channel.flush()
+                    message = message.rstrip(os.linesep)
+                    channel = sys.stdout if outstream == "stdout" else sys.stderr
+                    (stdout if outstream == "stdout" else stderr).append(message)
+                    if line_handler is not None:
+                        line_handler(channel, message)
+                    else:
+                        channel.write(message)
+                        channel.flush()
+    except BaseException:
+        # Do not leave the process behind: Popen's context manager would
+        # otherwise wait on it indefinitely.
+        kill(process)
+        raise
 
     for t in threads.values():
         t.join()
     process.wait()
+    if killed:
+        raise subprocess.TimeoutExpired(
+            process.args, timer() - start, output=stdout, stderr=stderr
+        )
     return (process.returncode, stdout, stderr)
 
 
+def kill(process):
+    """Kills a process, along with its process group if it leads one."""
+    if process.poll() is not None:
+        return
+    try:
+        if os.name == "posix" and os.getpgid(process.pid) == process.pid:
+            os.killpg(process.pid, signal.SIGKILL)
+        else:
+            process.kill()
+    except OSError:
+        # already gone
+        pass
+
+
 def read_stream(stream_name, input_stream, io_q):
     """Captures lines incoming on the input stream on a queue.
 
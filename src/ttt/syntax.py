@@ -0,0 +1,135 @@
+"""
+ttt.syntax
+~~~~~~~~~~~~
+This module implements the syntax check of changed source files.
+
+The compiler is run on each changed translation unit with the same command
+that the build uses, as recorded by cmake in compile_commands.json, but told
+only to check the syntax (-fsyntax-only, or /Zs for MSVC). Errors are found
+in a fraction of the time that the build takes to compile and link.
+:copyright: (c) yerejm
+"""
+
+import collections
+from concurrent.futures import ThreadPoolExecutor
+import os
+import shlex
+
+from ttt.cache import load_json
+
+COMPILE_COMMANDS = "compile_commands.json"
+# The define that makes cmake write compile_commands.json.
+EXPORT_COMPILE_COMMANDS = "CMAKE_EXPORT_COMPILE_COMMANDS=ON"
+SOURCE_SUFFIXES = (".c", ".cc", ".cpp", ".cxx", ".c++", ".m", ".mm")
+
+# Options taking a separate value that name outputs of the compilation, which
+# a syntax check must not write.
+GCC_OUTPUT_OPTIONS = ("-o", "-MF", "-MT", "-MQ")
+GCC_OUTPUT_FLAGS = ("-c", "-MD", "-MMD")
+MSVC_OUTPUT_FLAGS = ("/c", "-c")
+MSVC_OUTPUT_PREFIXES = ("/Fo", "-Fo", "/Fd", "-Fd", "/Fp", "-Fp")
+MSVC_COMPILERS = ("cl", "cl.exe", "clang-cl", "clang-cl.exe")
+
+# The outcome of checking a source file.
+SyntaxCheck = collections.namedtuple("SyntaxCheck", ["source", "returncode", "output"])
+
+
+def is_source(path):
+    return path.endswith(SOURCE_SUFFIXES)
+
+
+def load_compile_commands(build_path):
+    """Reads the compile commands that cmake wrote to the build area.
+
+    :return a dict of absolute source file path to the entry of the file,
+    empty if there are no compile commands
+    """
+    entries = load_json(os.path.join(build_path, COMPILE_COMMANDS), [])
+    commands = {}
+    for entry in entries:
+        source = os.path.join(entry.get("directory", ""), entry.get("file", ""))
+        commands[os.path.normpath(source)] = entry
+    return commands
+
+
+def syntax_command(entry):
+    """Converts the compile command of a file into a syntax check.
+
+    :param entry: the entry of the file from compile_commands.json
+    :return the command in list form
+    """
+    arguments = entry.get("arguments")
+    if arguments is None:
+        arguments = shlex.split(entry["command"], posix=os.name == "posix")
+    compiler = os.path.basename(arguments[0]).lower()
+    command = [arguments[0]]
+    skip = False
+    if compiler in MSVC_COMPILERS:
+        for argument in arguments[1:]:
+            if argument not in MSVC_OUTPUT_FLAGS and not argument.startswith(
+                MSVC_OUTPUT_PREFIXES
+            ):
+                command.append(argument)
+        command.append("/Zs")
+    else:
+        for argument in arguments[1:]:
+            if skip:
+                skip = False
+            elif argument in GCC_OUTPUT_OPTIONS:
+                skip = True
+            elif argument not in GCC_OUTPUT_FLAGS and not argument.startswith(
+                GCC_OUTPUT_OPTIONS
+            ):
+                command.append(argument)
+        command.append("-fsyntax-only")
+    return command
+
+
+class SyntaxChecker(object):
+    """Checks the syntax of source files in parallel.
+
+    :param build_path: the build area holding compile_commands.json
+    :param jobs: (optional) the most files checked at once. By default, the
+        number of processors.
+    """
+
+    def __init__(self, build_path, jobs=None):
+        self.build_path = build_path
+        self.jobs = jobs
+
+    def check(self, paths):
+        """Checks the syntax of the source files among the given paths.
+
+        Files that are not translation units, or that the build does not
+        compile, are ignored.
+
+        :param paths: absolute file paths
+        :return a list of :class:`SyntaxCheck` in the order of the paths
+        """
+        commands = load_compile_commands(self.build_path)
+        sources = [
+            os.path.normpath(p)
+            for p in sorted(paths)
+            if is_source(p) and os.path.normpath(p) in commands
+        ]
+        if not sources:
+            return []
+        with ThreadPoolExecutor(max_workers=self.jobs) as pool:
+            return list(
+                pool.map(
+                    lambda source: self.check_file(source, commands[source]), sources
+                )
+            )
+
+    def check_file(self, source, entry):
+        from ttt.subproc import streamed_call
+
+        try:
+            rc, stdout, _ = streamed_call(
+                syntax_command(entry),
+                cwd=entry.get("directory"),
+                listener=lambda channel, line: None,
+            )
+        except OSError as e:
+            return SyntaxCheck(source, 127, [str(e)])
+        return SyntaxCheck(source, rc, stdout)
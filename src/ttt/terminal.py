@@ -9,17 +9,28 @@ powershell.exe.
 :copyright: (c) yerejm
 """
 
+import atexit
 from datetime import datetime, timedelta
 import os
+import shutil
+import signal
 import sys
+import threading
+from timeit import default_timer as timer
 
-from ttt.executor import CRASHED, FAILED
+from ttt.buildtime import summarise
+from ttt.diagnostics import condense
+from ttt.executor import CRASHED, FAILED, TIMEOUT
 from ttt.reporter import Reporter
 import ttt.termstyle as termstyle
 from . import __progname__, __version__
 
 # When writing to output streams, do not write more than the following width.
 TERMINAL_MAX_WIDTH = 78
+# Returns to the start of the line and erases it.
+CLEAR_LINE = "\r\x1b[K"
+# The number of the slowest targets and files listed in a build profile.
+BUILD_PROFILE_COUNT = 5
 
 
 def DEFAULT_TIMESTAMP():
@@ -28,12 +39,23 @@ def DEFAULT_TIMESTAMP():
 
 class TerminalReporter(Reporter):
     def __init__(
-        self, watch_path, build_path, terminal=None, timestamp=DEFAULT_TIMESTAMP
+        self,
+        watch_path,
+        build_path,
+        terminal=None,
+        timestamp=DEFAULT_TIMESTAMP,
+        status=None,
     ):
+        """:class:`TerminalReporter` constructor.
+
+        :param status: (optional) the :class:`StatusLine` that shows the
+            progress of each session
+        """
         self.terminal = terminal if terminal else Terminal(stream=sys.stdout)
         self.watch_path = watch_path
         self.build_path = build_path
         self.timestamp = timestamp
+        self.status = status
 
     def session_start(self, session_descriptor):
         self.writeln(
@@ -41,18 +63,79 @@ class TerminalReporter(Reporter):
             decorator=[termstyle.bold],
             pad="=",
         )
+        if self.status is not None:
+            self.status.start(session_descriptor)
+
+    def report_phase(self, phase):
+        if self.status is not None:
+            self.status.phase = phase
+
+    def report_test_progress(self, progress):
+        if self.status is not None:
+            self.status.progress(progress)
 
     def session_end(self, session_descriptor, duration=None):
+        self.stop_status()
         s = "{} session ends".format(session_descriptor)
         if duration is not None:
             s += "; time to complete: {}".format(timedelta(seconds=duration))
         self.writeln(s, decorator=[termstyle.bold], pad="=")
+        self.flush()
 
     def report_build_path(self):
         self.writeln(
             "### Building:   {}".format(self.build_path), decorator=[termstyle.bold]
         )
 
+    def report_syntax_check(self, results):
+        failed = [r for r in results if r.returncode != 0]
+        for result in failed:
+            self.writeln(
+                "### Syntax error in {}".format(
+                    strip_path(result.source, self.watch_path)
+                ),
+                decorator=[termstyle.red],
+            )
+            for line in result.output:
+                self.writeln(line)
+        self.writeln(
+            "### Syntax:     {} checked, {} failed".format(len(results), len(failed)),
+            decorator=[termstyle.red if failed else termstyle.green],
+        )
+
+    def report_build_steps(self, steps):
+        for step in steps:
+            self.writeln(
+                "### Step:   {:10.3f}s {}".format(step.duration, " ".join(step.command))
+            )
+            if step.returncode != 0:
+                self.writeln(
+                    "### Failed:     exit code {}; output in {}".format(
+                        step.returncode, step.log
+                    ),
+                    decorator=[termstyle.red],
+                )
+
+    def report_compiler_cache(self, hits, misses):
+        compiled = hits + misses
+        self.writeln(
+            "### Cache:      {} hits, {} misses ({:.0%} hit rate)".format(
+                hits, misses, hits / compiled if compiled else 0
+            )
+        )
+
+    def report_first_error(self, diagnostic):
+        self.writeln(
+            "### First error: {}".format(condense(diagnostic)),
+            decorator=[termstyle.red, termstyle.bold],
+        )
+        for line in diagnostic.context:
+            self.writeln(line)
+
+    def report_build_profile(self, profile):
+        for line in summarise(profile, BUILD_PROFILE_COUNT):
+            self.writeln("### " + line)
+
     def report_watchstate(self, watchstate):
         def report_changes(change, filelist, decorator):
             for f in filelist:
@@ -67,9 +150,12 @@ class TerminalReporter(Reporter):
         self.writeln("### Scan time: {:10.3f}s".format(watchstate.walk_time))
 
     def report_interrupt(self, interrupt):
+        self.stop_status()
         self.writeln(interrupt.__class__.__name__, pad="!")
+        self.flush()
 
     def wait_change(self):
+        self.stop_status()
         self.writeln("waiting for changes", decorator=[termstyle.bold], pad="#")
         self.writeln(
             "### Since:      {}".format(self.timestamp()), decorator=[termstyle.bold]
@@ -84,10 +170,26 @@ class TerminalReporter(Reporter):
             "### Using {}:  {}".format(__progname__, __version__),
             decorator=[termstyle.bold],
         )
+        self.flush()
+
+    def report_plan(self, plan):
+        if self.status is not None:
+            self.status.plan(plan)
+        self.writeln(
+            "### Planned:    {} tests in {} binaries".format(
+                plan["total_tests"], plan["total_binaries"]
+            )
+        )
 
     def report_results(self, results):
-        shortstats = "{} passed in {} seconds".format(
-            results["total_passed"], results["total_runtime"]
+        shortstats = "{} passed{} in {} seconds".format(
+            results["total_passed"],
+            (
+                " ({} cached)".format(results["total_cached"])
+                if results.get("total_cached")
+                else ""
+            ),
+            results["total_runtime"],
         )
         total_failed = results["total_failed"]
         if total_failed > 0:
@@ -102,6 +204,27 @@ class TerminalReporter(Reporter):
                 shortstats, decorator=[termstyle.green, termstyle.bold], pad="="
             )
 
+    def report_configurations(self, outcomes):
+        for outcome in outcomes:
+            if not outcome.built:
+                summary, decorator = "build failed", [termstyle.red]
+            elif outcome.results is None:
+                summary, decorator = "built", [termstyle.green]
+            else:
+                summary = "{} passed, {} failed".format(
+                    outcome.results["total_passed"], outcome.results["total_failed"]
+                )
+                decorator = [
+                    (
+                        termstyle.red
+                        if outcome.results["total_failed"]
+                        else termstyle.green
+                    )
+                ]
+            self.writeln(
+                "### {:<12}{}".format(outcome.name + ":", summary), decorator=decorator
+            )
+
     def report_failures(self, results):
         self.writeln("FAILURES", pad="=")
         for testname, out, _err, outcome in results:
@@ -111,7 +234,7 @@ class TerminalReporter(Reporter):
                 test_output_pos = find_source_file_line(out, self.watch_path)
                 results = out[test_output_pos:]
                 extra_out = out[:test_output_pos]
-            elif outcome == CRASHED:
+            elif outcome in (CRASHED, TIMEOUT):
                 results = out[1:]
             self.writeln(os.linesep.join(results))
 
@@ -126,22 +249,32 @@ class TerminalReporter(Reporter):
                 else:
                     locator = strip_path(results[0], self.watch_path)
                 trailer = strip_trailer(locator)
-            elif outcome == CRASHED:
+            elif outcome in (CRASHED, TIMEOUT):
                 trailer = " !!! {} !!!".format(out[0])
 
             self.writeln(trailer, decorator=[termstyle.red, termstyle.bold], pad="_")
 
     def interrupt_detected(self):
+        self.stop_status()
         self.writeln()
         self.writeln("Interrupt again to exit.")
+        self.flush()
 
     def halt(self):
         self.writeln()
         self.writeln("Watching stopped.")
+        self.flush()
+
+    def stop_status(self):
+        if self.status is not None:
+            self.status.stop()
 
     def writeln(self, *args, **kwargs):
         self.terminal.writeln(*args, **kwargs)
 
+    def flush(self):
+        self.terminal.flush()
+
 
 def strip_path(string, path):
     realpath = path
@@ -171,7 +304,7 @@ class Terminal(object):
 
     """A Terminal that will write lines given to it to an output stream."""
 
-    def __init__(self, stream=None, verbosity=None):
+    def __init__(self, stream=None, verbosity=None, flush_interval=None):
         """Creates a terminal for a specific verbosity.
 
         :param stream: (optional) the output stream to send output. By default,
@@ -179,16 +312,79 @@ class Terminal(object):
         :param verbosity: (optional) sets the verbosity required for lines need
         to be set at for output to occur. Default is 0, which is the default
         for lines that do not specify a verbosity.
+        :param flush_interval: (optional) batch the output, flushing it to the
+        stream at most once in this many seconds, and otherwise only when
+        flush() is called. By default, every write is flushed.
         """
         self.verbosity = verbosity if verbosity else Terminal.VERBOSITY
         self.stream = stream
+        self.flush_interval = flush_interval
+        self._pending = []
+        self._lock = threading.Lock()
+        self._last_flush = 0
+        self._timer = None
+        self._status_lock = threading.Lock()
+        self._status_shown = False
+        if flush_interval:
+            atexit.register(self.flush)
 
     def write(self, string):
         """Writes a string to the output stream."""
+        if not self.stream:
+            return
+        with self._status_lock:
+            if self._status_shown:
+                # output replaces the status line, which is drawn again below
+                self._status_shown = False
+                string = CLEAR_LINE + string
+            self._write(string)
+
+    def draw_status(self, text):
+        """Draws a status line in place of the current last line."""
+        if not self.stream:
+            return
+        with self._status_lock:
+            self._write(CLEAR_LINE + text[: max(0, term_width() - 1)])
+            self._status_shown = True
+
+    def clear_status(self):
+        """Removes the status line, if shown."""
+        with self._status_lock:
+            if self._status_shown:
+                self._status_shown = False
+                self._write(CLEAR_LINE)
+
+    def _write(self, string):
         stream = self.stream
-        if stream:
+        if not self.flush_interval:
             stream.write(string)
             stream.flush()
+            return
+        with self._lock:
+            self._pending.append(string)
+            wait = self.flush_interval - (timer() - self._last_flush)
+            if wait <= 0:
+                self._flush()
+            elif self._timer is None:
+                # flush whatever is still pending once the interval is up
+                self._timer = threading.Timer(wait, self.flush)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def flush(self):
+        """Writes out any batched output."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        self._last_flush = timer()
+        if self._pending:
+            self.stream.write("".join(self._pending))
+            del self._pending[:]
+            self.stream.flush()
 
     def writeln(self, *args, **kwargs):
         """Output all unnamed arguments as a single line to the output stream.
@@ -223,23 +419,89 @@ class Terminal(object):
             if pad:
                 line = pad_line(line, pad, term_width() if width is None else width)
             if decorator:
-                for d in decorator:
-                    line = d(line)
+                line = style(decorator, line)
             self.write(line + (os.linesep if end is None else end))
 
 
+# The text before and after a line for each combination of decorators seen,
+# or None for decorators that change the line itself.
+_styles = {}
+_STYLE_PROBE = "\0ttt probe\0"
+
+
+def style(decorator, line):
+    """Applies a list of decorators to a line.
+
+    The decorators are applied once to a probe line to find the text that
+    they put before and after a line, which is then reused for every line.
+    """
+    key = tuple(decorator)
+    try:
+        wrapping = _styles[key]
+    except KeyError:
+        styled = _STYLE_PROBE
+        for d in decorator:
+            styled = d(styled)
+        before, found, after = styled.partition(_STYLE_PROBE)
+        wrapping = (before, after) if found else None
+        _styles[key] = wrapping
+    if wrapping is None:
+        for d in decorator:
+            line = d(line)
+        return line
+    return wrapping[0] + line + wrapping[1]
+
+
+# The width of the terminal, looked up again when the terminal is resized.
+_width = None
+
+
 def term_width():
     """Get the width of the terminal if possible.
 
     Assumes a width of 78 if not possible.
     """
-    try:
-        from shutil import get_terminal_size
+    global _width
+    if _width is not None:
+        return _width
+    width = shutil.get_terminal_size((TERMINAL_MAX_WIDTH, 0)).columns
+    if watch_resize():
+        _width = width
+    return width
+
+
+def forget_width(*args):
+    global _width
+    _width = None
+
 
-        ts = get_terminal_size()
-        return ts.columns
-    except ImportError:
-        return TERMINAL_MAX_WIDTH
+_resize_watched = False
+
+
+def watch_resize():
+    """Forgets the terminal width when the terminal is resized.
+
+    :return whether resizes are watched for, which needs SIGWINCH
+    """
+    global _resize_watched
+    if _resize_watched:
+        return True
+    if not hasattr(signal, "SIGWINCH"):
+        return False
+    previous = signal.getsignal(signal.SIGWINCH)
+
+    def resized(signum, frame):
+        forget_width()
+        if callable(previous):
+            previous(signum, frame)
+
+    try:
+        signal.signal(signal.SIGWINCH, resized)
+    except ValueError:
+        # only the main thread may set signal handlers
+        return False
+    _resize_watched = True
+    return True
 
 
 def pad_line(string, pad, width):
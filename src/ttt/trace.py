@@ -0,0 +1,111 @@
+"""
+ttt.trace
+~~~~~~~~~~~~
+This module implements the trace of where the time of each watch/build/test
+cycle goes, written in the Chrome trace event format for viewing in
+chrome://tracing or Perfetto.
+
+Each span of work, e.g. a scan of the watch area, a build phase, or the run of
+a test binary, is recorded on the lane of the thread that did it. Test
+binaries run concurrently, e.g. on workers, show up on lanes of their own, so
+idle gaps and stragglers can be seen.
+:copyright: (c) yerejm
+"""
+
+import collections
+from contextlib import contextmanager
+import json
+import os
+import threading
+from timeit import default_timer as timer
+
+# The most spans kept. The oldest are dropped first so that a long running
+# session does not grow the trace without bound.
+DEFAULT_MAX_SPANS = 100000
+
+
+class Tracer(object):
+    """Records spans of work and writes them as a trace.
+
+    The times of the spans are those of the default timer, the same as that
+    used for the times of the build steps.
+
+    :param path: the file that the trace is written to
+    :param max_spans: (optional) the most spans kept
+    :param clock: (optional) gives the time in seconds
+    """
+
+    def __init__(self, path, max_spans=DEFAULT_MAX_SPANS, clock=timer):
+        self.path = path
+        self.clock = clock
+        self.origin = clock()
+        self.pid = os.getpid()
+        self._lock = threading.Lock()
+        self._spans = collections.deque(maxlen=max_spans)
+        self._lanes = {}
+
+    @contextmanager
+    def span(self, name, category=None, **args):
+        """Records the time taken by the body of a 'with' block.
+
+        The span is recorded even if the block raises.
+
+        :param name: the name of the span
+        :param category: (optional) the kind of span, e.g. build or test
+        :param args: (optional) the details shown for the span
+        """
+        start = self.clock()
+        try:
+            yield
+        finally:
+            self.complete(name, start, self.clock() - start, category, **args)
+
+    def complete(self, name, start, duration, category=None, **args):
+        """Records a span timed elsewhere on the lane of the current thread.
+
+        :param start: the time that the span started, from the clock
+        :param duration: the seconds that the span took
+        """
+        thread = threading.current_thread()
+        event = {
+            "name": name,
+            "ph": "X",
+            "ts": (start - self.origin) * 1e6,
+            "dur": duration * 1e6,
+            "pid": self.pid,
+            "tid": thread.ident,
+        }
+        if category is not None:
+            event["cat"] = category
+        if args:
+            event["args"] = args
+        with self._lock:
+            self._lanes[thread.ident] = thread.name
+            self._spans.append(event)
+
+    def events(self):
+        """Gets the trace events, the names of the lanes followed by the
+        spans."""
+        with self._lock:
+            lanes = list(self._lanes.items())
+            spans = list(self._spans)
+        return [
+            {
+                "name": "thread_name",
+                "ph": "M",
+                "pid": self.pid,
+                "tid": tid,
+                "args": {"name": name},
+            }
+            for tid, name in lanes
+        ] + spans
+
+    def save(self):
+        """Writes the trace, replacing any written before."""
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        temp_path = "{}.{}".format(self.path, os.getpid())
+        with open(temp_path, "w") as f:
+            json.dump({"traceEvents": self.events(), "displayTimeUnit": "ms"}, f)
+        os.replace(temp_path, self.path)
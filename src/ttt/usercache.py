@@ -0,0 +1,132 @@
+"""
+ttt.usercache
+~~~~~~~~~~~~
+This module implements the cache of files that ttt keeps for the user, shared
+by every build area, e.g. downloaded cmake scripts.
+
+Files are stored by the digest of their content and looked up by a key such
+as the URL they were downloaded from. A file can be seeded into the cache
+from a local copy so that ttt works with no network.
+:copyright: (c) yerejm
+"""
+
+import hashlib
+import os
+import shutil
+
+from ttt.cache import load_json, save_json
+
+
+def cache_directory():
+    """Gets the directory of the user's ttt cache.
+
+    This is $TTT_CACHE_DIR if set, otherwise ttt under the platform's user
+    cache directory.
+    """
+    directory = os.environ.get("TTT_CACHE_DIR")
+    if directory:
+        return directory
+    if os.name == "nt" and os.environ.get("LOCALAPPDATA"):
+        return os.path.join(os.environ["LOCALAPPDATA"], "ttt", "cache")
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(
+        os.path.expanduser("~"), ".cache"
+    )
+    return os.path.join(base, "ttt")
+
+
+def digest(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+class ContentCache(object):
+    """A content-addressed store of files.
+
+    :param directory: (optional) the directory of the cache. By default, the
+        user's ttt cache.
+    """
+
+    def __init__(self, directory=None):
+        self.directory = directory if directory is not None else cache_directory()
+        self.index_path = os.path.join(self.directory, "index.json")
+
+    def path(self, content_digest):
+        return os.path.join(
+            self.directory, "objects", content_digest[:2], content_digest
+        )
+
+    def lookup(self, key):
+        """Gets the path of the file stored for a key.
+
+        :return the path, or None if there is no file for the key or the file
+        is no longer intact
+        """
+        content_digest = load_json(self.index_path, {}).get(key)
+        if content_digest is None:
+            return None
+        path = self.path(content_digest)
+        try:
+            with open(path, "rb") as f:
+                if digest(f.read()) == content_digest:
+                    return path
+        except OSError:
+            pass
+        return None
+
+    def store(self, key, data):
+        """Stores the content of a file for a key.
+
+        :param data: the content of the file as bytes
+        :return the path of the stored file
+        """
+        content_digest = digest(data)
+        path = self.path(content_digest)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            temp_path = "{}.{}".format(path, os.getpid())
+            with open(temp_path, "wb") as f:
+                f.write(data)
+            os.replace(temp_path, path)
+        index = load_json(self.index_path, {})
+        if index.get(key) != content_digest:
+            index[key] = content_digest
+            save_json(self.index_path, index)
+        return path
+
+    def seed(self, key, source_path):
+        """Stores a local file for a key.
+
+        :return the path of the stored file
+        """
+        with open(source_path, "rb") as f:
+            return self.store(key, f.read())
+
+
+def fetch(url, cache=None, seed=None):
+    """Gets a file from the user cache, downloading it if it is not there.
+
+    :param url: the URL of the file, which is also its key in the cache
+    :param cache: (optional) the :class:`ContentCache`. By default, the
+        user's.
+    :param seed: (optional) the path of a local copy of the file, which is
+        used in place of the download
+    :return the path of the file in the cache
+    """
+    cache = cache if cache is not None else ContentCache()
+    if seed:
+        return cache.seed(url, seed)
+    path = cache.lookup(url)
+    if path is None:
+        import requests
+
+        response = requests.get(url)
+        response.raise_for_status()
+        path = cache.store(url, response.content)
+    return path
+
+
+def copy(url, destination, cache=None, seed=None):
+    """Copies a file from the user cache, downloading it if it is not there.
+
+    The parameters are as for fetch().
+    """
+    shutil.copyfile(fetch(url, cache=cache, seed=seed), destination)
@@ -134,35 +134,55 @@ class Watcher(object):
         self.filelist = current_filelist
         return watchstate
 
-    def testlist(self, test_prefix=DEFAULT_TEST_PREFIX):
-        """Collects the test files from the source files.
-
-        The files identified as the source files for tests are used to identify
-        the test executables in the build area.
+    def testfiles(self, test_prefix=DEFAULT_TEST_PREFIX):
+        """Collects the names of the test executables expected to be built
+        from the source files.
 
         :param test_prefix: (optional) the filename prefix expected to identify
         test source files. By default, this is 'test_'.
-        :return list of (absolute executable path, relative source path) tuples
+        :return dict of executable file name to relative source path
         """
-        if self.build_path is None:
-            return []
-
-        watchedfiles = self.filelist.values()
         # Create dict of expected test binary names to the relative path of the
         # source files that they were compiled from. This is to make
         # identification of test binaries easier during build tree scanning.
         # NOTE: On Windows, executables can be identified by %PATHEXT% but
         # this assumes gtest builds will always create exe.
-        testfiles = {
+        return {
             os.path.splitext(w.name)[0] + EXE_SUFFIX: w.relpath
-            for w in watchedfiles
+            for w in self.filelist.values()
             if w.name.startswith(test_prefix)
         }
+
+    def create_test(self, source, executable):
+        """Creates the test object for a test executable.
+
+        :param source: the relative path of the test source file
+        :param executable: the absolute path of the test executable
+        """
+        return GTest(source, executable, term=self.term)
+
+    def testlist(self, test_prefix=DEFAULT_TEST_PREFIX, build_path=None):
+        """Collects the test files from the source files.
+
+        The files identified as the source files for tests are used to identify
+        the test executables in the build area.
+
+        :param test_prefix: (optional) the filename prefix expected to identify
+        test source files. By default, this is 'test_'.
+        :param build_path: (optional) the build area to collect from. By
+        default, the build area of the watcher.
+        :return list of (absolute executable path, relative source path) tuples
+        """
+        build_path = build_path if build_path is not None else self.build_path
+        if build_path is None:
+            return []
+
+        testfiles = self.testfiles(test_prefix)
         # Scan the build tree. If an expected test binary is encountered, add a
         # GTest().
         return [
-            GTest(testfiles[f], os.path.join(d, f), term=self.term)
-            for d, f, m, t in walk(self.build_path)
+            self.create_test(testfiles[f], os.path.join(d, f))
+            for d, f, m, t in walk(build_path)
             if f in testfiles and m & stat.S_IXUSR
         ]
 
@@ -188,6 +208,29 @@ def create_watchstate(dictA, dictB, walk_time=0):
     )
 
 
+def merge_watchstates(earlier, later):
+    """Combines two consecutive watch states into one that describes the
+    changes across both.
+
+    A file created and then deleted is not a change. A file deleted and then
+    created again is an update.
+
+    :param earlier: the WatchState of the earlier poll
+    :param later: the WatchState of the later poll
+    """
+    inserts = (earlier.inserts - later.deletes) | (later.inserts - earlier.deletes)
+    deletes = (earlier.deletes - later.inserts) | (later.deletes - earlier.inserts)
+    updates = (
+        (earlier.updates | later.updates) - inserts - deletes - later.deletes
+    ) | (earlier.deletes & later.inserts)
+    return WatchState(
+        inserts=inserts,
+        deletes=deletes,
+        updates=updates,
+        walk_time=earlier.walk_time + later.walk_time,
+    )
+
+
 def has_changes(watch_state):
     """Indicates whether the watch state contains file level activity."""
     return watch_state.inserts or watch_state.updates or watch_state.deletes
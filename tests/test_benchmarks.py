@@ -0,0 +1,124 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_benchmarks
+----------------------------------
+
+Tests for the `benchmarks` of the watcher.
+"""
+import os
+
+from testfixtures import TempDirectory
+
+from benchmarks.tree import churn, directories, generate_tree
+from benchmarks.watcher import (
+    compare,
+    counted_filesystem_calls,
+    Measurement,
+    watcher_benchmarks,
+)
+from ttt.options import DEFAULT_SOURCE_PATTERNS
+from ttt.watcher import Watcher
+
+
+class TestTree:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_generate_tree(self):
+        wd = TempDirectory()
+
+        paths = generate_tree(wd.path, 200, depth=2, fanout=3)
+
+        assert len(directories(wd.path, 2, 3)) == 1 + 3 + 9
+        assert len(paths) == 200
+        assert all(os.path.isfile(path) for path in paths)
+        assert max(os.path.relpath(p, wd.path).count(os.sep) for p in paths) == 2
+        suffixes = {os.path.splitext(path)[1] for path in paths}
+        assert {".cc", ".h", ".png"} <= suffixes
+
+        # the same shape and seed gives the same tree
+        other = TempDirectory()
+        assert [
+            os.path.relpath(p, other.path)
+            for p in generate_tree(other.path, 200, depth=2, fanout=3)
+        ] == [os.path.relpath(p, wd.path) for p in paths]
+
+    def test_churn(self):
+        wd = TempDirectory()
+        paths = generate_tree(wd.path, 200)
+        watcher = Watcher(wd.path, None, DEFAULT_SOURCE_PATTERNS)
+        watcher.poll()
+
+        changes = churn(paths, 0.2)
+        watchstate = watcher.poll()
+
+        assert len(paths) == 200
+        assert len(changes.modified) == 20
+        assert len(changes.created) == len(changes.deleted) == 10
+        tracked = set(watcher.filelist) | watchstate.deletes
+        assert watchstate.updates == set(changes.modified) & tracked
+        assert watchstate.deletes == set(changes.deleted) & tracked
+        assert watchstate.inserts == set(changes.created) & set(watcher.filelist)
+
+
+class TestWatcherBenchmarks:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_benchmarks(self):
+        wd = TempDirectory()
+
+        results = watcher_benchmarks(wd.path, 50, repeat=1, depth=1, fanout=2)
+
+        assert sorted(results) == [
+            "churn_poll",
+            "cold_poll",
+            "match",
+            "walk",
+            "warm_poll",
+            "watchstate",
+        ]
+        # a stat of each file, and a scandir of each directory and lstat of
+        # each subdirectory
+        assert results["warm_poll"].filesystem_calls == 50 + 3 + 2
+        assert results["match"].filesystem_calls == 0
+        assert all(m.seconds >= 0 and m.peak_memory > 0 for m in results.values())
+
+    def test_counted_filesystem_calls(self):
+        wd = TempDirectory()
+
+        with counted_filesystem_calls() as count:
+            os.stat(wd.path)
+            list(os.scandir(wd.path))
+        os.stat(wd.path)
+
+        assert count == [2]
+
+    def test_compare(self):
+        baseline = {
+            "tree": {
+                "walk": {"seconds": 1.0, "filesystem_calls": 10, "peak_memory": 100},
+            }
+        }
+
+        assert (
+            compare({"tree": {"walk": Measurement(1.4, 10, 140)}}, baseline, 0.5, 0.5)
+            == []
+        )
+        assert compare(
+            {
+                "tree": {
+                    "walk": Measurement(1.6, 11, 100),
+                    "match": Measurement(9.0, 0, 0),
+                },
+                "other": {"walk": Measurement(9.0, 99, 999)},
+            },
+            baseline,
+            0.5,
+            0.5,
+        ) == [
+            ("tree", "walk", "seconds", 1.0, 1.6),
+            ("tree", "walk", "filesystem_calls", 10, 11),
+        ]
@@ -8,13 +8,32 @@ test_builder
 Tests for `builder` module.
 """
 
+import io
 import os
 from os.path import exists, join
 import platform
+import sys
+import time
 
+import pytest
 from testfixtures import TempDirectory
 
-from ttt.builder import create_builder
+from ttt.builder import (
+    ABORTED,
+    cmake_build,
+    cmake_pregenerate,
+    CompilerCache,
+    create_builder,
+    discard,
+    execute,
+    LinkDetector,
+    parse_ccache_stats,
+    parse_sccache_stats,
+    trash_paths,
+)
+from ttt.terminal import Terminal
+from ttt.usercache import ContentCache
+from ttt.watcher import EXE_SUFFIX
 
 
 LOG_IDX_GENERATE = 2
@@ -189,3 +208,347 @@ class TestBuilder:
         cmake_source_directory.write("CMakeLists.txt", b"project(test)")
         builder()
         assert exists(join(build_path, "CMakeFiles"))
+
+    def test_skip_unchanged_configure(self):
+        log = []
+        builder = create_builder(
+            self.cmake_source_path, self.cmake_build_path, command_log=log
+        )
+        builder()
+        assert log[LOG_IDX_GENERATE] is not None
+        assert exists(join(self.cmake_build_path, ".ttt", "configure.json"))
+
+        del log[:]
+        builder()
+        assert log[LOG_IDX_GENERATE] is None
+        assert log[LOG_IDX_BUILD] is not None
+
+    def test_reconfigure_when_inputs_change(self):
+        log = []
+        builder = create_builder(
+            self.cmake_source_path, self.cmake_build_path, command_log=log
+        )
+        builder()
+
+        del log[:]
+        cmake_module = join(self.cmake_source_path, "options.cmake")
+        with open(cmake_module, "w") as f:
+            f.write("set(OPTION ON)")
+        builder()
+        assert log[LOG_IDX_GENERATE] is not None
+
+        del log[:]
+        os.utime(cmake_module, (0, 0))
+        builder()
+        assert log[LOG_IDX_GENERATE] is not None
+
+        del log[:]
+        builder()
+        assert log[LOG_IDX_GENERATE] is None
+
+    def test_reconfigure_when_command_changes(self):
+        builder = create_builder(self.cmake_source_path, self.cmake_build_path)
+        builder()
+
+        log = []
+        builder = create_builder(
+            self.cmake_source_path,
+            self.cmake_build_path,
+            build_config="Release",
+            command_log=log,
+        )
+        builder()
+        assert "-DCMAKE_BUILD_TYPE=Release" in log[LOG_IDX_GENERATE][0]
+
+    def test_build_result(self):
+        builder = create_builder(self.cmake_source_path, self.cmake_build_path)
+        result = builder()
+
+        assert result.succeeded
+        assert [step.returncode for step in result.steps] == [0, 0]
+        assert all(step.duration >= 0 for step in result.steps)
+        log = result.steps[0].log
+        assert log == join(self.cmake_build_path, ".ttt", "build.log")
+        with open(log) as f:
+            assert "Build files have been written" in f.read()
+
+    def test_build_stops_at_failure(self):
+        log = []
+        with open(join(self.cmake_source_path, "CMakeLists.txt"), "w") as f:
+            f.write("project(test")
+        builder = create_builder(
+            self.cmake_source_path, self.cmake_build_path, command_log=log
+        )
+        result = builder()
+
+        assert not result.succeeded
+        assert result.failed_step.command == log[LOG_IDX_GENERATE][0]
+        assert len(log) == LOG_IDX_GENERATE + 1
+
+    def test_reconfigure_after_failed_configure(self):
+        log = []
+        builder = create_builder(
+            self.cmake_source_path, self.cmake_build_path, command_log=log
+        )
+        builder()
+
+        with open(join(self.cmake_source_path, "CMakeLists.txt"), "w") as f:
+            f.write("project(test")
+        del log[:]
+        builder()
+        assert log[LOG_IDX_GENERATE][1] != 0
+        assert not exists(join(self.cmake_build_path, ".ttt", "configure.json"))
+
+
+FAKE_CCACHE = """#!/bin/sh
+if [ "$1" = "--print-stats" ]; then
+    count=$(cat "$0.count" 2>/dev/null || echo 0)
+    echo "$((count + 1))" > "$0.count"
+    printf "direct_cache_hit\\t%s\\n" "$((count * 3))"
+    printf "preprocessed_cache_hit\\t0\\n"
+    printf "cache_miss\\t%s\\n" "$count"
+    exit 0
+fi
+exec "$@"
+"""
+
+
+ERROR_THEN_HANG = """
+import sys, time
+print("core.cc:2:5: error: expected ';'", flush=True)
+print("    int x", flush=True)
+time.sleep(30)
+"""
+
+
+class TestConanProvider:
+    def setup_method(self):
+        self.directory = TempDirectory()
+        self.directory.write(["source", "conanfile.txt"], b"[requires]")
+        self.directory.write("provider.cmake", b"# provider")
+        self.source_path = os.path.join(self.directory.path, "source")
+        self.provider = os.path.join(self.directory.path, "provider.cmake")
+        self.cache = ContentCache(os.path.join(self.directory.path, "cache"))
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_provider_shared_by_build_areas(self):
+        for name, provider in (("debug", self.provider), ("release", None)):
+            build_path = os.path.join(self.directory.path, name)
+            cmake_pregenerate(
+                self.source_path, build_path, provider=provider, cache=self.cache
+            )
+
+            with open(os.path.join(build_path, "conan_provider.cmake"), "rb") as f:
+                assert f.read() == b"# provider"
+
+    def test_provider_seeded_from_environment(self, monkeypatch):
+        monkeypatch.setenv("TTT_CONAN_PROVIDER", self.provider)
+        build_path = os.path.join(self.directory.path, "build")
+        cmake_pregenerate(self.source_path, build_path, cache=self.cache)
+
+        assert os.path.exists(os.path.join(build_path, "conan_provider.cmake"))
+
+
+class TestExecute:
+    def test_first_error(self):
+        f = io.StringIO()
+        result = execute(
+            [
+                lambda: [
+                    sys.executable,
+                    "-c",
+                    "print('building'); print('a.c:1:1: error: bad'); exit(1)",
+                ]
+            ],
+            term=Terminal(stream=f),
+            condensed=True,
+        )
+
+        assert not result.succeeded
+        assert result.first_error.file == "a.c"
+        assert result.errors == 1
+        output = f.getvalue()
+        assert "building" not in output
+        assert "a.c:1:1: error: bad" in output
+        assert "### First error: a.c:1:1: error: bad" in output
+
+    def test_abort_on_error(self):
+        start = time.time()
+        result = execute(
+            [lambda: [sys.executable, "-c", ERROR_THEN_HANG]],
+            term=Terminal(stream=io.StringIO()),
+            abort_on_error=True,
+        )
+
+        assert time.time() - start < 20
+        assert result.failed_step.returncode == ABORTED
+        assert result.first_error.context == ["    int x"]
+
+    def test_phase(self):
+        def configure():
+            return [sys.executable, "-c", "pass"]
+
+        configure.phase = "configure"
+        phases = []
+        execute(
+            [configure, lambda: [sys.executable, "-c", "pass"]],
+            term=Terminal(stream=io.StringIO()),
+            phase=phases.append,
+        )
+
+        assert phases == ["configure"]
+
+
+class TestDiscard:
+    def setup_method(self):
+        self.build_path = join(TempDirectory().path, "build")
+        os.makedirs(join(self.build_path, "CMakeFiles"))
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_discard(self):
+        thread = discard(self.build_path)
+        assert not exists(self.build_path)
+        thread.join()
+        assert trash_paths(self.build_path) == []
+
+    def test_discard_leaves_other_areas(self):
+        other = self.build_path + "-other"
+        os.makedirs(other)
+        discard(self.build_path).join()
+        assert exists(other)
+
+    def test_orphaned_trash_removed_on_startup(self):
+        orphan = self.build_path + ".ttt-trash-1-0"
+        os.makedirs(join(orphan, "CMakeFiles"))
+        create_builder(TempDirectory().path, self.build_path)
+
+        deadline = time.time() + 10
+        while exists(orphan) and time.time() < deadline:
+            time.sleep(0.01)
+        assert not exists(orphan)
+        assert exists(self.build_path)
+
+
+@pytest.mark.skipif(platform.system() == "Windows", reason="fake ccache is sh")
+class TestFastBuild:
+    def setup_method(self):
+        cmake_source_directory = TempDirectory()
+        self.cmake_source_path = cmake_source_directory.path
+        self.cmake_build_path = TempDirectory().path
+        cmake_source_directory.write("CMakeLists.txt", b"project(test)")
+        tools = TempDirectory()
+        self.ccache = tools.write("ccache", FAKE_CCACHE.encode("utf-8"))
+        os.chmod(self.ccache, 0o755)
+        self.path = os.environ["PATH"]
+        os.environ["PATH"] = tools.path + os.pathsep + self.path
+
+    def teardown_method(self):
+        os.environ["PATH"] = self.path
+        TempDirectory.cleanup_all()
+
+    def test_cmake_build_parallel(self):
+        assert cmake_build("build", "Debug", 4) == [
+            "cmake",
+            "--build",
+            "build",
+            "--parallel",
+            "4",
+            "--config",
+            "Debug",
+        ]
+        assert "--parallel" not in cmake_build("build", "Debug")
+
+    def test_parse_ccache_stats(self):
+        assert parse_ccache_stats(
+            [
+                "stats_updated_timestamp\t1700000000",
+                "direct_cache_hit\t5",
+                "preprocessed_cache_hit\t2",
+                "cache_miss\t3",
+            ]
+        ) == (7, 3)
+        assert parse_ccache_stats(["Usage: ccache"]) is None
+
+    def test_parse_sccache_stats(self):
+        assert parse_sccache_stats(
+            [
+                '{"stats": {"cache_hits": {"counts": {"C/C++": 4, "CUDA": 1}},',
+                '"cache_misses": {"counts": {"C/C++": 2}}}}',
+            ]
+        ) == (5, 2)
+        assert parse_sccache_stats(["not json"]) is None
+
+    def test_compiler_cache_difference(self):
+        cache = CompilerCache(self.ccache)
+        before = cache.stats()
+        assert before == (0, 0)
+        assert cache.difference(before) == (3, 1)
+
+    def test_fast_build(self):
+        log = []
+        builder = create_builder(
+            self.cmake_source_path, self.cmake_build_path, fast=True, command_log=log
+        )
+        result = builder()
+
+        assert result.succeeded
+        generate = log[LOG_IDX_GENERATE][0]
+        assert "-DCMAKE_C_COMPILER_LAUNCHER=" + self.ccache in generate
+        assert "-DCMAKE_CXX_COMPILER_LAUNCHER=" + self.ccache in generate
+        assert "--parallel" in log[LOG_IDX_BUILD][0]
+        assert result.compiler_cache == (3, 1)
+
+    def test_fast_build_keeps_given_launcher(self):
+        log = []
+        builder = create_builder(
+            self.cmake_source_path,
+            self.cmake_build_path,
+            fast=True,
+            defines=["CMAKE_CXX_COMPILER_LAUNCHER=distcc"],
+            command_log=log,
+        )
+        builder()
+
+        generate = log[LOG_IDX_GENERATE][0]
+        assert "-DCMAKE_CXX_COMPILER_LAUNCHER=distcc" in generate
+        assert "-DCMAKE_CXX_COMPILER_LAUNCHER=" + self.ccache not in generate
+
+
+class TestLinkDetector:
+    def setup_method(self):
+        build_directory = TempDirectory()
+        self.build_path = build_directory.path
+        self.exe = "test_core" + EXE_SUFFIX
+        self.testfiles = {self.exe: join("test", "test_core.cc")}
+        build_directory.makedir("test")
+        self.exe_path = build_directory.write(["test", self.exe], b"")
+        os.chmod(self.exe_path, 0o755)
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_ninja(self):
+        detect = LinkDetector(self.build_path, self.testfiles)
+        assert detect("[1/4] Building CXX object test/test_core.cc.o") == []
+        assert detect("[4/4] Linking CXX executable test/" + self.exe) == [
+            (join("test", "test_core.cc"), self.exe_path)
+        ]
+        assert detect("[3/4] Linking CXX executable test/other") == []
+
+    def test_make(self):
+        detect = LinkDetector(self.build_path, self.testfiles)
+        assert detect("[ 50%] Linking CXX executable " + self.exe) == []
+        assert detect("[100%] Built target test_core") == [
+            (join("test", "test_core.cc"), self.exe_path)
+        ]
+        assert detect("[100%] Built target core") == []
+
+    def test_make_elsewhere(self):
+        detect = LinkDetector(self.build_path, {self.exe: "test_core.cc"})
+        assert detect("[100%] Built target test_core") == [
+            ("test_core.cc", self.exe_path)
+        ]
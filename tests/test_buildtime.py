@@ -0,0 +1,159 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_buildtime
+----------------------------------
+
+Tests for `buildtime` module.
+"""
+import json
+import os
+
+from testfixtures import TempDirectory
+
+from ttt.buildtime import (
+    BuildProfiler,
+    format_trend,
+    parse_ninja_log,
+    split_output,
+    summarise,
+)
+
+NINJA_LOG_HEADER = "# ninja log v5\n"
+
+
+def ninja_entry(start, end, output):
+    return "{}\t{}\t0\t{}\tcafe\n".format(start, end, output)
+
+
+class TestParsing:
+    def test_parse_ninja_log(self):
+        entries = parse_ninja_log(
+            [
+                NINJA_LOG_HEADER,
+                ninja_entry(0, 1500, "CMakeFiles/core.dir/core.cc.o"),
+                ninja_entry(1500, 1750, "libcore.a"),
+                "garbage\n",
+                ninja_entry(0, 500, "CMakeFiles/core.dir/core.cc.o"),
+            ]
+        )
+        assert entries == {"CMakeFiles/core.dir/core.cc.o": 0.5, "libcore.a": 0.25}
+
+    def test_split_object(self):
+        assert split_output("test/CMakeFiles/test_core.dir/src/core.cc.o") == (
+            "test_core",
+            "src/core.cc",
+        )
+        assert split_output("CMakeFiles\\core.dir\\core.cc.obj") == (
+            "core",
+            "core.cc",
+        )
+
+    def test_split_linked(self):
+        assert split_output("test/test_core") == ("test_core", None)
+        assert split_output("libcore.so") == ("core", None)
+
+    def test_format_trend(self):
+        assert format_trend([], 1) == "first profiled build"
+        assert format_trend([1.0, 3.0], 2.5) == (
+            "-0.500s on last build, +0.500s on average of 2 builds"
+        )
+
+
+class TestBuildProfiler:
+    def setup_method(self):
+        self.build_directory = TempDirectory()
+        self.build_path = self.build_directory.path
+        self.history_path = os.path.join(self.build_path, ".ttt", "buildtime.json")
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def append_log(self, *entries):
+        with open(os.path.join(self.build_path, ".ninja_log"), "a") as f:
+            for entry in entries:
+                f.write(entry)
+
+    def test_no_ninja_log(self):
+        profiler = BuildProfiler(self.build_path)
+        profiler.mark()
+        assert profiler.collect() is None
+
+    def test_collect_this_build_only(self):
+        self.append_log(
+            NINJA_LOG_HEADER, ninja_entry(0, 9000, "CMakeFiles/old.dir/old.cc.o")
+        )
+        profiler = BuildProfiler(self.build_path, self.history_path)
+        profiler.mark()
+        self.append_log(
+            ninja_entry(0, 2000, "CMakeFiles/core.dir/slow.cc.o"),
+            ninja_entry(0, 1000, "CMakeFiles/core.dir/fast.cc.o"),
+            ninja_entry(2000, 2500, "test/CMakeFiles/test_core.dir/test_core.cc.o"),
+            ninja_entry(2500, 3000, "test/test_core"),
+        )
+        profile = profiler.collect()
+
+        assert profile.total == 4.0
+        assert profile.targets == [("core", 3.0), ("test_core", 1.0)]
+        assert profile.top_files(2) == [("slow.cc", 2.0), ("fast.cc", 1.0)]
+        assert profile.trend == []
+
+        profiler.mark()
+        self.append_log(ninja_entry(0, 1000, "CMakeFiles/core.dir/fast.cc.o"))
+        profile = profiler.collect()
+        assert profile.files == [("fast.cc", 1.0)]
+        assert profile.trend == [4.0]
+
+        assert BuildProfiler(self.build_path, self.history_path).history == [4.0, 1.0]
+
+    def test_recreated_build_area(self):
+        profiler = BuildProfiler(self.build_path)
+        self.append_log(
+            NINJA_LOG_HEADER, ninja_entry(0, 1000, "a"), ninja_entry(0, 1, "b")
+        )
+        profiler.mark()
+        os.remove(os.path.join(self.build_path, ".ninja_log"))
+        self.append_log(NINJA_LOG_HEADER, ninja_entry(0, 1000, "core"))
+        assert profiler.collect().targets == [("core", 1.0)]
+
+    def test_recompacted_log(self):
+        profiler = BuildProfiler(self.build_path)
+        self.append_log(
+            NINJA_LOG_HEADER, ninja_entry(0, 1000, "a"), ninja_entry(0, 1000, "a")
+        )
+        profiler.mark()
+        os.remove(os.path.join(self.build_path, ".ninja_log"))
+        self.append_log(
+            NINJA_LOG_HEADER, ninja_entry(0, 1000, "a"), ninja_entry(0, 1000, "core")
+        )
+        assert profiler.collect().targets == [("core", 1.0)]
+
+    def test_time_trace(self):
+        profiler = BuildProfiler(self.build_path)
+        profiler.mark()
+        self.append_log(
+            NINJA_LOG_HEADER, ninja_entry(0, 2000, "CMakeFiles/core.dir/core.cc.o")
+        )
+        self.build_directory.write(
+            ["CMakeFiles", "core.dir", "core.cc.json"],
+            json.dumps(
+                {
+                    "traceEvents": [
+                        {"name": "Total Frontend", "dur": 1500000},
+                        {"name": "Total Backend", "dur": 400000},
+                        {"name": "Source", "dur": 1000000},
+                    ]
+                }
+            ).encode("utf-8"),
+        )
+        profile = profiler.collect()
+
+        assert profile.phases == {
+            "core.cc": {"Total Frontend": 1.5, "Total Backend": 0.4}
+        }
+        assert summarise(profile, 1) == [
+            "Build time: 2.000s (first profiled build)",
+            "  target      2.000s core",
+            "  file        2.000s core.cc (backend 0.400s, frontend 1.500s)",
+        ]
@@ -0,0 +1,205 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_cache
+----------------------------------
+
+Tests for `cache` module.
+"""
+import os
+from unittest.mock import patch
+
+from testfixtures import TempDirectory
+
+from ttt.cache import (
+    binary_identity,
+    Catalogue,
+    ResultCache,
+    SharedLibraries,
+    state_path,
+)
+
+
+class MockTest:
+    def __init__(self, executable, tests):
+        self._executable = executable
+        self._tests = tests
+        self.listed = 0
+        self.exit_code = 0
+
+    def executable(self):
+        return self._executable
+
+    def list_tests(self):
+        self.listed += 1
+        return self._tests
+
+    def fails(self):
+        return 0
+
+    def passes(self):
+        return len(self._tests)
+
+    def run_time(self):
+        return 10
+
+    def returncode(self):
+        return self.exit_code
+
+
+class TestCatalogue:
+    def setup_method(self):
+        self.wd = TempDirectory()
+        self.executable = self.wd.write("test_core", b"binary")
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_identity(self):
+        assert binary_identity(self.executable) is not None
+        assert binary_identity(os.path.join(self.wd.path, "missing")) is None
+
+    def test_lists_once(self):
+        catalogue = Catalogue()
+        test = MockTest(self.executable, ["core.ok"])
+        assert catalogue.tests(test) == ["core.ok"]
+        assert catalogue.tests(test) == ["core.ok"]
+        assert test.listed == 1
+
+    def test_relisted_when_relinked(self):
+        catalogue = Catalogue()
+        test = MockTest(self.executable, ["core.ok"])
+        catalogue.tests(test)
+
+        self.wd.write("test_core", b"relinked binary")
+        test._tests = ["core.ok", "core.new"]
+        assert catalogue.tests(test) == ["core.ok", "core.new"]
+        assert test.listed == 2
+
+    def test_put(self):
+        catalogue = Catalogue()
+        test = MockTest(self.executable, [])
+        catalogue.put(test, ["core.ok", "core.run"])
+        assert catalogue.tests(test) == ["core.ok", "core.run"]
+        assert test.listed == 0
+
+    def test_persisted(self):
+        path = state_path(self.wd.path, "catalogue.json")
+        catalogue = Catalogue(path)
+        catalogue.tests(MockTest(self.executable, ["core.ok"]))
+        catalogue.save()
+
+        test = MockTest(self.executable, [])
+        assert Catalogue(path).tests(test) == ["core.ok"]
+        assert test.listed == 0
+
+
+class TestSharedLibraries:
+    def setup_method(self):
+        self.wd = TempDirectory()
+        self.wd.write("CMakeCache.txt", b"generated")
+        self.library = self.wd.write("lib/libcore.so", b"library")
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def paths(self, libraries):
+        return [path for path, _ in libraries.identities()]
+
+    def test_walked_once(self):
+        libraries = SharedLibraries(self.wd.path)
+        assert libraries.identities() == [[self.library, binary_identity(self.library)]]
+
+        self.wd.write("libother.so", b"library")
+        with patch("os.walk") as walk:
+            assert self.paths(libraries) == [self.library]
+        assert not walk.called
+
+    def test_walked_again_when_regenerated(self):
+        libraries = SharedLibraries(self.wd.path)
+        libraries.identities()
+
+        other = self.wd.write("libother.so", b"library")
+        self.wd.write("CMakeCache.txt", b"regenerated")
+        assert self.paths(libraries) == [self.library, other]
+
+    def test_built_by_ninja(self):
+        libraries = SharedLibraries(self.wd.path)
+        libraries.identities()
+
+        other = self.wd.write("lib/libother.so", b"library")
+        self.wd.write(
+            ".ninja_log",
+            b"# ninja log v5\n"
+            b"0\t10\t0\tlib/libother.so\tabc\n"
+            b"0\t10\t0\tlib/libpartial.so",
+        )
+        with patch("os.walk") as walk:
+            assert self.paths(libraries) == [self.library, other]
+        assert not walk.called
+
+    def test_gone(self):
+        libraries = SharedLibraries(self.wd.path)
+        libraries.identities()
+        os.remove(self.library)
+        assert libraries.identities() == [[self.library, None]]
+
+    def test_persisted(self):
+        path = state_path(self.wd.path, "libraries.json")
+        SharedLibraries(self.wd.path, path).identities()
+        with patch("os.walk") as walk:
+            assert self.paths(SharedLibraries(self.wd.path, path)) == [self.library]
+        assert not walk.called
+
+
+class TestResultCache:
+    def setup_method(self):
+        self.wd = TempDirectory()
+        self.executable = self.wd.write("test_core", b"binary")
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_hit(self):
+        cache = ResultCache(build_path=self.wd.path)
+        test = MockTest(self.executable, ["core.ok"])
+        assert cache.get(test) is None
+        cache.put(test)
+        assert cache.get(test)["passes"] == 1
+
+    def test_miss_when_relinked(self):
+        cache = ResultCache(build_path=self.wd.path)
+        test = MockTest(self.executable, ["core.ok"])
+        cache.put(test)
+        self.wd.write("test_core", b"relinked binary")
+        assert cache.get(test) is None
+
+    def test_miss_when_library_relinked(self):
+        self.wd.write("libcore.so", b"library")
+        cache = ResultCache(build_path=self.wd.path)
+        test = MockTest(self.executable, ["core.ok"])
+        cache.put(test)
+
+        self.wd.write("libcore.so", b"relinked library")
+        cache.refresh()
+        assert cache.get(test) is None
+
+    def test_not_put_when_binary_failed(self):
+        cache = ResultCache(build_path=self.wd.path)
+        test = MockTest(self.executable, ["core.ok"])
+        # e.g. a leak reported at exit, after every test passed
+        test.exit_code = 23
+        cache.put(test)
+        assert cache.get(test) is None
+
+    def test_clear(self):
+        path = state_path(self.wd.path, "results.json")
+        cache = ResultCache(path, self.wd.path)
+        test = MockTest(self.executable, ["core.ok"])
+        cache.put(test)
+        cache.save()
+        assert ResultCache(path, self.wd.path).get(test) is not None
+
+        cache.clear()
+        assert cache.get(test) is None
@@ -7,10 +7,14 @@ test_cli
 
 Tests for `cli` module.
 """
+import os
+import subprocess
+import sys
 from unittest.mock import patch
 
 from click.testing import CliRunner
 
+import ttt as package
 from ttt.cli import ttt
 from ttt.terminal import Terminal
 
@@ -37,6 +41,20 @@ class TestCLI:
             assert kwargs["generator"] == "Ninja"
             assert kwargs["define"] == ()
 
+    def test_not_tested_after_failed_build(self):
+        with patch("ttt.monitor.create_monitor", autospec=True) as monitor:
+            m = monitor.return_value
+            m.configurations = None
+            m.build.return_value = False
+            result = CliRunner().invoke(ttt, ["watch_path", "-t"])
+            assert result.exit_code == 0
+            assert m.build.called
+            assert not m.test.called
+
+            m.build.return_value = True
+            CliRunner().invoke(ttt, ["watch_path", "-t"])
+            assert m.test.called
+
     def test_define_list(self):
         with patch("ttt.monitor.create_monitor", autospec=True) as monitor:
             runner = CliRunner()
@@ -104,3 +122,72 @@ class TestCLI:
             assert len(monitor.call_args_list)
             args, kwargs = monitor.call_args_list[0]
             assert kwargs["clean"]
+
+
+# Modules that must not be loaded before the arguments are parsed.
+DEFERRED_MODULES = ["ttt.monitor", "ttt.builder", "requests", "importlib.metadata"]
+# Modules of the optional features that the monitor must only load when they
+# are asked for.
+MONITOR_DEFERRED_MODULES = [
+    "ttt.eventlog",
+    "ttt.jobslots",
+    "ttt.metrics",
+    "ttt.profiling",
+    "ttt.remote",
+    "ttt.status",
+    "ttt.syntax",
+    "ttt.trace",
+    "concurrent.futures",
+    "cProfile",
+    "http.server",
+    "socketserver",
+]
+# The most time, in microseconds, that importing the command line may take.
+# This is generous so as not to fail on slow machines; the list of the
+# modules imported is what keeps startup fast.
+IMPORT_TIME_BUDGET = 500000
+
+
+def import_times(*args):
+    """Runs python -X importtime.
+
+    :return a dict of the modules imported to their cumulative import time
+    in microseconds
+    """
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(package.__file__))
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime"] + list(args),
+        env=env,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    times = {}
+    for line in process.stderr.splitlines():
+        fields = line.split("|")
+        if line.startswith("import time:") and fields[1].strip().isdigit():
+            times[fields[2].strip()] = int(fields[1])
+    return times
+
+
+class TestStartup:
+    def test_import_cli(self):
+        times = import_times("-c", "import ttt.cli")
+        assert "ttt.cli" in times
+        assert [m for m in DEFERRED_MODULES if m in times] == []
+        assert times["ttt.cli"] < IMPORT_TIME_BUDGET
+
+    def test_import_monitor(self):
+        times = import_times("-c", "import ttt.monitor")
+        assert "ttt.monitor" in times
+        assert [m for m in MONITOR_DEFERRED_MODULES if m in times] == []
+
+    def test_version(self):
+        times = import_times("-m", "ttt", "--version")
+        assert "ttt.monitor" not in times
+        assert "requests" not in times
+
+        result = CliRunner().invoke(ttt, ["--version"])
+        assert result.exit_code == 0
+        assert result.output == "ttt, version {}\n".format(package.__version__)
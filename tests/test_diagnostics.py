@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_diagnostics
+----------------------------------
+
+Tests for `diagnostics` module.
+"""
+import sys
+
+from ttt.diagnostics import condense, DiagnosticParser, parse_diagnostic
+
+
+class TestParseDiagnostic:
+    def test_gcc(self):
+        d = parse_diagnostic("/src/core.cc:12:5: error: 'x' was not declared")
+        assert (d.file, d.line, d.column, d.severity) == (
+            "/src/core.cc",
+            12,
+            5,
+            "error",
+        )
+        assert d.message == "'x' was not declared"
+
+    def test_gcc_fatal_without_column(self):
+        d = parse_diagnostic("core.cc:1: fatal error: missing.h: No such file")
+        assert (d.line, d.column, d.severity) == (1, None, "error")
+
+    def test_clang_warning(self):
+        d = parse_diagnostic("src/a.c:3:1: warning: unused variable 'y'")
+        assert d.severity == "warning"
+
+    def test_windows_path(self):
+        d = parse_diagnostic("C:\\src\\core.cc:7:2: error: expected ';'")
+        assert (d.file, d.line) == ("C:\\src\\core.cc", 7)
+
+    def test_msvc(self):
+        d = parse_diagnostic(
+            "C:\\src\\core.cc(12,5): error C2065: 'x': undeclared identifier"
+        )
+        assert (d.file, d.line, d.column) == ("C:\\src\\core.cc", 12, 5)
+        assert d.message == "C2065: 'x': undeclared identifier"
+
+    def test_cmake(self):
+        d = parse_diagnostic("CMake Error at CMakeLists.txt:3 (add_executable):")
+        assert (d.file, d.line, d.severity) == ("CMakeLists.txt", 3, "error")
+        assert condense(d) == "CMakeLists.txt:3: error: cmake add_executable"
+
+    def test_linker(self):
+        d = parse_diagnostic("core.cc:(.text+0x5): undefined reference to `f()'")
+        assert d.file is None
+        assert condense(d) == "error: undefined reference to `f()'"
+        assert parse_diagnostic("collect2: error: ld returned 1 exit status")
+
+    def test_linker_driver(self):
+        d = parse_diagnostic("/usr/bin/ld: cannot find -lfoo")
+        assert (d.severity, d.message) == ("error", "/usr/bin/ld: cannot find -lfoo")
+        assert parse_diagnostic("ld.lld: error: undefined symbol: f()").severity == (
+            "error"
+        )
+
+    def test_linker_warning(self):
+        d = parse_diagnostic("/usr/bin/ld: warning: libz.so.1, needed by x, not found")
+        assert d.severity == "warning"
+
+    def test_field_is_not_linker_error(self):
+        assert parse_diagnostic("-- Setting default build: Debug") is None
+        assert parse_diagnostic("  build: 3 steps") is None
+        assert parse_diagnostic("world: hello") is None
+
+    def test_not_diagnostic(self):
+        assert parse_diagnostic("[1/4] Building CXX object core.cc.o") is None
+        assert parse_diagnostic("note: candidate is f(int)") is None
+
+
+class TestDiagnosticParser:
+    def test_first_error_with_context(self):
+        surfaced = []
+        parser = DiagnosticParser(on_first_error=surfaced.append)
+        for line in [
+            "[1/3] Building CXX object core.cc.o",
+            "core.cc:1:1: warning: unused",
+            "core.cc:2:5: error: expected ';'",
+            "    int x",
+            "        ^",
+            "[2/3] Building CXX object other.cc.o",
+            "other.cc:9:1: error: unknown type",
+        ]:
+            parser(sys.stdout, line)
+        parser.complete()
+
+        assert (parser.errors, parser.warnings) == (2, 1)
+        assert parser.first_error.line == 2
+        assert surfaced == [parser.first_error]
+        assert parser.first_error.context == ["    int x", "        ^"]
+
+    def test_context_limited(self):
+        parser = DiagnosticParser()
+        parser(sys.stdout, "a.c:1:1: error: bad")
+        for i in range(10):
+            parser(sys.stdout, "context {}".format(i))
+        assert len(parser.first_error.context) == 3
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_eventlog
+----------------------------------
+
+Tests for `eventlog` module.
+"""
+import io
+import json
+import os
+import socket
+import sys
+
+import pytest
+from testfixtures import TempDirectory
+
+from ttt.builder import BuildStep
+from ttt.eventlog import EventLogReporter, open_event_stream
+from ttt.executor import CompletedBinary, CompletedTest, FAILED, PASSED
+from ttt.watcher import WatchState
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+def events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+class TestEventLogReporter:
+    def test_cycle(self):
+        stream = io.StringIO()
+        clock = Clock()
+        reporter = EventLogReporter(stream, clock=clock)
+
+        reporter.report_watchstate(WatchState({"a.cc"}, set(), {"b.cc", "c.cc"}, 0.25))
+        reporter.session_start("build")
+        reporter.report_build_steps([BuildStep(["cmake"], 0, 1.5, "build.log", 0)])
+        reporter.session_end("build", 1.5)
+        reporter.session_start("test")
+        reporter.report_plan({"total_binaries": 1, "total_tests": 2, "tests": {}})
+        reporter.report_test_progress(
+            CompletedTest("/b/test_core", "test_core.cc", "core.ok", PASSED, 0.01)
+        )
+        reporter.report_test_progress(
+            CompletedTest("/b/test_core", "test_core.cc", "core.bad", FAILED, 0.02)
+        )
+        reporter.report_test_progress(
+            CompletedBinary("/b/test_core", "test_core.cc", 1, 1, 0.03, False)
+        )
+        reporter.report_results(
+            {
+                "total_passed": 1,
+                "total_failed": 1,
+                "total_runtime": 0.03,
+                "failures": [["core.bad", [], [], FAILED]],
+            }
+        )
+        reporter.session_end("test", 0.5)
+        clock.now = 103.0
+        reporter.wait_change()
+
+        logged = events(stream)
+        assert [e["event"] for e in logged] == [
+            "watchstate",
+            "session_start",
+            "build_step",
+            "session_end",
+            "session_start",
+            "plan",
+            "test",
+            "test",
+            "binary",
+            "results",
+            "session_end",
+            "cycle",
+        ]
+        assert logged[0] == {
+            "event": "watchstate",
+            "time": 100.0,
+            "created": 1,
+            "modified": 2,
+            "deleted": 0,
+            "walk_time": 0.25,
+        }
+        assert logged[2]["duration"] == 1.5
+        assert logged[7]["name"] == "core.bad"
+        assert logged[7]["outcome"] == FAILED
+        assert logged[9]["failures"] == ["core.bad"]
+        assert logged[-1]["duration"] == 3.0
+        assert logged[-1]["sessions"] == {"build": 1.5, "test": 0.5}
+
+    def test_stops_when_stream_fails(self):
+        class BrokenStream(io.StringIO):
+            def write(self, s):
+                raise BrokenPipeError()
+
+        reporter = EventLogReporter(BrokenStream())
+        reporter.halt()
+        reporter.halt()
+        assert reporter.stream is None
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="needs unix sockets")
+def test_unix_socket():
+    path = os.path.join(TempDirectory().path, "events.sock")
+    server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        server.bind(path)
+        server.listen(1)
+        reporter = EventLogReporter(open_event_stream("unix:" + path))
+        connection, _ = server.accept()
+        reporter.halt()
+        reporter.stream.close()
+        received = connection.makefile().read()
+        connection.close()
+    finally:
+        server.close()
+        TempDirectory.cleanup_all()
+    assert json.loads(received)["event"] == "halt"
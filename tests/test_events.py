@@ -0,0 +1,118 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_events
+----------------------------------
+
+Tests for `events` module.
+"""
+import threading
+from unittest.mock import MagicMock
+
+import pytest
+
+from ttt.events import BLOCK, DROP, EventBus, EVENTS
+from ttt.reporter import Reporter
+
+
+class Recorder(object):
+    def __init__(self):
+        self.events = []
+
+    def session_start(self, descriptor):
+        self.events.append(("session_start", descriptor))
+
+    def halt(self):
+        self.events.append(("halt",))
+
+
+class SlowRecorder(Recorder):
+    def __init__(self):
+        super().__init__()
+        self.release = threading.Event()
+
+    def session_start(self, descriptor):
+        self.release.wait()
+        super().session_start(descriptor)
+
+
+class TestEventBus:
+    def test_events_are_reporter_interface(self):
+        assert "session_start" in EVENTS
+        assert "report_results" in EVENTS
+        assert "notify" not in EVENTS
+
+    def test_publish(self):
+        bus = EventBus()
+        reporter = MagicMock(spec=Reporter)
+        recorder = Recorder()
+        bus.subscribe(reporter)
+        bus.subscribe(recorder)
+
+        bus.publish("session_start", "build")
+        bus.publish("report_plan", {})
+
+        assert [c for c, a, kw in reporter.mock_calls] == [
+            "session_start",
+            "report_plan",
+        ]
+        # events that a reporter does not implement are not sent to it
+        assert recorder.events == [("session_start", "build")]
+
+    def test_unknown_event(self):
+        with pytest.raises(ValueError):
+            EventBus().publish("no_such_event")
+
+    def test_reporter_errors_not_hidden(self):
+        bus = EventBus()
+        reporter = MagicMock(spec=Reporter)
+        reporter.halt.side_effect = AttributeError("broken reporter")
+        bus.subscribe(reporter)
+        with pytest.raises(AttributeError):
+            bus.publish("halt")
+
+
+class TestBackgroundReporter:
+    def test_delivered_in_order(self):
+        bus = EventBus()
+        recorder = Recorder()
+        bus.subscribe(recorder, background=True, policy=BLOCK)
+        for i in range(100):
+            bus.publish("session_start", i)
+        bus.publish("halt")
+        bus.close()
+
+        assert recorder.events == [("session_start", i) for i in range(100)] + [
+            ("halt",)
+        ]
+
+    def test_slow_reporter_does_not_block(self):
+        bus = EventBus()
+        recorder = SlowRecorder()
+        bus.subscribe(recorder, background=True, queue_size=2, policy=DROP)
+        for i in range(10):
+            bus.publish("session_start", i)
+        # one taken by the reporter, two queued, the rest dropped
+        assert bus.dropped() >= 7
+
+        recorder.release.set()
+        bus.close()
+        assert recorder.events[0] == ("session_start", 0)
+        assert len(recorder.events) == 10 - bus.dropped()
+
+    def test_failing_reporter_keeps_running(self, capsys):
+        bus = EventBus()
+        reporter = MagicMock(spec=Reporter)
+        reporter.session_start.side_effect = RuntimeError("broken")
+        bus.subscribe(reporter, background=True)
+        bus.publish("session_start", "build")
+        bus.publish("halt")
+        bus.close()
+
+        assert reporter.halt.called
+        assert "RuntimeError: broken" in capsys.readouterr().err
+
+    def test_unknown_policy(self):
+        with pytest.raises(ValueError):
+            EventBus().subscribe(Recorder(), background=True, policy="spill")
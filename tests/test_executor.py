@@ -9,9 +9,19 @@ Tests for `executor` module.
 """
 import os
 import sys
+from unittest.mock import patch
 
-from ttt.executor import CRASHED, Executor, FAILED
+from ttt.cache import ResultCache
+from ttt.executor import (
+    CompletedBinary,
+    CompletedTest,
+    CRASHED,
+    Executor,
+    FAILED,
+    PASSED,
+)
 from ttt.gtest import GTest
+from ttt.trace import Tracer
 
 
 BUILDPATH = os.path.sep + os.path.join("path", "to", "build")
@@ -21,8 +31,10 @@ DUMMYPATH = os.path.join(BUILDPATH, "test_core")
 class MockTest(GTest):
     def __init__(self, source, executable, term=None):
         super(MockTest, self).__init__(source, executable, term)
+        # as if the binary had run to completion
+        self._returncode = 0
 
-    def execute(self, filters):
+    def execute(self, filters, **kwargs):
         pass
 
 
@@ -411,3 +423,134 @@ class TestExecutor:
         )
         e.test([g])
         assert e.test_filter() == {}
+
+
+class TestExecutorPlan:
+    def test_plan_from_catalogue(self):
+        e = Executor()
+        g = MockTest("test_core.cc", DUMMYPATH)
+        with patch.object(MockTest, "list_tests", return_value=["core.ok", "core.a"]):
+            plan = e.plan([g])
+        assert plan == {
+            "total_binaries": 1,
+            "total_tests": 2,
+            "tests": {DUMMYPATH: ["core.ok", "core.a"]},
+        }
+
+    def test_plan_from_last_run(self):
+        e = Executor()
+        g = make_test(
+            "test_core.cc",
+            DUMMYPATH,
+            [
+                "[----------] 2 tests from core",
+                "[ RUN      ] core.ok",
+                "[       OK ] core.ok (0 ms)",
+                "[ RUN      ] core.a",
+                "[       OK ] core.a (0 ms)",
+                "[----------] 2 tests from core (1 ms total)",
+            ],
+        )
+        e.test([g])
+        with patch.object(MockTest, "list_tests") as list_tests:
+            plan = e.plan([g])
+        assert not list_tests.called
+        assert plan["tests"] == {DUMMYPATH: ["core.ok", "core.a"]}
+
+    def test_plan_with_filter(self):
+        e = Executor()
+        e._test_filter = {DUMMYPATH: ["core.ok"]}
+        other = MockTest("test_other.cc", os.path.join(BUILDPATH, "test_other"))
+        with patch.object(MockTest, "list_tests") as list_tests:
+            plan = e.plan([MockTest("test_core.cc", DUMMYPATH), other])
+        assert not list_tests.called
+        assert plan["total_binaries"] == 1
+        assert plan["total_tests"] == 1
+
+
+class TestExecutorProgress:
+    def test_binaries_reported(self):
+        progress = []
+        cache = ResultCache()
+        e = Executor(result_cache=cache, progress=progress.append)
+        g = make_test(
+            "test_core.cc",
+            DUMMYPATH,
+            [
+                "[----------] 1 test from core",
+                "[ RUN      ] core.ok",
+                "[       OK ] core.ok (0 ms)",
+                "[----------] 1 test from core (1 ms total)",
+            ],
+        )
+        with patch.object(MockTest, "execute") as execute:
+            e.test([g])
+        assert execute.call_args[1]["progress"] == e.tested
+        assert execute.call_args[1]["term"].stream is None
+        assert progress == [
+            CompletedBinary(DUMMYPATH, "test_core.cc", 1, 0, 0.0, False)
+        ]
+
+        # cached binaries are reported as finished
+        del progress[:]
+        e.test([g])
+        assert [p.cached for p in progress] == [True]
+
+    def test_tests_reported(self):
+        progress = []
+        e = Executor(progress=progress.append)
+        g = make_test("test_core.cc", DUMMYPATH, [])
+        g(sys.stdout, "[----------] 1 test from core")
+        g(sys.stdout, "[ RUN      ] core.ok")
+        g._progress = e.tested
+        g(sys.stdout, "[       OK ] core.ok (0 ms)")
+
+        [outcome] = progress
+        assert outcome[:4] == (DUMMYPATH, "test_core.cc", "core.ok", PASSED)
+        assert outcome.duration >= 0
+        assert isinstance(outcome, CompletedTest)
+
+
+class TestExecutorTrace:
+    def test_binaries_traced(self):
+        tracer = Tracer("unused")
+        e = Executor(tracer=tracer)
+        g = make_test("test_core.cc", DUMMYPATH, [])
+        with patch.object(MockTest, "execute"):
+            e.test([g])
+
+        [span] = [s for s in tracer.events() if s["ph"] == "X"]
+        assert span["name"] == "test_core.cc"
+        assert span["cat"] == "test"
+        assert span["args"] == {"executable": DUMMYPATH}
+
+
+class TestExecutorResultCache:
+    def test_unchanged_binary_not_rerun(self):
+        cache = ResultCache()
+        e = Executor(result_cache=cache)
+        g = make_test(
+            "test_core.cc",
+            DUMMYPATH,
+            [
+                "[----------] 1 test from core",
+                "[ RUN      ] core.ok",
+                "[       OK ] core.ok (0 ms)",
+                "[----------] 1 test from core (1 ms total)",
+            ],
+        )
+        results = e.test([g])
+        assert results["total_passed"] == 1
+        assert results["total_cached"] == 0
+
+        with patch.object(MockTest, "execute") as execute:
+            results = e.test([g])
+        assert not execute.called
+        assert results["total_passed"] == 1
+        assert results["total_cached"] == 1
+        assert results["cached"] == ["test_core.cc"]
+
+        e.clear_cache()
+        with patch.object(MockTest, "execute") as execute:
+            e.test([g])
+        assert execute.called
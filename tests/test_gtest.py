@@ -9,16 +9,39 @@ Tests for `gtest` module.
 """
 import io
 import os
+import stat
 import sys
 from unittest.mock import patch
 
 import pytest
+from testfixtures import TempDirectory
 
-from ttt.executor import CRASHED
-from ttt.gtest import GTest, GTestException
+from ttt.executor import CRASHED, PASSED, TIMEOUT
+from ttt.gtest import GTest, GTestException, parse_test_list
 from ttt.terminal import Terminal
 
 
+# A stand-in for a gtest binary where core.hang never finishes. It honours
+# the negative part of --gtest_filter so that the hung test can be skipped.
+HANGING_GTEST = """#!{python}
+import sys
+import time
+
+excluded = []
+for arg in sys.argv[1:]:
+    if arg.startswith("--gtest_filter="):
+        excluded = arg[len("--gtest_filter="):].partition("-")[2].split(":")
+tests = [t for t in ["core.ok", "core.hang", "core.after"] if t not in excluded]
+print("[----------] {{}} tests from core".format(len(tests)), flush=True)
+for test in tests:
+    print("[ RUN      ] " + test, flush=True)
+    if test == "core.hang":
+        time.sleep(30)
+    print("[       OK ] " + test + " (0 ms)", flush=True)
+print("[----------] {{}} tests from core (0 ms total)".format(len(tests)))
+"""
+
+
 class TestGTest:
     def test_run_time(self):
         results = [
@@ -438,3 +461,86 @@ class TestGTest:
         assert f.getvalue() == (
             os.linesep.join(header) + os.linesep + os.linesep.join(results) + os.linesep
         )
+
+    def test_parse_test_list(self):
+        output = [
+            "Running main() from gtest_main.cc",
+            "core.",
+            "  ok",
+            "  notok",
+            "param/core.  # TypeParam = int",
+            "  blah/0  # GetParam() = 1",
+        ]
+        assert parse_test_list(output) == [
+            "core.ok",
+            "core.notok",
+            "param/core.blah/0",
+        ]
+
+    def test_list_tests_error(self):
+        gtest = GTest("/test/test_core.cc", "/path/to/nonexistent/test")
+        assert gtest.list_tests() == []
+
+    def test_returncode(self):
+        def runner(command, listener, **kwargs):
+            for line in [
+                "[ RUN      ] core.ok",
+                "[       OK ] core.ok (0 ms)",
+            ]:
+                listener(sys.stdout, line)
+            # e.g. a leak reported at exit, after every test passed
+            return 23, [], []
+
+        gtest = GTest("/test/test_core.cc", "/path/to/test")
+        assert gtest.returncode() is None
+        assert gtest.execute([], runner=runner) == []
+        assert gtest.fails() == 0
+        assert gtest.returncode() == 23
+
+
+class TestGTestTimeout:
+    def setup_method(self):
+        wd = TempDirectory()
+        self.executable = wd.write(
+            "test_core", HANGING_GTEST.format(python=sys.executable).encode("utf-8")
+        )
+        os.chmod(self.executable, os.stat(self.executable).st_mode | stat.S_IXUSR)
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_command_exclusions(self):
+        gtest = GTest("/test/test_core.cc", "/path/to/test")
+        assert gtest.command([], ["a", "b"]) == [
+            "/path/to/test",
+            "--gtest_filter=-a:b",
+        ]
+        assert gtest.command(["x"], ["a"]) == ["/path/to/test", "--gtest_filter=x-a"]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a posix shebang")
+    def test_test_timeout_continues(self):
+        gtest = GTest("test_core.cc", self.executable)
+        assert gtest.execute([], test_timeout=0.5) == ["core.hang"]
+        results = gtest.results()
+        assert [r[0] for r in results.values()] == [PASSED, TIMEOUT, PASSED]
+        assert list(results.keys()) == ["core.ok", "core.hang", "core.after"]
+        assert gtest.passes() == 2
+        assert gtest.fails() == 1
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a posix shebang")
+    def test_progress(self):
+        progress = []
+        gtest = GTest("test_core.cc", self.executable)
+        gtest.execute(
+            [],
+            test_timeout=0.5,
+            progress=lambda test, outcome: progress.append((test, outcome)),
+        )
+        assert progress == [(gtest, PASSED), (gtest, TIMEOUT), (gtest, PASSED)]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a posix shebang")
+    def test_binary_timeout_stops(self):
+        gtest = GTest("test_core.cc", self.executable)
+        assert gtest.execute([], timeout=0.5) == ["core.hang"]
+        assert list(gtest.results().keys()) == ["core.ok", "core.hang"]
+        assert gtest.test_results("core.hang")[1] == ["TIMEOUT (0.5s)"]
@@ -0,0 +1,132 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_jobslots
+----------------------------------
+
+Tests for `jobslots` module.
+"""
+import os
+import stat
+import subprocess
+import sys
+
+import pytest
+from testfixtures import TempDirectory
+
+import ttt
+from ttt.builder import SlottedBuild
+from ttt.jobslots import JobSlots
+
+HOLD_SLOT = """
+import sys, time
+from ttt.jobslots import JobSlots
+held = JobSlots(2, sys.argv[1]).acquire(1)
+print("held", flush=True)
+sys.stdin.readline()
+"""
+
+
+class TestJobSlots:
+    def setup_method(self):
+        self.directory = TempDirectory().path
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_no_slots(self):
+        with pytest.raises(ValueError):
+            JobSlots(0, self.directory)
+
+    def test_acquire_and_release(self):
+        slots = JobSlots(3, self.directory)
+        held = slots.acquire(2)
+        assert len(held) == 2
+        rest = slots.try_acquire(5)
+        assert len(rest) == 1
+        assert slots.try_acquire() == []
+
+        slots.release(held)
+        assert held == []
+        assert len(slots.try_acquire(5)) == 2
+        slots.release(rest)
+
+    def test_slot(self):
+        slots = JobSlots(1, self.directory)
+        with slots.slot():
+            assert slots.try_acquire() == []
+        other = slots.try_acquire()
+        assert len(other) == 1
+        slots.release(other)
+
+    def test_shared_between_processes(self):
+        holder = subprocess.Popen(
+            [sys.executable, "-c", HOLD_SLOT, self.directory],
+            stdin=subprocess.PIPE,
+            stdout=subprocess.PIPE,
+            universal_newlines=True,
+            env=dict(
+                os.environ,
+                PYTHONPATH=os.path.dirname(os.path.dirname(ttt.__file__)),
+            ),
+        )
+        try:
+            assert holder.stdout.readline().strip() == "held"
+            slots = JobSlots(2, self.directory)
+            held = slots.try_acquire(2)
+            assert len(held) == 1
+        finally:
+            holder.stdin.close()
+            holder.wait()
+
+        # the slots of an exited process are free again
+        assert len(slots.try_acquire(2)) == 1
+        slots.release(held)
+
+    def test_slotted_build(self):
+        slots = JobSlots(4, self.directory)
+        held = slots.acquire(1)
+        build = SlottedBuild("build", "Debug", slots)
+        command = build()
+        assert command[command.index("--parallel") + 1] == "3"
+        assert slots.try_acquire() == []
+
+        build.completed(0)
+        assert len(slots.try_acquire(4)) == 3
+        slots.release(held)
+
+    def test_slotted_build_leaves_a_slot(self):
+        slots = JobSlots(4, self.directory)
+        build = SlottedBuild("build", "Debug", slots)
+        command = build()
+        assert command[command.index("--parallel") + 1] == "3"
+        held = slots.try_acquire()
+        assert len(held) == 1
+        slots.release(held)
+        build.completed(0)
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs O_NOFOLLOW")
+    def test_symlinked_slot_refused(self):
+        target = os.path.join(self.directory, "target")
+        os.symlink(target, os.path.join(self.directory, "slot-0"))
+        with pytest.raises(OSError):
+            JobSlots(1, self.directory).try_acquire()
+        assert not os.path.exists(target)
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs posix modes")
+    def test_default_directory_is_private(self, monkeypatch):
+        monkeypatch.setenv("XDG_RUNTIME_DIR", self.directory)
+        slots = JobSlots(1)
+        assert slots.directory == os.path.join(self.directory, "ttt-jobslots")
+        held = slots.acquire()
+        assert stat.S_IMODE(os.stat(slots.directory).st_mode) == 0o700
+        assert stat.S_IMODE(os.fstat(held[0].fileno()).st_mode) & 0o077 == 0
+        slots.release(held)
+
+    def test_slotted_build_limited(self):
+        slots = JobSlots(4, self.directory)
+        build = SlottedBuild("build", "Debug", slots, parallel=2)
+        command = build()
+        assert command[command.index("--parallel") + 1] == "2"
+        build.completed(None)
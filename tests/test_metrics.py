@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_metrics
+----------------------------------
+
+Tests for `metrics` module.
+"""
+import os
+import urllib.request
+
+from testfixtures import TempDirectory
+
+from ttt.builder import BuildStep
+from ttt.executor import CRASHED, FAILED
+from ttt.metrics import (
+    Counter,
+    export_metrics,
+    Gauge,
+    Histogram,
+    MetricsFile,
+    MetricsReporter,
+    MetricsServer,
+    Registry,
+    resident_memory,
+)
+from ttt.watcher import WatchState
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 100.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestRegistry:
+    def test_render(self):
+        registry = Registry()
+        counter = registry.register(Counter("tests_total", "Tests run."))
+        gauge = registry.register(Gauge("files", "Files tracked."))
+        registry.register(Gauge("unknown", "No value.", lambda: None))
+        histogram = registry.register(Histogram("scan_seconds", "Scans.", (0.1, 1)))
+
+        counter.inc(2, outcome="passed")
+        counter.inc(outcome='fa"iled')
+        gauge.set(12)
+        histogram.observe(0.05)
+        histogram.observe(0.5)
+
+        assert registry.render().splitlines() == [
+            "# HELP tests_total Tests run.",
+            "# TYPE tests_total counter",
+            'tests_total{outcome="passed"} 2',
+            'tests_total{outcome="fa\\"iled"} 1',
+            "# HELP files Files tracked.",
+            "# TYPE files gauge",
+            "files 12",
+            "# HELP unknown No value.",
+            "# TYPE unknown gauge",
+            "# HELP scan_seconds Scans.",
+            "# TYPE scan_seconds histogram",
+            'scan_seconds_bucket{le="0.1"} 1',
+            'scan_seconds_bucket{le="1"} 2',
+            'scan_seconds_bucket{le="+Inf"} 2',
+            "scan_seconds_sum 0.55",
+            "scan_seconds_count 2",
+        ]
+
+    def test_resident_memory(self):
+        assert resident_memory() > 0
+
+
+class TestMetricsReporter:
+    def test_cycle(self):
+        clock = Clock()
+        reporter = MetricsReporter(files=lambda: 3, clock=clock)
+
+        reporter.report_scan(WatchState(set(), set(), set(), 0.02))
+        reporter.report_scan(WatchState({"a.cc"}, set(), {"b.cc", "c.cc"}, 0.2))
+        reporter.report_watchstate(WatchState({"a.cc"}, set(), {"b.cc", "c.cc"}, 0.2))
+        reporter.session_start("build")
+        reporter.report_build_steps(
+            [
+                BuildStep(["cmake"], 0, 0.5, "build.log", 0, None),
+                BuildStep(["cmake", "-G"], 0, 2.0, "build.log", 0, "configure"),
+                BuildStep(["cmake", "--build"], 0, 4.0, "build.log", 0, "build"),
+            ]
+        )
+        reporter.session_end("build", 6.5)
+        reporter.session_start("test")
+        clock.now += 1.5
+        reporter.report_results(
+            {
+                "total_runtime": 1.0,
+                "total_passed": 5,
+                "total_failed": 2,
+                "total_cached": 2,
+                "failures": [["a.bad", [], [], FAILED], ["a.crash", [], [], CRASHED]],
+            }
+        )
+        reporter.session_end("test")
+        reporter.report_build_failure()
+
+        metrics = reporter.registry.render().splitlines()
+        assert 'ttt_scan_duration_seconds_bucket{le="0.05"} 1' in metrics
+        assert "ttt_scan_duration_seconds_count 2" in metrics
+        assert "ttt_files_tracked 3" in metrics
+        assert 'ttt_changed_files_bucket{le="2"} 0' in metrics
+        assert 'ttt_changed_files_bucket{le="5"} 1' in metrics
+        assert 'ttt_file_changes_total{kind="created"} 1' in metrics
+        assert 'ttt_file_changes_total{kind="modified"} 2' in metrics
+        assert 'ttt_phase_duration_seconds_sum{phase="configure"} 2.0' in metrics
+        assert 'ttt_phase_duration_seconds_sum{phase="build"} 4.0' in metrics
+        assert 'ttt_phase_duration_seconds_sum{phase="test"} 1.5' in metrics
+        assert 'ttt_tests_total{outcome="passed"} 3' in metrics
+        assert 'ttt_tests_total{outcome="cached"} 2' in metrics
+        assert 'ttt_tests_total{outcome="failed"} 1' in metrics
+        assert 'ttt_tests_total{outcome="crashed"} 1' in metrics
+        assert "ttt_build_failures_total 1" in metrics
+        assert "# TYPE ttt_subprocesses_started_total counter" in metrics
+        assert any(m.startswith("ttt_subprocesses_started_total ") for m in metrics)
+        assert any(m.startswith("process_resident_memory_bytes ") for m in metrics)
+
+
+class TestExport:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_server(self):
+        registry = Registry()
+        registry.register(Gauge("files", "Files tracked.")).set(12)
+        server = MetricsServer(registry)
+        try:
+            host, port = server.address
+            assert host == "127.0.0.1"
+            with urllib.request.urlopen(
+                "http://{}:{}/metrics".format(host, port)
+            ) as response:
+                assert response.headers["Content-Type"].startswith("text/plain")
+                assert "files 12" in response.read().decode("utf-8")
+        finally:
+            server.close()
+
+    def test_file(self):
+        wd = TempDirectory()
+        path = os.path.join(wd.path, "ttt.prom")
+        registry = Registry()
+        gauge = registry.register(Gauge("files", "Files tracked."))
+        gauge.set(1)
+        exporter = MetricsFile(registry, path, interval=60)
+        gauge.set(2)
+        exporter.close()
+
+        with open(path) as f:
+            assert "files 2" in f.read().splitlines()
+        assert os.listdir(wd.path) == ["ttt.prom"]
+
+    def test_export_metrics(self):
+        wd = TempDirectory()
+        registry = Registry()
+
+        server = export_metrics(registry, "127.0.0.1:0")
+        server.close()
+        exporter = export_metrics(registry, os.path.join(wd.path, "ttt.prom"))
+        exporter.close()
+
+        assert isinstance(server, MetricsServer)
+        assert isinstance(exporter, MetricsFile)
@@ -8,16 +8,46 @@ test_monitor
 Tests for `monitor` module.
 """
 from contextlib import contextmanager
+import io
+import json
 import os
 import platform
+import stat
+import sys
 from unittest.mock import MagicMock, patch
 
+import pytest
 from testfixtures import TempDirectory
 
-from ttt.monitor import create_monitor, Monitor
+from ttt.builder import BuildResult, BuildStep, execute
+from ttt.cache import ResultCache
+from ttt.executor import Executor
+from ttt.gtest import GTest
+from ttt.monitor import (
+    Configuration,
+    create_monitor,
+    Monitor,
+    parse_configuration,
+)
+from ttt.options import DEFAULT_FLUSH_INTERVAL
+from ttt.profiling import Profiler
 from ttt.reporter import Reporter
+from ttt.subproc import checked_call
+from ttt.syntax import SyntaxCheck
+from ttt.terminal import Terminal
+from ttt.trace import Tracer
 from ttt.watcher import WatchState
 
+PASSING_GTEST = """#!{python}
+print("[==========] Running 1 test from 1 test case.")
+print("[----------] 1 test from core")
+print("[ RUN      ] core.ok")
+print("[       OK ] core.ok (0 ms)")
+print("[----------] 1 test from core (0 ms total)")
+print("[==========] 1 test from 1 test case ran. (0 ms total)")
+print("[  PASSED  ] 1 test.")
+"""
+
 
 @contextmanager
 def chdir(path):
@@ -42,6 +72,12 @@ class TestMonitor:
             error = e
         assert "Invalid path: {bad} ({bad})".format(bad=bad_path) in str(error)
 
+    def test_create_monitor_flush_interval(self):
+        terminal = create_monitor().reporters[0].terminal
+        assert terminal.flush_interval == DEFAULT_FLUSH_INTERVAL
+        terminal = create_monitor(flush_interval=0).reporters[0].terminal
+        assert not terminal.flush_interval
+
     def test_create_monitor_default_paths(self):
         m = create_monitor()
         cwd = os.getcwd()
@@ -76,6 +112,35 @@ class TestMonitor:
         assert reporter.watch_path == source_path
         assert reporter.build_path == "{}".format(os.path.realpath(build_path))
 
+    def test_create_monitor_with_event_log(self):
+        wd = TempDirectory()
+        source_path = wd.makedir("source")
+        event_log = os.path.join(wd.path, "events.jsonl")
+
+        with chdir(wd.path):
+            m = create_monitor(source_path, event_log=event_log)
+        m.notify("halt")
+        m.close()
+
+        assert len(m.reporters) == 2
+        assert m.progress
+        with open(event_log) as f:
+            assert '"event": "halt"' in f.read()
+
+    def test_create_monitor_with_metrics(self):
+        wd = TempDirectory()
+        source_path = wd.makedir("source")
+        wd.write(["source", "a.cc"], b"")
+
+        with chdir(wd.path):
+            m = create_monitor(source_path, metrics="127.0.0.1:0")
+        m.poll()
+
+        assert m.metrics in m.reporters
+        rendered = m.metrics.registry.render().splitlines()
+        assert "ttt_files_tracked 1" in rendered
+        assert "ttt_scan_duration_seconds_count 2" in rendered
+
     def test_create_monitor_accepts_clean_kwarg(self):
         wd = TempDirectory()
         source_path = wd.makedir("source")
@@ -92,6 +157,130 @@ class TestMonitor:
             assert os.path.exists(sub_path)
             assert os.path.exists(build_path)
 
+    def test_create_monitor_with_configurations(self):
+        wd = TempDirectory()
+        source_path = wd.makedir("source")
+
+        with chdir(wd.path):
+            m = create_monitor(
+                source_path,
+                build_path="build",
+                config=["Debug", "asan=Debug,SANITIZE=address"],
+                test=True,
+            )
+        assert [c.name for c in m.configurations] == ["Debug", "asan"]
+        assert [c.build_path for c in m.configurations] == [
+            os.path.join(os.path.realpath(wd.path), "build-Debug"),
+            os.path.join(os.path.realpath(wd.path), "build-asan"),
+        ]
+        assert m.configurations[0].executor is not m.configurations[1].executor
+
+    def test_create_monitor_with_one_configuration(self):
+        m = create_monitor(config=("Release",))
+        assert m.configurations is None
+        assert m.reporters[0].build_path.endswith("-Release-build")
+
+    def test_parse_configuration(self):
+        assert parse_configuration("Release") == ("Release", "Release", [])
+        assert parse_configuration("asan=Debug,SANITIZE=address,X=1") == (
+            "asan",
+            "Debug",
+            ["SANITIZE=address", "X=1"],
+        )
+
+    def test_build_and_test_configurations(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        passing = MagicMock()
+        passing.test = MagicMock(return_value={"total_passed": 1, "total_failed": 0})
+        untested = MagicMock()
+        built = BuildResult()
+        built.steps.append(BuildStep("make", 0, 1.0, [], 0.0, "build"))
+        profiler = MagicMock()
+
+        def broken(**kwargs):
+            return execute(
+                [lambda: [sys.executable, "-c", "import sys; sys.exit(1)"]], **kwargs
+            )
+
+        configurations = [
+            Configuration(
+                "Debug", "debug-build", MagicMock(return_value=built), passing, profiler
+            ),
+            Configuration("Release", "release-build", broken, untested),
+        ]
+        m = Monitor(
+            watcher,
+            None,
+            None,
+            [reporter],
+            interval=0,
+            configurations=configurations,
+            concurrency=2,
+            progress=True,
+        )
+        m.run(step=True)
+
+        watcher.testlist.assert_called_once_with(build_path="debug-build")
+        assert not untested.test.called
+        calls = [c for c, a, kw in reporter.method_calls]
+        assert calls == [
+            "report_watchstate",
+            "session_start",
+            "session_end",
+            "session_start",  # Debug
+            "report_build_steps",
+            "report_build_profile",
+            "report_plan",
+            "report_results",
+            "session_end",
+            "session_start",  # Release
+            "report_build_steps",
+            "report_build_failure",
+            "session_end",
+            "report_configurations",
+            "wait_change",
+        ]
+        profiler.mark.assert_called_once_with()
+        assert reporter.report_build_steps.call_args_list[0][0] == (built.steps,)
+        outcomes = reporter.report_configurations.call_args[0][0]
+        assert [(o.name, o.built) for o in outcomes] == [
+            ("Debug", True),
+            ("Release", False),
+        ]
+
+    def test_test_configuration_again_on_fix(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        fixed = MagicMock()
+        fixed.test = MagicMock(return_value={"total_passed": 0, "total_failed": 1})
+        other = MagicMock()
+        other.test = MagicMock(return_value={"total_passed": 1, "total_failed": 0})
+        builder = MagicMock()
+        configurations = [
+            Configuration("Debug", "debug-build", builder, fixed),
+            Configuration("Release", "release-build", builder, other),
+        ]
+        m = Monitor(
+            watcher, None, None, [reporter], interval=0, configurations=configurations
+        )
+        m.run(step=True)
+        fixed.test = MagicMock(return_value={"total_passed": 1, "total_failed": 0})
+        builder.reset_mock()
+        other.reset_mock()
+        m.run(step=True)
+
+        # the fixed configuration is tested again without being rebuilt
+        assert fixed.test.call_count == 2
+        assert other.test.call_count == 1
+        assert builder.call_count == 2
+
     def test_poll_build_test(self):
         reporter = MagicMock(spec=Reporter)
         watcher = MagicMock()
@@ -108,6 +297,7 @@ class TestMonitor:
         assert "poll" in [c for c, a, kw in watcher.mock_calls]
         # build step is captured as ''
         assert [c for c, a, kw in builder.mock_calls] == [""]
+        # the plan is only made for the progress
         assert [c for c, a, kw in executor.mock_calls] == ["test"]
         assert [c for c, a, kw in reporter.mock_calls] == [
             "report_watchstate",
@@ -120,6 +310,101 @@ class TestMonitor:
             "wait_change",
         ]
 
+    def test_background_reporter(self):
+        reporter = MagicMock(spec=Reporter)
+        background = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        m = Monitor(watcher, MagicMock(), None, [reporter])
+        m.add_reporter(background, background=True)
+
+        m.build()
+        m.close()
+
+        assert m.reporters == [reporter, background]
+        assert [c for c, a, kw in background.mock_calls] == [
+            c for c, a, kw in reporter.mock_calls
+        ]
+
+    def test_progress(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        builder = MagicMock()
+        executor = MagicMock()
+        m = Monitor(watcher, builder, executor, [reporter], progress=True)
+
+        m.build()
+        builder.assert_called_once_with(phase=m.build_phase)
+        m.build_phase("configure")
+        executor.progress("outcome")
+
+        assert executor.progress == m.test_progress
+        assert [(c, a) for c, a, kw in reporter.mock_calls][-2:] == [
+            ("report_phase", ("configure",)),
+            ("report_test_progress", ("outcome",)),
+        ]
+
+    def test_trace(self):
+        wd = TempDirectory()
+        path = os.path.join(wd.path, "trace.json")
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        watcher.testlist = MagicMock(return_value=[])
+        executor = MagicMock()
+        executor.test = MagicMock(return_value={"total_failed": 0})
+
+        def builder(phase):
+            phase("configure")
+            phase("build")
+
+        m = Monitor(watcher, builder, executor, [reporter], tracer=Tracer(path))
+        m.run(step=True)
+
+        with open(path) as f:
+            spans = [e for e in json.load(f)["traceEvents"] if e["ph"] == "X"]
+        assert [(e["cat"], e["name"]) for e in spans][:6] == [
+            ("watch", "scan"),
+            ("watch", "scan"),
+            ("report", "report_watchstate"),
+            ("report", "session_start"),
+            ("report", "report_build_path"),
+            ("build", "configure"),
+        ]
+        names = [e["name"] for e in spans]
+        assert names.index("build") < names.index("testlist")
+        assert names[-1] == "wait_change"
+        assert [c for c, a, kw in reporter.mock_calls][-1] == "wait_change"
+
+    def test_profile(self):
+        wd = TempDirectory()
+        output = io.StringIO()
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.poll = MagicMock(
+            side_effect=[
+                WatchState(set(), set(), set(), 0),
+                WatchState(set(), set(), set(), 0),  # the first check runs
+                WatchState(set(), set(), set(), 0),
+                WatchState(set(["change"]), set(), set(), 0),
+            ]
+        )
+        profiler = Profiler(wd.path, term=Terminal(stream=output))
+        m = Monitor(watcher, MagicMock(), None, [reporter], profiler=profiler)
+
+        m.check_for_changes()
+        m.check_for_changes()
+        m.check_for_changes()
+        m.close()
+
+        assert sorted(os.listdir(wd.path)) == [
+            "cycle-0001.prof",
+            "cycle-0002.prof",
+            "session.prof",
+        ]
+        assert output.getvalue().startswith("Profile of 2 cycles")
+
     def test_test_again_on_fix(self):
         reporter = MagicMock(spec=Reporter)
         o = watcher = builder = executor = MagicMock()
@@ -226,6 +511,193 @@ class TestMonitor:
         assert "test" not in calls
         assert "report_build_failure" in [c for c, a, kw in reporter.method_calls]
 
+    def test_failed_build_result(self):
+        def builder():
+            return execute(
+                [
+                    lambda: [sys.executable, "-c", "import sys; sys.exit(1)"],
+                    lambda: [sys.executable, "-c", "pass"],
+                ]
+            )
+
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        executor = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        m = Monitor(watcher, builder, executor, [reporter], interval=0)
+        m.run(step=True)
+
+        assert not executor.test.called
+        calls = [(c, a) for c, a, kw in reporter.method_calls]
+        assert "report_build_failure" in [c for c, a in calls]
+        steps = [a[0] for c, a in calls if c == "report_build_steps"][0]
+        assert len(steps) == 1
+        assert steps[0].returncode == 1
+
+    def test_build_profile(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        builder = MagicMock()
+        profiler = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        m = Monitor(watcher, builder, None, [reporter], build_profiler=profiler)
+        m.build()
+
+        assert [c for c, a, kw in profiler.method_calls] == ["mark", "collect"]
+        reporter.report_build_profile.assert_called_once_with(
+            profiler.collect.return_value
+        )
+
+    def test_syntax_gate(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        builder = MagicMock()
+        executor = MagicMock()
+        checker = MagicMock()
+        checker.check = MagicMock(return_value=[SyntaxCheck("a.cc", 1, ["error"])])
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["a.cc"]), set(), set(["b.cc"]), 0)
+        )
+        m = Monitor(
+            watcher,
+            builder,
+            executor,
+            [reporter],
+            interval=0,
+            syntax_checker=checker,
+            syntax_gate=True,
+        )
+        m.run(step=True)
+
+        checker.check.assert_called_once_with(set(["a.cc", "b.cc"]))
+        reporter.report_syntax_check.assert_called_once_with(checker.check.return_value)
+        assert not builder.called
+        assert not executor.test.called
+
+    def test_syntax_check_without_gate(self):
+        watcher = MagicMock()
+        builder = MagicMock()
+        checker = MagicMock()
+        checker.check = MagicMock(return_value=[SyntaxCheck("a.cc", 1, ["error"])])
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["a.cc"]), set(), set(), 0)
+        )
+        m = Monitor(watcher, builder, None, [], interval=0, syntax_checker=checker)
+        m.run(step=True)
+
+        assert builder.called
+
+    def test_preempt_build(self):
+        def builder():
+            checked_call([sys.executable, "-c", "import time; time.sleep(30)"])
+
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        executor = MagicMock()
+        watcher.poll = MagicMock(
+            return_value=WatchState(set(["change"]), set(), set(), 0)
+        )
+        m = Monitor(
+            watcher, builder, executor, [reporter], interval=0.1, preempt="always"
+        )
+        m.run(step=True)
+
+        calls = [c for c, a, kw in reporter.method_calls]
+        assert "report_interrupt" in calls
+        assert "wait_change" not in calls
+        assert not executor.test.called
+        assert m.pending.inserts == set(["change"])
+
+    def test_preempt_test_only(self):
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        builder = MagicMock()
+        executor = MagicMock()
+        watcher.poll = MagicMock(return_value=WatchState(set(), set(), set(), 0))
+        m = Monitor(watcher, builder, executor, [reporter], preempt="test")
+
+        m.phase = "build"
+        m.changes_detected(WatchState(set(["change"]), set(), set(), 0))
+        m.run(step=True)
+
+        # the pending change is picked up by the next check
+        assert m.pending is None
+        assert "report_watchstate" in [c for c, a, kw in reporter.method_calls]
+
+    def test_build_and_test_pipelined(self):
+        wd = TempDirectory()
+        linked = wd.write("test_core", b"")
+        stale = wd.write("test_old", b"")
+        order = []
+
+        def builder(listener):
+            listener(sys.stdout, "[1/2] Linking CXX executable test_core")
+            # wait for the linked binary to be tested before the build ends
+            while "test_core" not in order:
+                pass
+            order.append("built")
+
+        phases = []
+
+        def executor_test(testlist):
+            for test in testlist:
+                order.append(os.path.basename(test.executable()))
+                phases.append(m.phase)
+            return {"total_failed": 0}
+
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.build_path = wd.path
+        watcher.testfiles = MagicMock(
+            return_value={"test_core": "test_core.cc", "test_old": "test_old.cc"}
+        )
+        watcher.create_test = lambda source, path: GTest(source, path)
+        watcher.testlist = MagicMock(
+            return_value=[GTest("test_core.cc", linked), GTest("test_old.cc", stale)]
+        )
+        executor = MagicMock()
+        executor.test = executor_test
+        m = Monitor(watcher, builder, executor, [reporter], pipeline=True)
+
+        m.build_and_test()
+
+        assert order == ["test_core", "built", "test_old"]
+        # the cycle is in the build phase for as long as the build runs
+        assert phases == ["build", "test"]
+        assert "report_plan" not in [c for c, a, kw in reporter.method_calls]
+
+    @pytest.mark.skipif(sys.platform == "win32", reason="needs a posix shebang")
+    def test_pipelined_library_relinked(self):
+        wd = TempDirectory()
+        wd.write("lib/libcore.so", b"library")
+        executable = wd.write(
+            "test_core", PASSING_GTEST.format(python=sys.executable).encode("utf-8")
+        )
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR)
+        executor = Executor(result_cache=ResultCache(build_path=wd.path))
+        assert executor.test([GTest("test_core.cc", executable)])["total_passed"] == 1
+
+        def builder(listener):
+            # the library is relinked but the binary linked against it is not
+            wd.write("lib/libcore.so", b"relinked library")
+
+        reporter = MagicMock(spec=Reporter)
+        watcher = MagicMock()
+        watcher.build_path = wd.path
+        watcher.testfiles = MagicMock(return_value={"test_core": "test_core.cc"})
+        watcher.testlist = MagicMock(return_value=[GTest("test_core.cc", executable)])
+        m = Monitor(watcher, builder, executor, [reporter], pipeline=True)
+
+        m.build_and_test()
+
+        results = reporter.report_results.call_args[0][0]
+        assert results["total_passed"] == 1
+        assert results["total_cached"] == 0
+
 
 class Interrupter:
     def __init__(self, count):
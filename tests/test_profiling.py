@@ -0,0 +1,93 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_profiling
+----------------------------------
+
+Tests for `profiling` module.
+"""
+import cProfile
+import io
+import os
+import pstats
+import tracemalloc
+
+from testfixtures import TempDirectory
+
+from ttt.profiling import hot_functions, Profiler
+from ttt.terminal import Terminal
+
+
+def busy():
+    return sum(i * i for i in range(10000))
+
+
+class TestProfiler:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_cycles(self):
+        wd = TempDirectory()
+        directory = os.path.join(wd.path, "profile")
+        output = io.StringIO()
+        profiler = Profiler(directory, term=Terminal(stream=output))
+
+        profiler.start()
+        busy()
+        profiler.stop(keep=False)
+        with profiler.cycle():
+            busy()
+        profiler.report()
+
+        assert sorted(os.listdir(directory)) == ["cycle-0001.prof", "session.prof"]
+        [calls] = [
+            stats[1]
+            for function, stats in pstats.Stats(
+                os.path.join(directory, "session.prof")
+            ).stats.items()
+            if function[2] == "busy"
+        ]
+        assert calls == 2
+        lines = output.getvalue().splitlines()
+        assert lines[0].startswith("Profile of 1 cycles written to ")
+        assert any(line.endswith("(<genexpr>)") for line in lines)
+
+    def test_nothing_profiled(self):
+        wd = TempDirectory()
+        directory = os.path.join(wd.path, "profile")
+        output = io.StringIO()
+        profiler = Profiler(directory, term=Terminal(stream=output))
+
+        profiler.stop()
+        profiler.report()
+
+        assert not os.path.exists(directory)
+        assert output.getvalue() == ""
+
+    def test_memory(self):
+        wd = TempDirectory()
+        output = io.StringIO()
+        tracing = tracemalloc.is_tracing()
+        try:
+            profiler = Profiler(wd.path, memory=True, term=Terminal(stream=output))
+            with profiler.cycle():
+                busy()
+            profiler.report()
+        finally:
+            if not tracing:
+                tracemalloc.stop()
+
+        assert "cycle-0001.heap" in os.listdir(wd.path)
+        assert "Memory allocated at the end of the last cycle:" in output.getvalue()
+
+    def test_hot_functions(self):
+        profile = cProfile.Profile()
+        profile.runcall(busy)
+
+        hot = hot_functions(pstats.Stats(profile), top=1)
+
+        assert len(hot) == 1
+        function, own, total, calls = hot[0]
+        assert own <= total
+        assert calls > 0
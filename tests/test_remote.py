@@ -0,0 +1,144 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_remote
+----------------------------------
+
+Tests for `remote` module.
+"""
+import os
+import stat
+import subprocess
+import sys
+import threading
+
+import pytest
+from testfixtures import TempDirectory
+
+from ttt.executor import Executor
+from ttt.gtest import GTest
+from ttt.remote import (
+    create_server,
+    parse_address,
+    RemoteRunner,
+    WorkerError,
+    WorkerPool,
+)
+
+GTEST_PROGRAM = """#!{python}
+print("[----------] 1 test from core")
+print("[ RUN      ] core.ok")
+print("[       OK ] core.ok (0 ms)")
+print("[----------] 1 test from core (0 ms total)")
+"""
+TOKEN = "secret"
+
+pytestmark = pytest.mark.skipif(
+    sys.platform == "win32", reason="uses Unix sockets and posix shebangs"
+)
+
+
+class TestRemote:
+    def setup_method(self):
+        self.wd = TempDirectory()
+        self.address = os.path.join(self.wd.path, "worker.sock")
+        self.server = create_server(self.address, self.wd.path, TOKEN)
+        self.thread = threading.Thread(target=self.server.serve_forever)
+        self.thread.start()
+
+    def teardown_method(self):
+        self.server.shutdown()
+        self.server.server_close()
+        self.thread.join()
+        TempDirectory.cleanup_all()
+
+    def program(self, name, source):
+        path = self.wd.write(
+            name, "#!{}\n{}\n".format(sys.executable, source).encode("utf-8")
+        )
+        os.chmod(path, os.stat(path).st_mode | stat.S_IXUSR)
+        return path
+
+    def test_parse_address(self):
+        import socket
+
+        assert parse_address("localhost:1234") == (
+            socket.AF_INET,
+            ("localhost", 1234),
+        )
+        assert parse_address("unix:sock") == (socket.AF_UNIX, "sock")
+        assert parse_address("1234") == (socket.AF_INET, ("127.0.0.1", 1234))
+        with pytest.raises(ValueError):
+            parse_address("localhost")
+
+    def test_run(self):
+        lines = []
+        runner = RemoteRunner(self.address, TOKEN)
+        rc, out, err = runner(
+            [self.program("test_hello", "print('hello')"), "--gtest_color=no"],
+            listener=lambda channel, line: lines.append((channel, line)),
+        )
+        assert rc == 0
+        assert out == ["hello"]
+        assert lines == [(sys.stdout, "hello")]
+
+    def test_run_error(self):
+        runner = RemoteRunner(self.address, TOKEN)
+        rc, _, _ = runner([self.program("test_exit", "import sys; sys.exit(3)")])
+        assert rc == 3
+
+    def test_run_timeout(self):
+        runner = RemoteRunner(self.address, TOKEN)
+        with pytest.raises(subprocess.TimeoutExpired):
+            runner(
+                [self.program("test_sleep", "import time; time.sleep(30)")], timeout=0.5
+            )
+
+    def test_refused_without_token(self):
+        executable = self.program("test_hello", "print('hello')")
+        with pytest.raises(WorkerError, match="invalid token"):
+            RemoteRunner(self.address, "guess")([executable])
+
+    def test_refused_outside_build_root(self):
+        with pytest.raises(WorkerError, match="not under the build root"):
+            RemoteRunner(self.address, TOKEN)([sys.executable, "-c", "print(1)"])
+
+    def test_refused_other_arguments(self):
+        executable = self.program("test_hello", "print('hello')")
+        with pytest.raises(WorkerError, match="not a gtest option"):
+            RemoteRunner(self.address, TOKEN)([executable, "-c", "print(1)"])
+
+    def test_token_required(self):
+        with pytest.raises(ValueError):
+            create_server(os.path.join(self.wd.path, "other.sock"), self.wd.path, "")
+
+    def test_unreachable(self):
+        missing = os.path.join(self.wd.path, "missing.sock")
+        with pytest.raises(WorkerError):
+            RemoteRunner(missing, TOKEN)(["true"])
+        assert WorkerPool([missing], TOKEN).runners() == []
+        assert len(WorkerPool([missing, self.address], TOKEN).runners()) == 1
+
+    def test_executor_distributes(self):
+        executable = self.wd.write(
+            "test_core", GTEST_PROGRAM.format(python=sys.executable).encode("utf-8")
+        )
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR)
+        tests = [GTest("test_core.cc", executable) for _ in range(3)]
+        e = Executor(workers=WorkerPool([self.address, self.address], TOKEN))
+
+        results = e.test(tests)
+        assert results["total_passed"] == 3
+        assert results["total_failed"] == 0
+
+    def test_executor_falls_back_to_local(self):
+        executable = self.wd.write(
+            "test_core", GTEST_PROGRAM.format(python=sys.executable).encode("utf-8")
+        )
+        os.chmod(executable, os.stat(executable).st_mode | stat.S_IXUSR)
+        missing = os.path.join(self.wd.path, "missing.sock")
+        e = Executor(workers=WorkerPool([missing], TOKEN))
+
+        results = e.test([GTest("test_core.cc", executable)])
+        assert results["total_passed"] == 1
@@ -11,7 +11,9 @@ import io
 import os
 
 from ttt import __progname__, __version__
+from ttt.builder import BuildStep
 from ttt.executor import FAILED
+from ttt.monitor import ConfigurationOutcome
 from ttt.terminal import Terminal, TerminalReporter
 import ttt.termstyle as termstyle
 from ttt.watcher import WatchState
@@ -80,6 +82,23 @@ class TestReporter:
             + os.linesep
         )
 
+    def test_report_all_passed_cached(self):
+        f = io.StringIO()
+        r = TerminalReporter(
+            watch_path=None, build_path=None, terminal=Terminal(stream=f)
+        )
+
+        results = {
+            "total_runtime": 0.5,
+            "total_passed": 3,
+            "total_failed": 0,
+            "failures": [],
+            "total_cached": 2,
+            "cached": ["test_core.cc"],
+        }
+        r.report_results(results)
+        assert " 3 passed (2 cached) in 0.5 seconds " in f.getvalue()
+
     def test_report_all_failed(self):
         f = io.StringIO()
         r = TerminalReporter(
@@ -256,6 +275,69 @@ class TestReporter:
             termstyle.bold("### Building:   build_path") + os.linesep
         )
 
+    def test_report_build_steps(self):
+        f = io.StringIO()
+        r = TerminalReporter(
+            watch_path="watch_path",
+            build_path="build_path",
+            terminal=Terminal(stream=f),
+        )
+
+        r.report_build_steps(
+            [
+                BuildStep(["cmake", "-Hsrc"], 0, 1.5, "build.log", 0),
+                BuildStep(["cmake", "--build", "."], 2, 0.25, "build.log", 1.5),
+            ]
+        )
+        assert f.getvalue() == (
+            "### Step:        1.500s cmake -Hsrc"
+            + os.linesep
+            + "### Step:        0.250s cmake --build ."
+            + os.linesep
+            + termstyle.red("### Failed:     exit code 2; output in build.log")
+            + os.linesep
+        )
+
+    def test_report_compiler_cache(self):
+        f = io.StringIO()
+        r = TerminalReporter(
+            watch_path="watch_path",
+            build_path="build_path",
+            terminal=Terminal(stream=f),
+        )
+
+        r.report_compiler_cache(3, 1)
+        r.report_compiler_cache(0, 0)
+        assert f.getvalue() == (
+            "### Cache:      3 hits, 1 misses (75% hit rate)"
+            + os.linesep
+            + "### Cache:      0 hits, 0 misses (0% hit rate)"
+            + os.linesep
+        )
+
+    def test_report_configurations(self):
+        f = io.StringIO()
+        r = TerminalReporter(
+            watch_path="watch_path",
+            build_path="build_path",
+            terminal=Terminal(stream=f),
+        )
+
+        r.report_configurations(
+            [
+                ConfigurationOutcome(
+                    "Debug", True, None, {"total_passed": 3, "total_failed": 1}
+                ),
+                ConfigurationOutcome("Release", False, None, None),
+            ]
+        )
+        assert f.getvalue() == (
+            termstyle.red("### Debug:      3 passed, 1 failed")
+            + os.linesep
+            + termstyle.red("### Release:    build failed")
+            + os.linesep
+        )
+
     def test_report_interrupt(self):
         f = io.StringIO()
         r = TerminalReporter(
@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_status
+----------------------------------
+
+Tests for `status` module.
+"""
+import io
+import os
+
+from testfixtures import TempDirectory
+
+from ttt.executor import CompletedBinary, CompletedTest, FAILED, PASSED
+from ttt.status import DurationHistory, format_duration, StatusLine
+from ttt.terminal import CLEAR_LINE, Terminal
+
+
+def outcome_of(executable, outcome):
+    return CompletedTest(executable, "test.cc", "x.ok", outcome, 0.1)
+
+
+def finished(executable, cached=False):
+    return CompletedBinary(executable, "test.cc", 1, 0, 0.1, cached)
+
+
+class TestDurationHistory:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_expected(self):
+        history = DurationHistory()
+        assert history.expected(["a"]) is None
+        assert history.expected([]) == 0
+
+        history.put("a", 2.0)
+        history.put("b", 4.0)
+        assert history.expected(["a", "b"]) == 6.0
+        # unknown binaries are assumed to take the average
+        assert history.expected(["a", "c"]) == 5.0
+
+    def test_persisted(self):
+        path = os.path.join(TempDirectory().path, "durations.json")
+        history = DurationHistory(path)
+        history.put("a", 2.0)
+        history.save()
+        assert DurationHistory(path).get("a") == 2.0
+
+
+class TestStatusLine:
+    def test_render(self):
+        history = DurationHistory()
+        history.put("a", 10.0)
+        history.put("b", 20.0)
+        status = StatusLine(Terminal(), history)
+        status.reset("test")
+        status.plan({"tests": {"a": ["x.ok"], "b": ["x.ok", "x.bad"]}})
+        start = status.start_time
+        assert status.render(start) == "test | 0/2 binaries | ETA 30s | 0s"
+
+        status.progress(outcome_of("a", PASSED))
+        status.progress(finished("a"))
+        status.progress(outcome_of("b", FAILED))
+        assert status.render(start + 5) == (
+            "test | 1/2 binaries | 2 tests (0.4/s) | 1 failed | ETA 20s | 5s"
+        )
+
+    def test_binary_duration_recorded(self):
+        history = DurationHistory()
+        status = StatusLine(Terminal(), history)
+        status.progress(CompletedBinary("a", "test.cc", 1, 0, 2.5, False))
+        # the run time of the binary itself, however many run at once
+        assert history.get("a") == 2.5
+
+    def test_cached_binary_duration_not_recorded(self):
+        history = DurationHistory()
+        status = StatusLine(Terminal(), history)
+        status.progress(finished("a", cached=True))
+        assert history.get("a") is None
+
+    def test_drawn_in_place(self):
+        f = io.StringIO()
+        term = Terminal(stream=f)
+        status = StatusLine(term, interval=0.01)
+        status.start("build")
+        while not f.getvalue():
+            pass
+        term.writeln("output")
+        status.stop()
+        output = f.getvalue()
+
+        assert output.startswith(CLEAR_LINE + "build | ")
+        assert (CLEAR_LINE + "output" + os.linesep) in output
+        # removed once stopped
+        assert output.endswith(CLEAR_LINE) or output.endswith(os.linesep)
+
+
+def test_format_duration():
+    assert format_duration(5.4) == "5s"
+    assert format_duration(65) == "1m05s"
+    assert format_duration(3720) == "1h02m"
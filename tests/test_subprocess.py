@@ -9,10 +9,12 @@ Tests for `subproc` module.
 """
 import os
 import subprocess
+import threading
 
 import pytest
 from testfixtures import TempDirectory
 
+from ttt import subproc
 from ttt.subproc import checked_call, execute, streamed_call
 
 
@@ -72,6 +74,13 @@ class TestSubprocess:
         with pytest.raises(subprocess.CalledProcessError):
             checked_call(python_command(exefile), universal_newlines=True)
 
+    def test_process_counts(self):
+        exefile = self.wd.write(PROGRAM_NAME, create_program(exit_code=0))
+        started, running = subproc.process_counts()
+        checked_call(python_command(exefile), universal_newlines=True)
+        streamed_call(python_command(exefile), universal_newlines=True)
+        assert subproc.process_counts() == (started + 2, running)
+
     def test_streamed_call(self):
         exefile = self.wd.write(PROGRAM_NAME, create_program(exit_code=0))
         result = streamed_call(python_command(exefile), universal_newlines=True)
@@ -119,3 +128,42 @@ class TestSubprocess:
             streamed_call(
                 python_command(exefile), universal_newlines=True, stdout=subprocess.PIPE
             )
+
+    def test_streamed_call_timeout(self):
+        program = "import time{}time.sleep(30)".format(os.linesep).encode("utf-8")
+        exefile = self.wd.write(PROGRAM_NAME, program)
+        with pytest.raises(subprocess.TimeoutExpired):
+            streamed_call(python_command(exefile), timeout=0.5)
+
+    def test_streamed_call_watchdog(self):
+        program = os.linesep.join(
+            ["import time", 'print("hello", flush=True)', "time.sleep(30)"]
+        ).encode("utf-8")
+        exefile = self.wd.write(PROGRAM_NAME, program)
+        output = []
+
+        def line_handler(channel, line):
+            output.append(line)
+
+        with pytest.raises(subprocess.TimeoutExpired) as e:
+            streamed_call(
+                python_command(exefile),
+                listener=line_handler,
+                watchdog=lambda: bool(output),
+            )
+        assert e.value.output == ["hello"]
+
+    def test_cancel(self):
+        program = "import time{}time.sleep(30)".format(os.linesep).encode("utf-8")
+        exefile = self.wd.write(PROGRAM_NAME, program)
+        timer = threading.Timer(0.5, subproc.cancel)
+        timer.start()
+        try:
+            with pytest.raises(subproc.Cancelled):
+                checked_call(python_command(exefile))
+            with pytest.raises(subproc.Cancelled):
+                streamed_call(python_command(exefile))
+        finally:
+            timer.join()
+            subproc.uncancel()
+        assert checked_call(python_command(self.wd.write("ok.py", b""))) == 0
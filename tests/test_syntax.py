@@ -0,0 +1,95 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_syntax
+----------------------------------
+
+Tests for `syntax` module.
+"""
+import json
+import os
+import shutil
+
+import pytest
+from testfixtures import TempDirectory
+
+from ttt.syntax import load_compile_commands, syntax_command, SyntaxChecker
+
+
+class TestSyntaxCommand:
+    def test_command_string(self):
+        entry = {
+            "directory": "/build",
+            "command": "/usr/bin/c++ -DX=1 -I/src -O2 -MD -MT core.o -MF core.o.d "
+            "-o CMakeFiles/core.dir/core.cc.o -c /src/core.cc",
+            "file": "/src/core.cc",
+        }
+        assert syntax_command(entry) == [
+            "/usr/bin/c++",
+            "-DX=1",
+            "-I/src",
+            "-O2",
+            "/src/core.cc",
+            "-fsyntax-only",
+        ]
+
+    def test_arguments(self):
+        entry = {
+            "directory": "/build",
+            "arguments": ["gcc", "-ocore.o", "-c", "core.c"],
+            "file": "core.c",
+        }
+        assert syntax_command(entry) == ["gcc", "core.c", "-fsyntax-only"]
+
+    def test_msvc(self):
+        entry = {
+            "directory": "C:/build",
+            "arguments": ["cl.exe", "/nologo", "/MD", "/FoCore.obj", "/c", "core.cc"],
+            "file": "core.cc",
+        }
+        assert syntax_command(entry) == ["cl.exe", "/nologo", "/MD", "core.cc", "/Zs"]
+
+
+@pytest.mark.skipif(shutil.which("cc") is None, reason="needs a C compiler")
+class TestSyntaxChecker:
+    def setup_method(self):
+        self.source = TempDirectory()
+        self.build = TempDirectory()
+        self.good = self.source.write("good.c", b"int main(void) { return 0; }\n")
+        self.bad = self.source.write("bad.c", b"int main(void) { return 0 }\n")
+        self.build.write(
+            "compile_commands.json",
+            json.dumps(
+                [
+                    {
+                        "directory": self.build.path,
+                        "command": "cc -o {0}.o -c {0}".format(path),
+                        "file": path,
+                    }
+                    for path in (self.good, self.bad)
+                ]
+            ).encode("utf-8"),
+        )
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_load_compile_commands(self):
+        commands = load_compile_commands(self.build.path)
+        assert sorted(commands) == sorted([self.good, self.bad])
+        assert load_compile_commands(self.source.path) == {}
+
+    def test_check(self):
+        header = self.source.write("good.h", b"")
+        unknown = self.source.write("unknown.c", b"")
+        checker = SyntaxChecker(self.build.path)
+        results = checker.check(set([self.good, self.bad, header, unknown]))
+
+        assert [(r.source, r.returncode) for r in results if r.returncode == 0] == [
+            (self.good, 0)
+        ]
+        failed = [r for r in results if r.returncode != 0]
+        assert [r.source for r in failed] == [self.bad]
+        assert any("error" in line for line in failed[0].output)
+        assert not os.path.exists(self.good + ".o")
@@ -2,8 +2,10 @@ from contextlib import contextmanager
 import io
 from os import linesep
 import sys
+import time
 
-from ttt.terminal import Terminal
+import ttt.terminal
+from ttt.terminal import forget_width, term_width, Terminal
 import ttt.termstyle as termstyle
 
 
@@ -120,6 +122,67 @@ class TestTerminal:
         t.writeln("hello", decorator=[termstyle.bold, termstyle.red])
         assert f.getvalue() == termstyle.red(termstyle.bold("hello")) + linesep
 
+    def test_writeln_decorator_not_wrapping(self):
+        f = io.StringIO()
+        t = Terminal(stream=f)
+        t.writeln("hello", decorator=[str.upper, termstyle.bold])
+        assert f.getvalue() == termstyle.bold("HELLO") + linesep
+
+
+class CountingStream(io.StringIO):
+    def __init__(self):
+        super().__init__()
+        self.flushes = 0
+
+    def flush(self):
+        self.flushes += 1
+
+
+class TestBufferedTerminal:
+    def test_batched(self):
+        f = CountingStream()
+        t = Terminal(stream=f, flush_interval=60)
+        t.writeln("first")
+        for _ in range(1000):
+            t.writeln(".", end="")
+        assert f.getvalue() == "first" + linesep
+        assert f.flushes == 1
+
+        t.flush()
+        assert f.getvalue() == "first" + linesep + "." * 1000
+        assert f.flushes == 2
+
+    def test_flushed_after_interval(self):
+        f = CountingStream()
+        t = Terminal(stream=f, flush_interval=0.05)
+        t.write("a")
+        t.write("b")
+        assert f.getvalue() == "a"
+        deadline = time.time() + 5
+        while f.getvalue() != "ab" and time.time() < deadline:
+            time.sleep(0.01)
+        assert f.getvalue() == "ab"
+
+
+class TestTermWidth:
+    def teardown_method(self):
+        forget_width()
+
+    def test_width_kept_until_resized(self, monkeypatch):
+        columns = [100]
+        monkeypatch.setattr(
+            ttt.terminal.shutil,
+            "get_terminal_size",
+            lambda fallback: type("Size", (), {"columns": columns[0]}),
+        )
+        forget_width()
+        assert term_width() == 100
+        columns[0] = 50
+        if hasattr(ttt.terminal.signal, "SIGWINCH"):
+            assert term_width() == 100
+            forget_width()
+        assert term_width() == 50
+
 
 @contextmanager
 def stdout_redirector(stream):
@@ -0,0 +1,103 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_trace
+----------------------------------
+
+Tests for `trace` module.
+"""
+import json
+import os
+import threading
+
+import pytest
+from testfixtures import TempDirectory
+
+from ttt.trace import Tracer
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+class TestTracer:
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_span(self):
+        wd = TempDirectory()
+        path = os.path.join(wd.path, "trace", "ttt.json")
+        clock = Clock()
+        tracer = Tracer(path, clock=clock)
+
+        clock.now = 10.5
+        with tracer.span("scan", category="watch"):
+            clock.now = 10.75
+        tracer.complete("build", 11.0, 2.0, category="build", target="all")
+        tracer.save()
+
+        with open(path) as f:
+            trace = json.load(f)
+        [lane, scan, build] = trace["traceEvents"]
+        tid = threading.get_ident()
+        assert lane == {
+            "name": "thread_name",
+            "ph": "M",
+            "pid": os.getpid(),
+            "tid": tid,
+            "args": {"name": threading.current_thread().name},
+        }
+        assert scan == {
+            "name": "scan",
+            "cat": "watch",
+            "ph": "X",
+            "ts": 500000.0,
+            "dur": 250000.0,
+            "pid": os.getpid(),
+            "tid": tid,
+        }
+        assert build["ts"] == 1000000.0
+        assert build["dur"] == 2000000.0
+        assert build["args"] == {"target": "all"}
+
+    def test_span_recorded_when_raised(self):
+        tracer = Tracer("unused")
+
+        with pytest.raises(KeyboardInterrupt):
+            with tracer.span("build"):
+                raise KeyboardInterrupt()
+
+        assert [e["name"] for e in tracer.events()] == ["thread_name", "build"]
+
+    def test_lanes(self):
+        tracer = Tracer("unused")
+
+        def work():
+            with tracer.span("test_core.cc", category="test"):
+                pass
+
+        threads = [
+            threading.Thread(target=work, name="worker {}".format(i)) for i in range(2)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        lanes = [e for e in tracer.events() if e["ph"] == "M"]
+        spans = [e for e in tracer.events() if e["ph"] == "X"]
+        assert sorted(e["args"]["name"] for e in lanes) == ["worker 0", "worker 1"]
+        assert {e["tid"] for e in spans} == {e["tid"] for e in lanes}
+
+    def test_oldest_spans_dropped(self):
+        tracer = Tracer("unused", max_spans=2)
+
+        for name in ("scan", "build", "test"):
+            tracer.complete(name, 0, 0)
+
+        assert [e["name"] for e in tracer.events()][1:] == ["build", "test"]
@@ -0,0 +1,85 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+"""
+test_usercache
+----------------------------------
+
+Tests for `usercache` module.
+"""
+import os
+import subprocess
+import sys
+
+from testfixtures import TempDirectory
+
+import ttt
+from ttt.usercache import cache_directory, ContentCache, digest, fetch
+
+URL = "https://example.com/provider.cmake"
+
+
+class TestContentCache:
+    def setup_method(self):
+        self.cache_directory = TempDirectory()
+        self.cache = ContentCache(self.cache_directory.path)
+
+    def teardown_method(self):
+        TempDirectory.cleanup_all()
+
+    def test_store_and_lookup(self):
+        assert self.cache.lookup(URL) is None
+
+        path = self.cache.store(URL, b"content")
+
+        assert self.cache.lookup(URL) == path
+        assert os.path.basename(path) == digest(b"content")
+        with open(path, "rb") as f:
+            assert f.read() == b"content"
+
+    def test_same_content_stored_once(self):
+        first = self.cache.store(URL, b"content")
+        second = self.cache.store("https://example.com/mirror.cmake", b"content")
+
+        assert first == second
+
+    def test_damaged_content_not_used(self):
+        path = self.cache.store(URL, b"content")
+        with open(path, "wb") as f:
+            f.write(b"damaged")
+
+        assert self.cache.lookup(URL) is None
+
+    def test_fetch_seeded(self):
+        self.cache_directory.write("seed.cmake", b"seeded")
+        seed = os.path.join(self.cache_directory.path, "seed.cmake")
+
+        path = fetch(URL, cache=self.cache, seed=seed)
+
+        assert self.cache.lookup(URL) == path
+        # no longer needs the seed
+        assert fetch(URL, cache=self.cache) == path
+
+    def test_cache_directory(self, monkeypatch):
+        monkeypatch.setenv("TTT_CACHE_DIR", self.cache_directory.path)
+        assert cache_directory() == self.cache_directory.path
+
+        monkeypatch.delenv("TTT_CACHE_DIR")
+        monkeypatch.setenv("XDG_CACHE_HOME", self.cache_directory.path)
+        if os.name != "nt":
+            assert cache_directory() == os.path.join(self.cache_directory.path, "ttt")
+
+
+def test_requests_imported_lazily():
+    env = dict(os.environ)
+    env["PYTHONPATH"] = os.path.dirname(os.path.dirname(ttt.__file__))
+    output = subprocess.check_output(
+        [
+            sys.executable,
+            "-c",
+            "import sys, ttt.builder; print('requests' in sys.modules)",
+        ],
+        env=env,
+        universal_newlines=True,
+    )
+    assert output.strip() == "False"
@@ -13,7 +13,13 @@ import os
 from testfixtures import TempDirectory
 
 from ttt import watcher
-from ttt.watcher import create_watchstate, WatchedFile, Watcher
+from ttt.watcher import (
+    create_watchstate,
+    merge_watchstates,
+    WatchedFile,
+    Watcher,
+    WatchState,
+)
 
 
 class TestWatcher:
@@ -233,3 +239,13 @@ class TestWatchState:
         assert ws.deletes == set(["test"])
         assert not ws.updates
         assert not ws.inserts
+
+    def test_merge_watchstates(self):
+        earlier = WatchState(set(["a", "b"]), set(["c"]), set(["d", "e"]), 1)
+        later = WatchState(set(["c"]), set(["a", "e"]), set(["b", "d"]), 2)
+
+        ws = merge_watchstates(earlier, later)
+        assert ws.inserts == set(["b"])
+        assert ws.deletes == set(["e"])
+        assert ws.updates == set(["c", "d"])
+        assert ws.walk_time == 3